@@ -1,49 +1,81 @@
 import csv
 import os
-from datetime import date, datetime 
+import pydoc
+import sys
+from itertools import islice
+
+# utilidades compartidas en python/comunes
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "python"))
+from comunes.archivos import bloquear_archivo
+from comunes.edad import calcular_edad
+from comunes.metricas import cronometrar
 
 ARCHIVO_CSV = "registro_personas.csv"
 CAMPOS = [
     "id", "cedula", "nombre", "apellido", "sexo", "fecha_nacimiento", "edad", "ocupacion", "empresa", "tipo_contrato", "es_asegurado", "tipo_sangre", "direccion", "telefono_residencial", "telefono_celular"
 ]
+# cantidad de registros que se muestran por pagina en leer_registro()
+TAMANO_PAGINA = 20
+# al volcar todo a un archivo o al paginador se formatean bloques de esta cantidad de registros
+TAMANO_BLOQUE_SALIDA = 1000
+# el proximo id se guarda junto al csv: registro_personas.csv -> registro_personas.csv.id
+EXTENSION_SIGUIENTE_ID = ".id"
+
+# plantillas de la salida: se arman una sola vez y cada persona se formatea con un solo format()
+FORMATO_FILA = "{:<5} {:<15} {:<15} {:<15} {:<6} {:<5}"
+FORMATO_PERSONA = "\n".join([
+    FORMATO_FILA,
+    "telfono: {}",
+    "Direccion: {}",
+    "ocupacion: {}",
+    "empresa: {}",
+    "tipo de contrato: {}",
+    "¿es asegurado si/no?: {}",
+    "tipo de sangre: {}",
+]) + "\n"
 
 
 # --------------------- Funciones auxiliares -----------------------
 
 
-def calcular_edad (fecha_nacimiento_str):
-    try:
-        fecha_nacimiento = datetime.strptime(fecha_nacimiento_str, '%Y-%m-%d').date()
-    except ValueError:
-      return None
-     
-    hoy = date.today()
-
-    edad = hoy.year - fecha_nacimiento.year
-
-    if (hoy.month, hoy.day) < (fecha_nacimiento.month, fecha_nacimiento.day):
-          edad -= 1
-    return edad
-
 def inicializar_csv():
     if not os.path.exists(ARCHIVO_CSV):
         with open(ARCHIVO_CSV, 'w', newline='', encoding='utf-8') as archivo:
-            writer = csv.DictReader(archivo, fieldnames=CAMPOS)
+            writer = csv.DictWriter(archivo, fieldnames=CAMPOS)
             writer.writeheader()
             print(f"archivo '{ARCHIVO_CSV}' creado con exito.")
         
-def obtener_datos():
-    datos = []
+def iterar_registros(desde_id=None):
+    #generador: lee el csv de a una fila, sin cargar el archivo completo en memoria.
+    #con desde_id se empieza justo despues del registro con ese id
     try:
         with open(ARCHIVO_CSV, 'r', newline='', encoding='utf-8') as archivo:
             reader = csv.DictReader(archivo)
 
-            for fila in reader:
-                datos.append(fila)
+            if desde_id is not None:
+                for fila in reader:
+                    if fila['id'] == str(desde_id):
+                        break
+
+            yield from reader
     except FileNotFoundError:
-        pass #si no existe, retorna lista vacia. la funcion crear se encarga de crearlo
+        return #si no existe, no hay registros. la funcion crear se encarga de crearlo
+
+@cronometrar("registro.pagina")
+def obtener_pagina(numero_pagina, tamano_pagina=TAMANO_PAGINA, desde_id=None):
+    #devuelve solo los registros de una pagina (la primera es la 0), leyendo hasta ahi y nada mas
+    inicio = numero_pagina * tamano_pagina
+    return list(islice(iterar_registros(desde_id), inicio, inicio + tamano_pagina))
+
+@cronometrar("registro.pagina")
+def leer_lote(registros):
+    #siguiente pagina de un generador de registros ya abierto
+    return list(islice(registros, TAMANO_PAGINA))
 
-    return datos
+@cronometrar("registro.carga")
+def obtener_datos():
+    #si no existe, retorna lista vacia. la funcion crear se encarga de crearlo
+    return list(iterar_registros())
 
 def obtener_siguiente_ID(datos):
     #clacula el proximo ID a partir de lso datos existentes
@@ -52,17 +84,50 @@ def obtener_siguiente_ID(datos):
     max_id = max(int(persona['id']) for persona in datos if persona['id'].isdigit())
 
     return max_id + 1
+
+def leer_siguiente_ID():
+    #proximo id sin recorrer el csv: vale el guardado si el csv sigue igual que cuando se guardo.
+    #si falta, o el csv se cambio por otra via, se calcula leyendo todos los registros (una sola vez)
+    try:
+        with open(ARCHIVO_CSV + EXTENSION_SIGUIENTE_ID, encoding='utf-8') as archivo:
+            siguiente, tamano, mtime_ns = (int(valor) for valor in archivo.read().split())
+        estado = os.stat(ARCHIVO_CSV)
+        if (tamano, mtime_ns) == (estado.st_size, estado.st_mtime_ns):
+            return siguiente
+    except (OSError, ValueError):
+        pass
+    return obtener_siguiente_ID(obtener_datos())
+
+def guardar_siguiente_ID(siguiente):
+    #se anota junto con el tamano y la fecha del csv, para saber si despues alguien mas lo modifico
+    estado = os.stat(ARCHIVO_CSV)
+    with open(ARCHIVO_CSV + EXTENSION_SIGUIENTE_ID, 'w', encoding='utf-8') as archivo:
+        archivo.write(f"{siguiente} {estado.st_size} {estado.st_mtime_ns}\n")
+
+@cronometrar("csv.escritura")
+def agregar_registro(registro):
+    #agrega una sola fila al final del csv, sin leer ni reescribir las filas existentes: el proximo id
+    #sale del archivo .id, que se actualiza en cada alta (ver leer_siguiente_ID).
+    #el flush + fsync asegura que la fila quede en disco antes de confirmar al usuario.
+    #el id se asigna con el bloqueo tomado, asi dos personas usando el programa a la vez no repiten id.
+    inicializar_csv()
+    with bloquear_archivo(ARCHIVO_CSV):
+        registro['id'] = str(leer_siguiente_ID())
+        with open(ARCHIVO_CSV, 'a', newline='', encoding='utf-8') as archivo:
+            writer = csv.DictWriter(archivo, fieldnames=CAMPOS)
+            writer.writerow(registro)
+            archivo.flush()
+            os.fsync(archivo.fileno())
+        guardar_siguiente_ID(int(registro['id']) + 1)
+    return registro['id']
+
 #------------------------- funciones CRUD ------------------------------------------
 def crear_registro():
     #solicita los datos y crea un nuevo egistro en el csv.
     inicializar_csv()
 
-    datos = obtener_datos()
-    nuevo_id = obtener_siguiente_ID(datos)
     print("----------insercion de nuevo registro de personas----------")
-    registro = {
-        "id": str(nuevo_id)
-    }
+    registro = {}
     registro['cedula'] = input("Cedula: ")
     registro['nombre'] = input("Nombre: ")
     registro['apellido'] = input("Apellido: ")
@@ -88,57 +153,117 @@ def crear_registro():
     registro['telefono_residencial'] = input ("telefono residencial: ")
     registro['telefono_celular'] = input ("telefono celular: ")
 
-    datos.append(registro)
-
-    with open(ARCHIVO_CSV, 'w', newline='', encoding='utf-8') as archivo:
-        writer =csv.DictWriter(archivo, fieldnames = CAMPOS)
-        writer.writeheader()
-        writer.writerows(datos)
+    nuevo_id = agregar_registro(registro)
 
     print(f'regisro con el id {nuevo_id} creado y guardado con exito.')
 
+def formatear_encabezado():
+    encabezado = FORMATO_FILA.format("ID", "CEDULA", "Nombre", "Apellido", "Sexo ", "Edad")
+    return encabezado + "\n" + "-" * len(encabezado) + "\n"
+
+def formatear_persona(persona):
+    try:
+        return FORMATO_PERSONA.format(
+            persona.get('id', 'N/A'),
+            persona.get('cedula', 'N/A'),
+            persona.get('nombre', 'N/A'),
+            persona.get('apellido', 'N/A'),
+            persona.get('sexo', 'N/A'),
+            persona.get('edad', 'N/A'),
+            persona.get('telefono_celular', 'N/A'),
+            persona.get('direccion', 'N/A'),
+            persona.get('ocupacion', 'N/A'),
+            persona.get('empresa', 'N/A'),
+            persona.get('tipo_contrato', 'N/A'),
+            persona.get('es_asegurado', 'N/A'),
+            persona.get('tipo_sangre', 'N/A'),
+        )
+    except Exception as e:
+        return f"⚠️ Error al leer el registro ID: {persona.get('id', 'desconocido')}. Error: {e}\n"
+
+def formatear_registros(datos):
+    #arma en memoria el texto de toda la pagina: se escribe despues con una sola llamada
+    return formatear_encabezado() + "".join(map(formatear_persona, datos))
+
+@cronometrar("salida.pagina")
+def mostrar_registros(datos, salida=None):
+    #una sola escritura por pagina en vez de ~8 print() por persona
+    salida = salida or sys.stdout
+    salida.write(formatear_registros(datos))
+    salida.flush()
+
+def iterar_bloques_texto(registros):
+    #genera el listado completo en bloques de TAMANO_BLOQUE_SALIDA registros ya formateados
+    yield formatear_encabezado()
+    while True:
+        bloque = list(islice(registros, TAMANO_BLOQUE_SALIDA))
+        if not bloque:
+            return
+        yield "".join(map(formatear_persona, bloque))
+
+def exportar_registros(ruta, registros=None):
+    #vuelca el listado a un archivo de texto: una escritura por bloque, con buffer grande
+    registros = iterar_registros() if registros is None else registros
+    with open(ruta, 'w', encoding='utf-8', buffering=1 << 20) as archivo:
+        for texto in iterar_bloques_texto(registros):
+            archivo.write(texto)
+
+def paginar_registros(registros=None):
+    #muestra el listado completo en el paginador del sistema (less / more, o $PAGER)
+    registros = iterar_registros() if registros is None else registros
+    pydoc.pager("".join(iterar_bloques_texto(registros)))
+
 def leer_registro():
-    datos = obtener_datos()
+    #muestra los registros por paginas: solo se lee del archivo lo que se va mostrando
+    registros = iterar_registros()
+    lote = leer_lote(registros)
     print("\n" + "="*50)
     print("         Mostrar todos los registros")
     print("="*50)
 
 
-    if not datos:
+    if not lote:
         print("❌ No hay registros de personas guardados.")
         print("="*50)
         return
-    
-    encabezado = "{:<5} {:<15} {:<15} {:<15} {:<6} {:<5}".format(
-        "ID", "CEDULA", "Nombre", "Apellido", "Sexo ", "Edad"
-    )
-    separador = "-"* len(encabezado)
-
-    print(encabezado)
-    print(separador)
-
-    for persona in datos:
-        try:
-            fila = "{:<5} {:<15} {:<15} {:<15} {:<6} {:<5}".format(
-                persona.get('id', 'N/A'),
-                persona.get('cedula', 'N/A'),
-                persona.get('nombre', 'N/A'),
-                persona.get('apellido', 'N/A'),
-                persona.get('sexo', 'N/A'),
-                persona.get('edad', 'N/A'),
-            )
-            print(fila)
-           
-            print(f"telfono: {persona.get('telefono_celular', 'N/A' )}")
-            print(f"Direccion: {persona.get( 'direccion', 'N/A' )}")
-            print(f"ocupacion: {persona.get('ocupacion', 'N/A' )}")
-            print(f"empresa: {persona.get('empresa', 'N/A' )}")
-            print(f"tipo de contrato: {persona.get('tipo_contrato', 'N/A')}")
-            print(f"¿es asegurado si/no?: {persona.get('es_asegurado', 'N/A')}") 
-            print(f"tipo de sangre: {persona.get('tipo_sangre', 'N/A')}")
-
-        except Exception as e:
-            print(f"⚠️ Error al leer el registro ID: {persona.get('id', 'desconocido')}. Error: {e}")
+
+    pagina = 1
+    while True:
+        mostrar_registros(lote)
+
+        if len(lote) < TAMANO_PAGINA:
+            break
+
+        print(f"--- página {pagina} ---")
+        opcion = input("[Enter] siguiente página, 'p N' ir a la página N, 'd ID' continuar desde el ID, "
+                       "'v' ver el resto en el paginador, 'a ARCHIVO' guardar el resto en un archivo, 's' salir: ").strip()
+
+        if opcion.lower() == "v":
+            paginar_registros(registros)
+            break
+        elif opcion.lower().startswith("a ") and opcion[2:].strip():
+            ruta = opcion[2:].strip()
+            exportar_registros(ruta, registros)
+            print(f"✅ Registros guardados en '{ruta}'.")
+            break
+
+        opcion = opcion.lower()
+        if opcion == "s":
+            break
+        elif opcion.startswith("p ") and opcion[2:].strip().isdigit():
+            pagina = max(int(opcion[2:].strip()), 1)
+            registros = islice(iterar_registros(), (pagina - 1) * TAMANO_PAGINA, None)
+        elif opcion.startswith("d "):
+            registros = iterar_registros(opcion[2:].strip())
+            pagina = 1
+        else:
+            pagina += 1
+
+        lote = leer_lote(registros)
+        if not lote:
+            print("ℹ️ No hay más registros.")
+            break
+
     print("\✅ Lectura de registro completada.")
 
 def actualizar_registro():
@@ -0,0 +1 @@
+"""Utilidades compartidas por los programas de registro de personas."""
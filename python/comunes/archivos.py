@@ -0,0 +1,51 @@
+"""Escritura segura de archivos compartidos entre varios procesos."""
+
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None
+    import msvcrt
+
+EXTENSION_BLOQUEO = ".lock"
+
+
+@contextmanager
+def bloquear_archivo(ruta: str):
+    """Bloqueo exclusivo (advisory) sobre ruta + '.lock' mientras dura el bloque with.
+
+    Todos los procesos que escriben el mismo archivo deben pedir este bloqueo; los lectores no.
+    """
+    with open(ruta + EXTENSION_BLOQUEO, 'a+b') as candado:
+        if fcntl is not None:
+            fcntl.flock(candado.fileno(), fcntl.LOCK_EX)
+        else:
+            candado.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(candado.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK se rinde tras ~10 segundos: se vuelve a intentar
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(candado.fileno(), fcntl.LOCK_UN)
+            else:
+                candado.seek(0)
+                msvcrt.locking(candado.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def reemplazar_atomico(temporal: str, destino: str) -> None:
+    """Reemplaza destino por temporal (ya escrito y con fsync) sin que nadie vea un archivo a medias."""
+    os.replace(temporal, destino)
+    if hasattr(os, 'O_DIRECTORY'):
+        # en posix tambien hay que sincronizar el directorio para que el cambio de nombre sea durable
+        directorio = os.open(os.path.dirname(os.path.abspath(destino)), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(directorio)
+        finally:
+            os.close(directorio)
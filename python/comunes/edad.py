@@ -0,0 +1,64 @@
+"""Calculo de edades compartido por los programas de registro de personas."""
+
+import time
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+# cantidad de fechas de nacimiento distintas que se recuerdan
+TAMANO_CACHE_EDADES = 65536
+
+_hoy: date | None = None
+_fin_del_dia = 0.0  # momento (time.time()) en que hay que volver a preguntar la fecha
+
+
+def hoy() -> date:
+    """Fecha de hoy; se consulta al sistema una sola vez por dia."""
+    global _hoy, _fin_del_dia
+    ahora = time.time()
+    if _hoy is None or ahora >= _fin_del_dia:
+        _hoy = date.today()
+        _fin_del_dia = datetime.combine(_hoy + timedelta(days=1), datetime.min.time()).timestamp()
+    return _hoy
+
+
+def parsear_fecha(texto: str) -> date | None:
+    """Convierte 'YYYY-MM-DD' en date sin pasar por strptime (mucho mas rapido); None si no es valida."""
+    if len(texto) == 10 and texto[4] == '-' and texto[7] == '-':
+        anio, mes, dia = texto[:4], texto[5:7], texto[8:]
+        if anio.isdigit() and mes.isdigit() and dia.isdigit():
+            try:
+                return date(int(anio), int(mes), int(dia))
+            except ValueError:
+                return None
+    # formatos que strptime acepta aunque no sean ISO estricto (ej. 2000-1-5)
+    try:
+        return datetime.strptime(texto, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+
+def edad_en(fecha_nacimiento: date, fecha: date) -> int:
+    """Edad cumplida en la fecha indicada."""
+    edad = fecha.year - fecha_nacimiento.year
+    if (fecha.month, fecha.day) < (fecha_nacimiento.month, fecha_nacimiento.day):
+        edad -= 1
+    return edad
+
+
+@lru_cache(maxsize=TAMANO_CACHE_EDADES)
+def _edad_cacheada(fecha_nacimiento_str: str, fecha: date) -> int | None:
+    # la fecha de hoy es parte de la clave: al cambiar el dia, las entradas viejas dejan de usarse
+    fecha_nacimiento = parsear_fecha(fecha_nacimiento_str)
+    if fecha_nacimiento is None:
+        return None
+    return edad_en(fecha_nacimiento, fecha)
+
+
+def calcular_edad(fecha_nacimiento_str: str) -> int | None:
+    """Calcula la edad a partir de una fecha de nacimiento (YYYY-MM-DD); None si la fecha no es valida."""
+    return _edad_cacheada(fecha_nacimiento_str, hoy())
+
+
+def estadisticas_cache():
+    """Aciertos, fallos y tamano actual de la cache de edades."""
+    return _edad_cacheada.cache_info()
@@ -0,0 +1,194 @@
+"""Medicion de tiempos por operacion (carga, parseo, indice, escritura, llamadas remotas).
+
+Cada operacion medida con `medir(nombre)` o `@cronometrar(nombre)` suma a un histograma de
+duraciones; `contar(nombre)` lleva contadores simples. Se configura con variables de entorno:
+
+    METRICAS_ARCHIVO=metricas.json   al salir del programa se exporta ahi (.json, o texto Prometheus
+                                     con cualquier otra extension, ej. metricas.prom)
+    METRICAS_PERFIL=perfiles/        ademas guarda un perfil cProfile (.prof) por operacion
+    METRICAS_PERFIL_OPERACIONES=a,b  limita el perfil a esas operaciones
+"""
+
+import atexit
+import cProfile
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Iterator
+
+# limites (en segundos) de los buckets del histograma, como los de un cliente Prometheus
+LIMITES_HISTOGRAMA = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PREFIJO_PROMETHEUS = "registro"
+
+
+class Histograma:
+    """Cantidad, suma, maximo y conteo por bucket de las duraciones de una operacion."""
+
+    __slots__ = ("cantidad", "suma", "maximo", "buckets")
+
+    def __init__(self) -> None:
+        self.cantidad = 0
+        self.suma = 0.0
+        self.maximo = 0.0
+        self.buckets = [0] * (len(LIMITES_HISTOGRAMA) + 1)  # el ultimo es +Inf
+
+    def observar(self, segundos: float) -> None:
+        self.cantidad += 1
+        self.suma += segundos
+        if segundos > self.maximo:
+            self.maximo = segundos
+        for posicion, limite in enumerate(LIMITES_HISTOGRAMA):
+            if segundos <= limite:
+                break
+        else:
+            posicion = len(LIMITES_HISTOGRAMA)
+        self.buckets[posicion] += 1
+
+    def como_dict(self) -> dict:
+        acumulado = 0
+        buckets = {}
+        for limite, cantidad in zip(LIMITES_HISTOGRAMA + ("+Inf",), self.buckets):
+            acumulado += cantidad
+            buckets[str(limite)] = acumulado
+        return {
+            "cantidad": self.cantidad,
+            "suma_s": self.suma,
+            "promedio_s": self.suma / self.cantidad if self.cantidad else 0.0,
+            "maximo_s": self.maximo,
+            "buckets": buckets,
+        }
+
+
+class RegistroMetricas:
+    """Contadores e histogramas de un programa; seguro para usar desde varios hilos."""
+
+    def __init__(self) -> None:
+        self.contadores: dict[str, int] = {}
+        self.histogramas: dict[str, Histograma] = {}
+        self.candado = threading.Lock()
+        self.directorio_perfil: str | None = None
+        self.operaciones_perfil: set[str] | None = None  # None = todas
+        self.perfiles: dict[str, cProfile.Profile] = {}
+        self._perfilando = threading.local()
+
+    def contar(self, nombre: str, cantidad: int = 1) -> None:
+        with self.candado:
+            self.contadores[nombre] = self.contadores.get(nombre, 0) + cantidad
+
+    def observar(self, nombre: str, segundos: float) -> None:
+        with self.candado:
+            histograma = self.histogramas.get(nombre)
+            if histograma is None:
+                histograma = self.histogramas[nombre] = Histograma()
+            histograma.observar(segundos)
+
+    def activar_perfil(self, directorio: str, operaciones: list[str] | None = None) -> None:
+        """Guarda un perfil cProfile por operacion en `directorio` (solo las indicadas, si se pasan)."""
+        self.directorio_perfil = directorio
+        self.operaciones_perfil = set(operaciones) if operaciones else None
+
+    def _perfil_para(self, nombre: str) -> cProfile.Profile | None:
+        # solo se perfila la operacion mas externa: cProfile no admite dos perfiles activos a la vez
+        if self.directorio_perfil is None or getattr(self._perfilando, "activo", False):
+            return None
+        if self.operaciones_perfil is not None and nombre not in self.operaciones_perfil:
+            return None
+        with self.candado:
+            return self.perfiles.setdefault(nombre, cProfile.Profile())
+
+    @contextmanager
+    def medir(self, nombre: str) -> Iterator[None]:
+        """Mide la duracion del bloque with y la suma al histograma `nombre` (y cuenta los errores)."""
+        perfil = self._perfil_para(nombre)
+        if perfil is not None:
+            self._perfilando.activo = True
+            perfil.enable()
+        inicio = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.contar(nombre + ".errores")
+            raise
+        finally:
+            self.observar(nombre, time.perf_counter() - inicio)
+            if perfil is not None:
+                perfil.disable()
+                self._perfilando.activo = False
+
+    def cronometrar(self, nombre: str) -> Callable:
+        """Decorador: cada llamada a la funcion se mide como la operacion `nombre`."""
+        def decorador(funcion: Callable) -> Callable:
+            @wraps(funcion)
+            def envoltura(*args, **kwargs):
+                with self.medir(nombre):
+                    return funcion(*args, **kwargs)
+            return envoltura
+        return decorador
+
+    # ------------------------- exportacion ------------------------------------
+
+    def como_dict(self) -> dict:
+        with self.candado:
+            return {
+                "contadores": dict(self.contadores),
+                "histogramas": {nombre: h.como_dict() for nombre, h in self.histogramas.items()},
+            }
+
+    def como_prometheus(self) -> str:
+        """Texto en el formato de exposicion de Prometheus."""
+        datos = self.como_dict()
+        lineas = []
+        if datos["contadores"]:
+            metrica = f"{PREFIJO_PROMETHEUS}_eventos_total"
+            lineas.append(f"# TYPE {metrica} counter")
+            for nombre, valor in sorted(datos["contadores"].items()):
+                lineas.append(f'{metrica}{{evento="{nombre}"}} {valor}')
+        if datos["histogramas"]:
+            metrica = f"{PREFIJO_PROMETHEUS}_operacion_segundos"
+            lineas.append(f"# TYPE {metrica} histogram")
+            for nombre, histograma in sorted(datos["histogramas"].items()):
+                for limite, cantidad in histograma["buckets"].items():
+                    lineas.append(f'{metrica}_bucket{{operacion="{nombre}",le="{limite}"}} {cantidad}')
+                lineas.append(f'{metrica}_sum{{operacion="{nombre}"}} {histograma["suma_s"]}')
+                lineas.append(f'{metrica}_count{{operacion="{nombre}"}} {histograma["cantidad"]}')
+        return "\n".join(lineas) + "\n"
+
+    def exportar(self, ruta: str) -> None:
+        """Escribe las metricas en `ruta`: JSON si termina en .json, si no texto Prometheus."""
+        if ruta.lower().endswith(".json"):
+            texto = json.dumps(self.como_dict(), indent=2, ensure_ascii=False)
+        else:
+            texto = self.como_prometheus()
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            archivo.write(texto)
+        os.replace(temporal, ruta)
+        self.guardar_perfiles()
+
+    def guardar_perfiles(self) -> None:
+        """Guarda cada perfil cProfile en directorio_perfil/<operacion>.prof (se abre con pstats o snakeviz)."""
+        if self.directorio_perfil is None:
+            return
+        os.makedirs(self.directorio_perfil, exist_ok=True)
+        for nombre, perfil in list(self.perfiles.items()):
+            perfil.dump_stats(os.path.join(self.directorio_perfil, f"{nombre}.prof"))
+
+
+# registro por defecto del proceso: es el que usan los tres programas CRUD
+metricas = RegistroMetricas()
+medir = metricas.medir
+cronometrar = metricas.cronometrar
+contar = metricas.contar
+
+if os.environ.get("METRICAS_PERFIL"):
+    operaciones = os.environ.get("METRICAS_PERFIL_OPERACIONES")
+    metricas.activar_perfil(os.environ["METRICAS_PERFIL"], operaciones.split(",") if operaciones else None)
+
+if os.environ.get("METRICAS_ARCHIVO"):
+    atexit.register(metricas.exportar, os.environ["METRICAS_ARCHIVO"])
+else:
+    # sin archivo de metricas igual se guardan los perfiles al salir (si se pidieron)
+    atexit.register(metricas.guardar_perfiles)
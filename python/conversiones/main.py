@@ -1,4 +1,3 @@
-import pandas as pd
 import json
 import sqlite3
 import os
@@ -7,41 +6,53 @@ import sys # Se usa para manejar la terminación del programa
 
 # --- Funciones de Conversión de Datos ---
 
+def _pandas():
+    """Importa pandas recién cuando se hace una conversión (tarda bastante en cargarse)."""
+    import pandas as pd
+    return pd
+
 def csv_a_json(nombre_csv, nombre_json):
     """Convierte un archivo CSV a un archivo JSON."""
     if not os.path.exists(nombre_csv):
         print(f"\n❌ Error: El archivo de entrada '{nombre_csv}' no fue encontrado.")
-        return
+        return False
     try:
+        pd = _pandas()
         df = pd.read_csv(nombre_csv)
         datos_json = df.to_json(orient='records', indent=4)
         with open(nombre_json, 'w', encoding='utf-8') as f:
             f.write(datos_json)
         print(f"\n✅ Conversión exitosa: '{nombre_csv}' -> '{nombre_json}'")
+        return True
     except Exception as e:
         print(f"\n❌ Ocurrió un error en CSV a JSON: {e}")
+        return False
 
 def csv_a_sql(nombre_csv, nombre_db, nombre_tabla):
     """Convierte un archivo CSV a una tabla SQL dentro de una base de datos SQLite."""
     if not os.path.exists(nombre_csv):
         print(f"\n❌ Error: El archivo de entrada '{nombre_csv}' no fue encontrado.")
-        return
+        return False
     try:
+        pd = _pandas()
         df = pd.read_csv(nombre_csv)
         conn = sqlite3.connect(nombre_db)
         df.to_sql(nombre_tabla, conn, if_exists='replace', index=False)
         conn.commit()
         conn.close()
         print(f"\n✅ Conversión exitosa: '{nombre_csv}' -> Tabla '{nombre_tabla}' en '{nombre_db}'")
+        return True
     except Exception as e:
         print(f"\n❌ Ocurrió un error en CSV a SQL: {e}")
+        return False
 
 def json_a_sql(nombre_json, nombre_db, nombre_tabla):
     """Convierte un archivo JSON (lista de objetos) a una tabla SQL en SQLite."""
     if not os.path.exists(nombre_json):
         print(f"\n❌ Error: El archivo de entrada '{nombre_json}' no fue encontrado.")
-        return
+        return False
     try:
+        pd = _pandas()
         with open(nombre_json, 'r', encoding='utf-8') as f:
             datos = json.load(f)
         df = pd.DataFrame(datos)
@@ -50,22 +61,27 @@ def json_a_sql(nombre_json, nombre_db, nombre_tabla):
         conn.commit()
         conn.close()
         print(f"\n✅ Conversión exitosa: '{nombre_json}' -> Tabla '{nombre_tabla}' en '{nombre_db}'")
+        return True
     except Exception as e:
         print(f"\n❌ Ocurrió un error en JSON a SQL: {e}")
+        return False
 
 def json_a_csv(nombre_json, nombre_csv):
     """Convierte un archivo JSON (lista de objetos) a un archivo CSV."""
     if not os.path.exists(nombre_json):
         print(f"\n❌ Error: El archivo de entrada '{nombre_json}' no fue encontrado.")
-        return
+        return False
     try:
+        pd = _pandas()
         with open(nombre_json, 'r', encoding='utf-8') as f:
             datos = json.load(f)
         df = pd.DataFrame(datos)
         df.to_csv(nombre_csv, index=False, encoding='utf-8')
         print(f"\n✅ Conversión exitosa: '{nombre_json}' -> '{nombre_csv}'")
+        return True
     except Exception as e:
         print(f"\n❌ Ocurrió un error en JSON a CSV: {e}")
+        return False
 
 # --- Nueva Función para Creación Interactiva ---
 
@@ -0,0 +1,235 @@
+import os
+
+from comunes.archivos import bloquear_archivo, reemplazar_atomico
+from comunes.metricas import contar, cronometrar
+from diario import DiarioEscritura
+from formato import formato_para
+from indice import IndiceRegistro, PREFIJO_BORRADO, formatear_fila
+from persona import Persona
+from trigramas import LIMITE_RESULTADOS
+
+# cuando la proporcion de filas muertas (versiones viejas y lapidas) supera este valor se compacta el csv
+UMBRAL_COMPACTACION = 0.3
+MINIMO_FILAS_MUERTAS = 100
+# los registros encolados se escriben juntos (una sola escritura y un solo fsync) al llegar a esta cantidad
+TAMANO_GRUPO = 500
+
+
+class AlmacenCSV:
+    """Guarda los registros en un csv de solo-agregar, con un indice .idx (y sus secundarios .sec) al lado.
+
+    Los registros se devuelven como Persona (ver persona.py), no como dict.
+    Varios procesos pueden escribir el mismo csv: cada escritura toma el bloqueo ruta + '.lock'
+    y antes de escribir pone el indice al dia con lo que hayan agregado los demas.
+    Cada escritura se anota antes en el diario ruta + '.wal' (ver diario.py), que se usa para
+    recuperar el csv si el programa se corta a mitad de una escritura.
+    Si la ruta termina en .gz o .xz el csv se guarda comprimido (ver formato.py).
+    """
+
+    def __init__(self, ruta, campos):
+        self.ruta = ruta
+        self.campos = campos
+        self.indice = None  # se carga la primera vez que se necesita
+        self.cola = []      # inserciones pendientes de confirmar (ver encolar)
+        self.formato = formato_para(ruta)
+        self.diario = DiarioEscritura(ruta, self.formato)
+        self.recuperado = False  # la recuperacion desde el diario se hace una vez, al empezar
+        self.escribio = False    # al cerrar solo se hace checkpoint si este proceso escribio algo
+
+    # ------------------------- auxiliares -------------------------------------
+
+    def inicializar(self):
+        if not os.path.exists(self.ruta):
+            with open(self.ruta, 'wb') as archivo:
+                archivo.write(self.formato.cabecera(self.campos))
+                print(f"archivo '{self.ruta}' creado con exito.")
+        if not self.recuperado:
+            self.recuperar()
+
+    def recuperar(self):
+        #aplica lo que haya quedado en el diario de una ejecucion que se corto a mitad de una escritura
+        with bloquear_archivo(self.ruta):
+            # en un archivo comprimido la cola se revisa desde lo ya indexado, no desde el principio
+            desde = self.obtener_indice().tamano if self.formato.comprimido else 0
+            reaplicadas = self.diario.recuperar(desde)
+        self.recuperado = True
+        if reaplicadas:
+            print(f"se recuperaron {reaplicadas} escrituras pendientes del diario de '{self.ruta}'.")
+        return reaplicadas
+
+    def obtener_indice(self):
+        #carga el indice id -> offset del archivo .idx (o lo reconstruye si falta o esta desactualizado)
+        if self.indice is None:
+            self.indice = IndiceRegistro(self.ruta, self.campos).cargar()
+        else:
+            self.indice.poner_al_dia()
+        return self.indice
+
+    def cerrar(self):
+        #una lectura (get, list, search) no toca el disco al cerrar: solo se guarda lo que cambio
+        self.confirmar()
+        if self.escribio and os.path.exists(self.ruta):
+            with bloquear_archivo(self.ruta):
+                self.diario.checkpoint()
+        if self.indice is not None and self.indice.modificado():
+            self.indice.guardar()
+
+    @cronometrar("csv.escritura")
+    def _agregar_filas(self, registros, asignar_ids=False):
+        #agrega filas al final del csv, sin leer ni reescribir las filas existentes.
+        #el lote se anota antes en el diario (con un solo fsync, sobre el diario): si el programa se corta,
+        #la recuperacion lo vuelve a aplicar. el csv se sincroniza recien en el checkpoint.
+        self.inicializar()
+        with bloquear_archivo(self.ruta):
+            # con el bloqueo tomado, el indice ve todo lo que escribieron los otros procesos,
+            # asi que los ids nuevos no se repiten
+            idx = self.obtener_indice()
+            if os.path.getsize(self.ruta) != idx.tamano:
+                # el csv termina en una fila a medias (una escritura de otro proceso que se corto):
+                # se repara desde el diario antes de agregar nada, para no pegar la fila nueva a esa
+                self.diario.recuperar(idx.tamano)
+                idx = self.obtener_indice()
+            if asignar_ids:
+                siguiente = idx.siguiente_id
+                for registro in registros:
+                    if not registro.get('id'):
+                        registro['id'] = str(siguiente)
+                        siguiente += 1
+
+            filas = [formatear_fila(registro, self.campos) for registro in registros]
+            with open(self.ruta, 'ab') as archivo:
+                inicio = archivo.seek(0, os.SEEK_END)
+                datos, posiciones = self.formato.codificar(filas, inicio)
+                tamano_diario = self.diario.registrar(inicio, datos)
+                archivo.write(datos)
+            idx.registrar_lote(registros, posiciones)
+            self.escribio = True
+            if self.diario.checkpoint_si_conviene(tamano_diario):
+                # el indice completo se reescribe junto con el checkpoint: su costo crece con el registro,
+                # asi que no se paga en cada escritura (si el programa se corta, se pone al dia con la cola)
+                idx.guardar()
+        contar("csv.filas_escritas", len(filas))
+
+    # ------------------------- escritura --------------------------------------
+
+    def siguiente_id(self):
+        #el proximo ID se guarda en el indice, asi no hay que recorrer todos los registros
+        return self.obtener_indice().siguiente_id
+
+    def crear(self, registro):
+        return self.crear_varios([registro])[0]
+
+    def crear_varios(self, registros):
+        #asigna ids consecutivos a los registros que no traen uno y los agrega en una sola escritura
+        nuevos = [dict(registro) for registro in registros]
+        self._agregar_filas(nuevos, asignar_ids=True)
+        return [registro['id'] for registro in nuevos]
+
+    def encolar(self, registro):
+        #group commit: la insercion queda pendiente y se escribe junto con las demas del grupo
+        self.cola.append(registro)
+        if len(self.cola) >= TAMANO_GRUPO:
+            self.confirmar()
+
+    def confirmar(self):
+        #escribe todas las inserciones encoladas con un solo bloqueo, una sola escritura y un solo fsync
+        if not self.cola:
+            return []
+        pendientes, self.cola = self.cola, []
+        return self.crear_varios(pendientes)
+
+    def actualizar(self, registro):
+        #guarda la nueva version del registro al final del csv (la anterior queda como fila muerta)
+        if not self.existe(registro['id']):
+            return False
+        self._agregar_filas([registro])
+        self.compactar_si_conviene()
+        return True
+
+    def actualizar_varios(self, registros):
+        #todas las nuevas versiones se agregan en una sola escritura
+        self._agregar_filas(list(registros))
+        self.compactar_si_conviene()
+
+    def eliminar(self, id_registro):
+        #en vez de reescribir el archivo, se agrega una lapida ("-ID") al final del csv
+        if not self.existe(id_registro):
+            return False
+        self._agregar_filas([{"id": PREFIJO_BORRADO + str(id_registro)}])
+        self.compactar_si_conviene()
+        return True
+
+    # ------------------------- lectura ----------------------------------------
+
+    def existe(self, id_registro):
+        return self.obtener_indice().existe(id_registro)
+
+    def contar(self):
+        return len(self.obtener_indice().offsets)
+
+    def obtener(self, id_registro):
+        #busca un registro leyendo solo su fila gracias al offset guardado en el indice
+        valores = self.obtener_indice().obtener_valores(id_registro)
+        return Persona.desde_valores(valores) if valores is not None else None
+
+    def iterar(self, desde_id=None):
+        #generador: produce un registro a la vez sin cargar el archivo completo en memoria,
+        #en orden de id como sqlite (un registro actualizado no pasa al final del listado).
+        #con desde_id se continua con el primer id mayor, aunque ese registro ya no exista.
+        if desde_id is not None and not str(desde_id).strip().isdigit():
+            return
+        for valores in self.obtener_indice().iterar_por_id(desde_id):
+            yield Persona.desde_valores(valores)
+
+    def buscar_por_cedula(self, cedula):
+        #busqueda exacta en el indice hash de cedula: no recorre el archivo
+        idx = self.obtener_indice()
+        return [self.obtener(id_registro) for id_registro in idx.buscar_exacto('cedula', cedula)]
+
+    def existe_cedula(self, cedula):
+        return bool(self.obtener_indice().buscar_exacto('cedula', cedula))
+
+    def buscar_por_prefijo(self, campo, prefijo):
+        #busqueda por prefijo (apellido o empresa) en el indice ordenado: O(log n + k)
+        idx = self.obtener_indice()
+        return [self.obtener(id_registro) for id_registro in idx.buscar_prefijo(campo, prefijo)]
+
+    def buscar_similares(self, texto, limite=LIMITE_RESULTADOS):
+        #busqueda aproximada por nombre y apellido en el indice de trigramas: [(persona, puntaje)]
+        idx = self.obtener_indice()
+        return [(self.obtener(id_registro), puntaje) for id_registro, puntaje in idx.buscar_similares(texto, limite)]
+
+    def agregados(self):
+        #conteos por valor que el indice mantiene al dia en cada escritura: no recorre el archivo
+        return self.obtener_indice().agregados()
+
+    # ------------------------- mantenimiento ----------------------------------
+
+    def filas_muertas(self):
+        return self.obtener_indice().filas_muertas()
+
+    @cronometrar("csv.compactacion")
+    def compactar(self):
+        #reescribe el csv solo con la version vigente de cada registro, en orden de id, en un archivo temporal
+        #que luego reemplaza al original, y vuelve a indexarlo (los offsets cambian)
+        #el bloqueo evita que otro proceso agregue filas al archivo viejo mientras se copia
+        with bloquear_archivo(self.ruta):
+            # lo que esta en el diario se refiere a offsets del archivo viejo: primero se vuelca
+            self.diario.checkpoint()
+            idx = self.obtener_indice()
+            filas_muertas = idx.filas_muertas()
+            siguiente_id = idx.siguiente_id
+            temporal = self.ruta + ".tmp"
+            with open(temporal, 'wb') as archivo:
+                self.formato.escribir(archivo, self.campos, idx.iterar_por_id())
+                archivo.flush()
+                os.fsync(archivo.fileno())
+            reemplazar_atomico(temporal, self.ruta)
+            idx.reconstruir(siguiente_id_minimo=siguiente_id)
+        return filas_muertas
+
+    def compactar_si_conviene(self):
+        #compacta solo cuando hay suficientes filas muertas, asi cada edicion sigue siendo una sola escritura
+        idx = self.obtener_indice()
+        if idx.filas_muertas() >= MINIMO_FILAS_MUERTAS and idx.proporcion_muertas() > UMBRAL_COMPACTACION:
+            self.compactar()
@@ -0,0 +1,316 @@
+import os
+import sqlite3
+
+from comunes.metricas import contar, cronometrar
+from persona import Persona
+from trigramas import LIMITE_RESULTADOS, buscar_personas, minimo_comunes, palabras, plegar_texto, trigramas, variantes
+
+TABLA = "personas"
+# campos con indice secundario (el id ya esta indexado por ser la clave primaria). Se indexa una columna
+# "<campo>_clave" con el valor sin mayusculas ni acentos (trigramas.plegar_texto, igual que en el indice
+# del csv), que calcula python en cada escritura: COLLATE NOCASE solo pliega las mayusculas ASCII
+CAMPOS_INDEXADOS = ["cedula", "apellido", "empresa"]
+# campos con busqueda por prefijo
+CAMPOS_PREFIJO = ["apellido", "empresa"]
+# las inserciones encoladas se confirman juntas al llegar a esta cantidad
+TAMANO_GRUPO = 500
+# campos con conteo por valor (para los reportes), mantenido por triggers en cada alta, cambio y baja
+CAMPOS_AGREGADOS = ["empresa", "tipo_contrato", "es_asegurado", "tipo_sangre", "edad"]
+TABLA_AGREGADOS = "agregados"
+# palabra del nombre o apellido -> id, y trigrama -> palabra, para la busqueda aproximada
+# (las mantiene python en cada escritura, ver _indexar_nombre)
+TABLA_PALABRAS = "palabras"
+TABLA_TRIGRAMAS = "trigramas"
+
+
+class AlmacenSQLite:
+    """Guarda los registros en una base SQLite (modo WAL) con la misma interfaz que AlmacenCSV."""
+
+    def __init__(self, ruta, campos):
+        self.ruta = ruta
+        self.campos = campos
+        self.conexion = None
+        self.cola = []  # inserciones pendientes de confirmar (ver encolar)
+        columnas = campos[1:] + [f"{campo}_clave" for campo in CAMPOS_INDEXADOS]  # el id lo asigna SQLite
+        lista_campos = ", ".join(campos)
+        # las consultas se arman una sola vez: sqlite3 guarda en cache la sentencia preparada
+        # de cada texto SQL, asi que reutilizar el mismo texto evita volver a compilarla
+        self.sql_insertar = f"INSERT INTO {TABLA} (id, {', '.join(columnas)}) VALUES (?, {', '.join('?' for _ in columnas)})"
+        self.sql_actualizar = f"UPDATE {TABLA} SET {', '.join(f'{c} = ?' for c in columnas)} WHERE id = ?"
+        self.sql_eliminar = f"DELETE FROM {TABLA} WHERE id = ?"
+        self.sql_obtener = f"SELECT {lista_campos} FROM {TABLA} WHERE id = ?"
+        self.sql_iterar = f"SELECT {lista_campos} FROM {TABLA} WHERE id > ? ORDER BY id"
+        self.sql_cedula = f"SELECT {lista_campos} FROM {TABLA} WHERE cedula_clave = ? ORDER BY id"
+        self.sql_existe_cedula = f"SELECT 1 FROM {TABLA} WHERE cedula_clave = ? LIMIT 1"
+        self.sql_agregados = f"SELECT campo, valor, cantidad FROM {TABLA_AGREGADOS} WHERE cantidad > 0"
+        self.sql_insertar_palabra = f"INSERT OR IGNORE INTO {TABLA_PALABRAS} (palabra, id) VALUES (?, ?)"
+        self.sql_eliminar_palabras = f"DELETE FROM {TABLA_PALABRAS} WHERE id = ?"
+        self.sql_existe_palabra = f"SELECT 1 FROM {TABLA_PALABRAS} WHERE palabra = ? LIMIT 1"
+        self.sql_ids_palabra = f"SELECT id FROM {TABLA_PALABRAS} WHERE palabra = ?"
+        self.sql_insertar_trigrama = f"INSERT OR IGNORE INTO {TABLA_TRIGRAMAS} (trigrama, palabra) VALUES (?, ?)"
+        self.sql_prefijo = {
+            campo: f"SELECT {lista_campos} FROM {TABLA} WHERE {campo}_clave >= ? AND {campo}_clave < ? "
+                   f"ORDER BY {campo}_clave, id"
+            for campo in CAMPOS_PREFIJO
+        }
+
+    # ------------------------- auxiliares -------------------------------------
+
+    def inicializar(self):
+        if self.conexion is not None:
+            return
+        nueva = not os.path.exists(self.ruta)
+        self.conexion = sqlite3.connect(self.ruta, timeout=30)
+        # WAL: los lectores no bloquean al escritor ni el escritor a los lectores
+        self.conexion.execute("PRAGMA journal_mode=WAL")
+        self.conexion.execute("PRAGMA synchronous=NORMAL")
+
+        columnas = ", ".join(f"{campo} TEXT" for campo in self.campos[1:])
+        with self.conexion:
+            self.conexion.execute(f"CREATE TABLE IF NOT EXISTS {TABLA} (id INTEGER PRIMARY KEY AUTOINCREMENT, {columnas})")
+            self._crear_claves()
+            self._crear_agregados()
+            self._crear_trigramas()
+        if nueva:
+            print(f"base de datos '{self.ruta}' creada con exito.")
+
+    def _crear_claves(self):
+        #columnas <campo>_clave con su indice; una base creada antes de tenerlas se completa en una pasada
+        existentes = {fila[1] for fila in self.conexion.execute(f"PRAGMA table_info({TABLA})")}
+        faltantes = [campo for campo in CAMPOS_INDEXADOS if f"{campo}_clave" not in existentes]
+        for campo in faltantes:
+            self.conexion.execute(f"ALTER TABLE {TABLA} ADD COLUMN {campo}_clave TEXT")
+            # el indice sobre el valor original ya no lo usa ninguna consulta
+            self.conexion.execute(f"DROP INDEX IF EXISTS idx_{TABLA}_{campo}")
+        if faltantes:
+            filas = self.conexion.execute(f"SELECT id, {', '.join(faltantes)} FROM {TABLA}").fetchall()
+            self.conexion.executemany(
+                f"UPDATE {TABLA} SET {', '.join(f'{campo}_clave = ?' for campo in faltantes)} WHERE id = ?",
+                ([plegar_texto(valor or '') for valor in valores] + [id_registro] for id_registro, *valores in filas))
+        for campo in CAMPOS_INDEXADOS:
+            self.conexion.execute(f"CREATE INDEX IF NOT EXISTS idx_{TABLA}_{campo}_clave ON {TABLA} ({campo}_clave)")
+
+    def _crear_agregados(self):
+        #tabla campo/valor/cantidad que los triggers mantienen al dia: los reportes no recorren la tabla
+        existe = self.conexion.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (TABLA_AGREGADOS,)).fetchone()
+        if existe:
+            return
+        self.conexion.execute(
+            f"CREATE TABLE {TABLA_AGREGADOS} (campo TEXT, valor TEXT, cantidad INTEGER, PRIMARY KEY (campo, valor)) WITHOUT ROWID")
+
+        def sumar(fila):
+            return "".join(
+                f"INSERT INTO {TABLA_AGREGADOS} VALUES ('{campo}', COALESCE(TRIM({fila}.{campo}), ''), 1) "
+                f"ON CONFLICT (campo, valor) DO UPDATE SET cantidad = cantidad + 1; "
+                for campo in CAMPOS_AGREGADOS)
+
+        def restar(fila):
+            return "".join(
+                f"UPDATE {TABLA_AGREGADOS} SET cantidad = cantidad - 1 "
+                f"WHERE campo = '{campo}' AND valor = COALESCE(TRIM({fila}.{campo}), ''); "
+                for campo in CAMPOS_AGREGADOS)
+
+        self.conexion.execute(f"CREATE TRIGGER {TABLA}_agregados_alta AFTER INSERT ON {TABLA} BEGIN {sumar('NEW')} END")
+        self.conexion.execute(f"CREATE TRIGGER {TABLA}_agregados_baja AFTER DELETE ON {TABLA} BEGIN {restar('OLD')} END")
+        self.conexion.execute(
+            f"CREATE TRIGGER {TABLA}_agregados_cambio AFTER UPDATE ON {TABLA} BEGIN {restar('OLD')} {sumar('NEW')} END")
+        # una base que ya tenia registros: los conteos iniciales salen de una sola pasada por campo
+        for campo in CAMPOS_AGREGADOS:
+            self.conexion.execute(
+                f"INSERT INTO {TABLA_AGREGADOS} SELECT '{campo}', COALESCE(TRIM({campo}), ''), COUNT(*) "
+                f"FROM {TABLA} GROUP BY 2")
+
+    def _crear_trigramas(self):
+        #las palabras y sus trigramas se calculan en python (plegar acentos no se puede hacer en SQL), asi que
+        #no hay triggers: crear, actualizar y eliminar mantienen las tablas en la misma transaccion
+        existe = self.conexion.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (TABLA_PALABRAS,)).fetchone()
+        if existe:
+            return
+        self.conexion.execute(
+            f"CREATE TABLE {TABLA_PALABRAS} (palabra TEXT, id INTEGER, PRIMARY KEY (palabra, id)) WITHOUT ROWID")
+        self.conexion.execute(f"CREATE INDEX idx_{TABLA_PALABRAS}_id ON {TABLA_PALABRAS} (id)")
+        self.conexion.execute(
+            f"CREATE TABLE {TABLA_TRIGRAMAS} (trigrama TEXT, palabra TEXT, PRIMARY KEY (trigrama, palabra)) WITHOUT ROWID")
+        # una base que ya tenia registros: se indexan todos los nombres en una pasada
+        for id_registro, nombre, apellido in self.conexion.execute(f"SELECT id, nombre, apellido FROM {TABLA}").fetchall():
+            self._indexar_nombre(id_registro, nombre or '', apellido or '')
+
+    def _indexar_nombre(self, id_registro, nombre, apellido):
+        for palabra in palabras(f"{nombre} {apellido}"):
+            if self.conexion.execute(self.sql_existe_palabra, (palabra,)).fetchone() is None:
+                # palabra nueva en el vocabulario
+                self.conexion.executemany(self.sql_insertar_trigrama,
+                                          ((trigrama, palabra) for trigrama in trigramas(palabra)))
+            self.conexion.execute(self.sql_insertar_palabra, (palabra, id_registro))
+
+    def cerrar(self):
+        self.confirmar()
+        if self.conexion is not None:
+            self.conexion.close()
+            self.conexion = None
+
+    def _ejecutar(self, sql, parametros=()):
+        self.inicializar()
+        return self.conexion.execute(sql, parametros)
+
+    def _a_registro(self, fila):
+        # se devuelve el mismo formato que el csv: Persona con todo texto, vacio en vez de None
+        return Persona.desde_valores(['' if valor is None else str(valor) for valor in fila])
+
+    def _valores(self, registro):
+        #los campos y, al final, las claves plegadas de los campos indexados
+        valores = [registro.get(campo) or '' for campo in self.campos[1:]]
+        return valores + [plegar_texto(registro.get(campo) or '') for campo in CAMPOS_INDEXADOS]
+
+    @staticmethod
+    def _id_valido(id_registro):
+        return str(id_registro).strip().isdigit()
+
+    # ------------------------- escritura --------------------------------------
+
+    def siguiente_id(self):
+        fila = self._ejecutar("SELECT seq FROM sqlite_sequence WHERE name = ?", (TABLA,)).fetchone()
+        return (fila[0] if fila else 0) + 1
+
+    def crear(self, registro):
+        return self.crear_varios([registro])[0]
+
+    @cronometrar("sqlite.escritura")
+    def crear_varios(self, registros):
+        #todos los registros se insertan en una sola transaccion: o entran todos o ninguno
+        self.inicializar()
+        ids = []
+        with self.conexion:
+            for registro in registros:
+                id_registro = int(registro['id']) if registro.get('id') else None
+                cursor = self.conexion.execute(self.sql_insertar, [id_registro] + self._valores(registro))
+                ids.append(str(cursor.lastrowid))
+                self._indexar_nombre(cursor.lastrowid, registro.get('nombre') or '', registro.get('apellido') or '')
+        contar("sqlite.filas_escritas", len(ids))
+        return ids
+
+    def encolar(self, registro):
+        #group commit: las inserciones se juntan y se confirman en una sola transaccion
+        self.cola.append(registro)
+        if len(self.cola) >= TAMANO_GRUPO:
+            self.confirmar()
+
+    def confirmar(self):
+        if not self.cola:
+            return []
+        pendientes, self.cola = self.cola, []
+        return self.crear_varios(pendientes)
+
+    @cronometrar("sqlite.escritura")
+    def actualizar(self, registro):
+        if not self._id_valido(registro['id']):
+            return False
+        self.inicializar()
+        id_registro = int(registro['id'])
+        with self.conexion:
+            cursor = self.conexion.execute(self.sql_actualizar, self._valores(registro) + [id_registro])
+            if cursor.rowcount > 0:
+                self.conexion.execute(self.sql_eliminar_palabras, (id_registro,))
+                self._indexar_nombre(id_registro, registro.get('nombre') or '', registro.get('apellido') or '')
+        return cursor.rowcount > 0
+
+    @cronometrar("sqlite.escritura")
+    def actualizar_varios(self, registros):
+        #una sola transaccion para todo el lote
+        self.inicializar()
+        with self.conexion:
+            self.conexion.executemany(
+                self.sql_actualizar,
+                (self._valores(registro) + [int(registro['id'])] for registro in registros)
+            )
+            for registro in registros:
+                self.conexion.execute(self.sql_eliminar_palabras, (int(registro['id']),))
+                self._indexar_nombre(int(registro['id']), registro.get('nombre') or '', registro.get('apellido') or '')
+
+    @cronometrar("sqlite.escritura")
+    def eliminar(self, id_registro):
+        if not self._id_valido(id_registro):
+            return False
+        self.inicializar()
+        with self.conexion:
+            cursor = self.conexion.execute(self.sql_eliminar, (int(id_registro),))
+            self.conexion.execute(self.sql_eliminar_palabras, (int(id_registro),))
+        return cursor.rowcount > 0
+
+    # ------------------------- lectura ----------------------------------------
+
+    def existe(self, id_registro):
+        return self.obtener(id_registro) is not None
+
+    def contar(self):
+        return self._ejecutar(f"SELECT COUNT(*) FROM {TABLA}").fetchone()[0]
+
+    @cronometrar("sqlite.consulta")
+    def obtener(self, id_registro):
+        if not self._id_valido(id_registro):
+            return None
+        fila = self._ejecutar(self.sql_obtener, (int(id_registro),)).fetchone()
+        return self._a_registro(fila) if fila else None
+
+    def iterar(self, desde_id=None):
+        #el cursor trae las filas de a poco, asi que no se carga la tabla completa en memoria
+        if desde_id is not None and not self._id_valido(desde_id):
+            return
+        desde = int(desde_id) if desde_id is not None else 0
+        for fila in self._ejecutar(self.sql_iterar, (desde,)):
+            yield self._a_registro(fila)
+
+    @cronometrar("sqlite.consulta")
+    def buscar_por_cedula(self, cedula):
+        return [self._a_registro(fila) for fila in self._ejecutar(self.sql_cedula, (plegar_texto(cedula),))]
+
+    @cronometrar("sqlite.consulta")
+    def existe_cedula(self, cedula):
+        return self._ejecutar(self.sql_existe_cedula, (plegar_texto(cedula),)).fetchone() is not None
+
+    @cronometrar("sqlite.consulta")
+    def buscar_por_prefijo(self, campo, prefijo):
+        #rango [prefijo, prefijo + caracter maximo) sobre el indice: O(log n + k)
+        prefijo = plegar_texto(prefijo)
+        filas = self._ejecutar(self.sql_prefijo[campo], (prefijo, prefijo + "\U0010ffff"))
+        return [self._a_registro(fila) for fila in filas]
+
+    def _variantes(self, palabra):
+        #palabras del vocabulario con suficientes trigramas en comun (las cuenta SQLite); la similitud, python
+        propios = trigramas(palabra)
+        marcadores = ", ".join("?" for _ in propios)
+        candidatas = self._ejecutar(
+            f"SELECT palabra, COUNT(*) FROM {TABLA_TRIGRAMAS} WHERE trigrama IN ({marcadores}) "
+            f"GROUP BY palabra HAVING COUNT(*) >= ?",
+            list(propios) + [minimo_comunes(propios)])
+        return variantes(palabra, candidatas.fetchall())
+
+    def _ids_con(self, palabra):
+        return [str(fila[0]) for fila in self._ejecutar(self.sql_ids_palabra, (palabra,))]
+
+    @cronometrar("sqlite.consulta")
+    def buscar_similares(self, texto, limite=LIMITE_RESULTADOS):
+        #mismo algoritmo que el indice del csv (trigramas.buscar_personas), sobre las tablas de palabras
+        resultados = buscar_personas(texto, self._variantes, self._ids_con, limite)
+        return [(self.obtener(id_registro), puntaje) for id_registro, puntaje in resultados]
+
+    def agregados(self):
+        conteos = {campo: {} for campo in CAMPOS_AGREGADOS}
+        for campo, valor, cantidad in self._ejecutar(self.sql_agregados):
+            conteos[campo][valor] = cantidad
+        return conteos
+
+    # ------------------------- mantenimiento ----------------------------------
+
+    def filas_muertas(self):
+        # SQLite borra y actualiza en el lugar: no quedan filas muertas que compactar
+        return 0
+
+    @cronometrar("sqlite.compactacion")
+    def compactar(self):
+        self.inicializar()
+        self.conexion.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.conexion.execute("VACUUM")
+        return 0
@@ -0,0 +1,242 @@
+"""Benchmark de las funciones CRUD sobre un registro sintetico de personas.
+
+Genera un registro_personas.csv (o la base sqlite) determinista con el esquema real de CAMPOS,
+ejecuta obtener_datos, crear_registro, actualizar_registro y eliminar_registro sin pedir nada
+por teclado y muestra los percentiles de latencia, el rendimiento y la memoria maxima (RSS).
+
+uso: python benchmark.py [--filas 10000 100000 1000000] [--operaciones 200] [--almacenamiento csv|sqlite]
+                         [--semilla 42] [--json resultados.json]
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from datetime import date, timedelta
+
+try:
+    import resource
+except ImportError:  # windows: no hay getrusage, la memoria maxima queda sin medir
+    resource = None
+
+import main as crud
+from persona import CAMPOS
+
+FILAS_POR_DEFECTO = [10000, 100000, 1000000]
+OPERACIONES_POR_DEFECTO = 200
+LECTURAS_COMPLETAS = 3
+SEMILLA = 42
+
+NOMBRES = ["Ana", "Luis", "María", "José", "Carmen", "Pedro", "Lucía", "Juan", "Rosa", "Miguel", "Elena", "Carlos"]
+APELLIDOS = ["Pérez", "Gómez", "Rodríguez", "Fernández", "López", "Martínez", "Sánchez", "Díaz", "Reyes", "Cruz"]
+OCUPACIONES = ["ingeniero", "contador", "docente", "medico", "vendedor", "chofer", "analista", "enfermera"]
+EMPRESAS = ["Acme", "Claro", "Banco Popular", "Induveca", "Grupo Ramos", "Altice", "Edenorte", "Barceló"]
+TIPOS_CONTRATO = ["fijo", "temporal", "por obra", "pasantia"]
+TIPOS_SANGRE = ["O+", "O-", "A+", "A-", "B+", "B-", "AB+", "AB-"]
+CALLES = ["Duarte", "27 de Febrero", "Independencia", "Máximo Gómez", "Las Américas"]
+FECHA_MINIMA = date(1940, 1, 1)
+DIAS_DE_FECHAS = (date(2007, 12, 31) - FECHA_MINIMA).days
+
+
+# ------------------------- generador sintetico ------------------------------
+
+def generar_registros(cantidad, semilla=SEMILLA, primer_id=1):
+    """Genera `cantidad` registros (dict con todos los CAMPOS) siempre iguales para la misma semilla."""
+    azar = random.Random(semilla)
+    hoy = date.today()
+    for id_registro in range(primer_id, primer_id + cantidad):
+        nacimiento = FECHA_MINIMA + timedelta(days=azar.randrange(DIAS_DE_FECHAS))
+        edad = hoy.year - nacimiento.year - ((hoy.month, hoy.day) < (nacimiento.month, nacimiento.day))
+        yield {
+            "id": str(id_registro),
+            "cedula": f"{azar.randrange(1, 1000):03d}-{id_registro:07d}-{azar.randrange(10)}",
+            "nombre": azar.choice(NOMBRES),
+            "apellido": azar.choice(APELLIDOS),
+            "sexo": azar.choice("MF"),
+            "fecha_nacimiento": nacimiento.isoformat(),
+            "edad": str(edad),
+            "ocupacion": azar.choice(OCUPACIONES),
+            "empresa": azar.choice(EMPRESAS),
+            "tipo_contrato": azar.choice(TIPOS_CONTRATO),
+            "es_asegurado": azar.choice(["si", "no"]),
+            "tipo_sangre": azar.choice(TIPOS_SANGRE),
+            "direccion": f"Calle {azar.choice(CALLES)} #{azar.randrange(1, 500)}",
+            "telefono_residencial": f"809-{azar.randrange(10**7):07d}",
+            "telefono_celular": f"829-{azar.randrange(10**7):07d}",
+        }
+
+
+def generar_csv(ruta, cantidad, semilla=SEMILLA):
+    """Escribe un registro_personas.csv sintetico de `cantidad` filas."""
+    with open(ruta, 'w', newline='', encoding='utf-8') as archivo:
+        writer = csv.writer(archivo)
+        writer.writerow(CAMPOS)
+        writer.writerows([registro[campo] for campo in CAMPOS] for registro in generar_registros(cantidad, semilla))
+
+
+# ------------------------- respuestas para input() --------------------------
+
+def respuestas_crear(registro):
+    #mismo orden en que crear_registro() pide los datos
+    return [registro[campo] for campo in CAMPOS if campo not in ("id", "edad")]
+
+def respuestas_actualizar(registro):
+    #el id y luego un valor por campo; vacio mantiene el actual
+    respuestas = [registro["id"]]
+    for campo in CAMPOS:
+        if campo in ("id", "edad"):
+            continue
+        respuestas.append(registro[campo] if campo in ("empresa", "telefono_celular") else "")
+    return respuestas
+
+def ejecutar_con_respuestas(funcion, respuestas):
+    #input() dentro de main.py lee de la lista en vez del teclado (el nombre del modulo tapa al builtin)
+    pendientes = iter(respuestas)
+    crud.input = lambda _mensaje="": next(pendientes)
+    try:
+        funcion()
+    finally:
+        del crud.input
+
+
+# ------------------------- medicion -----------------------------------------
+
+def percentil(ordenados, p):
+    #percentil por rango mas cercano sobre una lista ya ordenada
+    if not ordenados:
+        return 0.0
+    posicion = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados) + 0.5) - 1))
+    return ordenados[posicion]
+
+def resumir(latencias, elementos=None):
+    """Percentiles (en ms) y rendimiento de una lista de latencias en segundos."""
+    ordenados = sorted(latencias)
+    total = sum(ordenados)
+    elementos = len(ordenados) if elementos is None else elementos
+    return {
+        "operaciones": len(ordenados),
+        "p50_ms": percentil(ordenados, 50) * 1000,
+        "p90_ms": percentil(ordenados, 90) * 1000,
+        "p99_ms": percentil(ordenados, 99) * 1000,
+        "max_ms": ordenados[-1] * 1000 if ordenados else 0.0,
+        "por_segundo": elementos / total if total else 0.0,
+    }
+
+def medir(funcion, veces):
+    latencias = []
+    for _ in range(veces):
+        inicio = time.perf_counter()
+        funcion()
+        latencias.append(time.perf_counter() - inicio)
+    return latencias
+
+def memoria_maxima_mb():
+    if resource is None:
+        return None
+    maxima = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux lo informa en KB y macOS en bytes
+    return maxima / (1024 * 1024) if sys.platform == "darwin" else maxima / 1024
+
+
+def ejecutar_escenario(filas, operaciones, almacenamiento, semilla, directorio):
+    """Corre todo el benchmark para un tamano de registro; se llama en un proceso nuevo por tamano."""
+    crud.ALMACENAMIENTO = almacenamiento
+    crud.ARCHIVO_CSV = os.path.join(directorio, "registro_personas.csv")
+    crud.ARCHIVO_SQLITE = os.path.join(directorio, "registro_personas.db")
+    crud.almacen = None
+
+    inicio = time.perf_counter()
+    if almacenamiento == "sqlite":
+        almacen = crud.obtener_almacen()
+        with open(os.devnull, 'w', encoding='utf-8') as nulo, redirect_stdout(nulo):
+            almacen.inicializar()
+        almacen.crear_varios(generar_registros(filas, semilla))
+    else:
+        generar_csv(crud.ARCHIVO_CSV, filas, semilla)
+    generacion = time.perf_counter() - inicio
+
+    azar = random.Random(semilla + 1)
+    elegidos = azar.sample(range(1, filas + 1), min(2 * operaciones, filas))
+    a_actualizar, a_eliminar = elegidos[:operaciones], elegidos[operaciones:]
+    nuevos = list(generar_registros(operaciones, semilla + 2, primer_id=filas + 1))
+
+    resultados = {"filas": filas, "almacenamiento": almacenamiento, "generacion_s": generacion}
+    with open(os.devnull, 'w', encoding='utf-8') as nulo, redirect_stdout(nulo):
+        # la primera lectura incluye cargar (o construir) el indice; se informa aparte
+        resultados["primera_lectura"] = resumir(medir(crud.obtener_datos, 1), filas)
+        resultados["obtener_datos"] = resumir(medir(crud.obtener_datos, LECTURAS_COMPLETAS), filas * LECTURAS_COMPLETAS)
+
+        pendientes = iter(nuevos)
+        resultados["crear_registro"] = resumir(medir(
+            lambda: ejecutar_con_respuestas(crud.crear_registro, respuestas_crear(next(pendientes))), len(nuevos)))
+
+        pendientes = iter(a_actualizar)
+        def actualizar():
+            registro = dict(crud.obtener_registro_por_id(str(next(pendientes))).items())
+            registro["empresa"], registro["telefono_celular"] = "Empresa Benchmark", "849-0000000"
+            ejecutar_con_respuestas(crud.actualizar_registro, respuestas_actualizar(registro))
+        resultados["actualizar_registro"] = resumir(medir(actualizar, len(a_actualizar)))
+
+        pendientes = iter(a_eliminar)
+        resultados["eliminar_registro"] = resumir(medir(
+            lambda: ejecutar_con_respuestas(crud.eliminar_registro, [str(next(pendientes))]), len(a_eliminar)))
+
+        crud.obtener_almacen().cerrar()
+    resultados["memoria_maxima_mb"] = memoria_maxima_mb()
+    return resultados
+
+
+# ------------------------- reporte ------------------------------------------
+
+def mostrar_resultados(resultados):
+    print(f"\n=== {resultados['filas']} filas ({resultados['almacenamiento']}) ===")
+    print(f"generacion del registro: {resultados['generacion_s']:.2f} s")
+    encabezado = "{:<20} {:>6} {:>10} {:>10} {:>10} {:>10} {:>14}".format(
+        "operacion", "n", "p50 ms", "p90 ms", "p99 ms", "max ms", "por segundo")
+    print(encabezado)
+    print("-" * len(encabezado))
+    for operacion in ("primera_lectura", "obtener_datos", "crear_registro", "actualizar_registro", "eliminar_registro"):
+        r = resultados[operacion]
+        print("{:<20} {:>6} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.3f} {:>14.1f}".format(
+            operacion, r["operaciones"], r["p50_ms"], r["p90_ms"], r["p99_ms"], r["max_ms"], r["por_segundo"]))
+    if resultados["memoria_maxima_mb"] is not None:
+        print(f"memoria maxima (RSS): {resultados['memoria_maxima_mb']:.1f} MB")
+    print("(obtener_datos y primera_lectura: 'por segundo' cuenta filas leidas)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de las funciones CRUD del registro de personas.")
+    parser.add_argument("--filas", type=int, nargs="+", default=FILAS_POR_DEFECTO)
+    parser.add_argument("--operaciones", type=int, default=OPERACIONES_POR_DEFECTO,
+                        help="cantidad de altas, actualizaciones y bajas medidas por tamano")
+    parser.add_argument("--almacenamiento", choices=["csv", "sqlite"], default="csv")
+    parser.add_argument("--semilla", type=int, default=SEMILLA)
+    parser.add_argument("--json", help="guarda los resultados en este archivo para comparar entre versiones")
+    args = parser.parse_args()
+
+    todos = []
+    for filas in args.filas:
+        operaciones = min(args.operaciones, filas // 2)
+        with tempfile.TemporaryDirectory(prefix="benchmark_registro_") as directorio:
+            # un proceso nuevo por tamano: asi la memoria maxima medida es solo la de ese tamano
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as proceso:
+                resultados = proceso.submit(
+                    ejecutar_escenario, filas, operaciones, args.almacenamiento, args.semilla, directorio).result()
+        mostrar_resultados(resultados)
+        todos.append(resultados)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as archivo:
+            json.dump(todos, archivo, indent=2)
+        print(f"\nresultados guardados en '{args.json}'")
+
+
+if __name__ == "__main__":
+    main()
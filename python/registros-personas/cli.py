@@ -0,0 +1,265 @@
+"""Linea de comandos no interactiva del registro de personas (para scripts y cron).
+
+    python cli.py create '{"cedula": "...", "nombre": "...", ...}'   (o una lista, o por stdin)
+    python cli.py list [--desde ID] [--limite N] [--formato jsonl|json|csv] [--ordenar-por CAMPO [--descendente]]
+    python cli.py get ID [ID ...]
+    python cli.py update ID '{"empresa": "..."}'
+    python cli.py delete ID [ID ...]
+    python cli.py search "nombre apellido" [--limite N]
+    python cli.py import datos.csv [--procesos N] [--rechazados reporte.csv]
+    python cli.py convert entrada.csv salida.json [--tabla personas]
+    python cli.py report [--ancho-edad 10]
+
+Los resultados salen por stdout en JSON; los errores por stderr con codigo de salida distinto de 0.
+Solo se importa lo que usa cada subcomando (pandas solo en convert, sqlite solo con --almacenamiento sqlite),
+asi una llamada simple arranca en milisegundos.
+"""
+
+import argparse
+import json
+import os
+import sys
+from contextlib import redirect_stdout
+
+# utilidades compartidas en python/comunes (y los conversores en python/conversiones)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from persona import CAMPOS
+
+ARCHIVO_CSV = "registro_personas.csv"
+ARCHIVO_SQLITE = "registro_personas.db"
+# conversiones soportadas por convert: (extension de entrada, extension de salida) -> funcion del conversor
+CONVERSIONES = {
+    (".csv", ".json"): "csv_a_json",
+    (".csv", ".db"): "csv_a_sql",
+    (".json", ".db"): "json_a_sql",
+    (".json", ".csv"): "json_a_csv",
+}
+
+
+class ErrorCLI(Exception):
+    """Error de uso o de datos: se informa por stderr y el programa sale con codigo 1."""
+
+
+# ------------------------- auxiliares ---------------------------------------
+
+def abrir_almacen(args):
+    if args.almacenamiento == "sqlite":
+        from almacen_sqlite import AlmacenSQLite
+        almacen = AlmacenSQLite(args.archivo or ARCHIVO_SQLITE, CAMPOS)
+    else:
+        from almacen_csv import AlmacenCSV
+        from formato import ruta_con_compresion
+        almacen = AlmacenCSV(args.archivo or ruta_con_compresion(ARCHIVO_CSV, args.compresion), CAMPOS)
+    # los avisos de "archivo creado" no deben mezclarse con el JSON de la salida
+    with redirect_stdout(sys.stderr):
+        almacen.inicializar()
+    return almacen
+
+def leer_json(texto):
+    #el JSON viene como argumento, o por stdin si se omite o es "-"
+    if texto is None or texto == "-":
+        texto = sys.stdin.read()
+    try:
+        return json.loads(texto)
+    except ValueError as e:
+        raise ErrorCLI(f"JSON invalido: {e}")
+
+def como_dict(persona):
+    return dict(persona.items())
+
+def escribir_json(datos):
+    sys.stdout.write(json.dumps(datos, ensure_ascii=False) + "\n")
+
+
+# ------------------------- subcomandos --------------------------------------
+
+def comando_create(args, almacen):
+    from importacion import validar_lote
+
+    datos = leer_json(args.datos)
+    filas = datos if isinstance(datos, list) else [datos]
+    validos = []
+    for numero, registro, motivo in validar_lote(list(enumerate(filas, start=1))):
+        if registro is None:
+            raise ErrorCLI(f"registro {numero}: {motivo}")
+        validos.append(registro)
+    # todos en una sola escritura (y con ids consecutivos), como la importacion
+    escribir_json({"ids": almacen.crear_varios(validos)})
+
+def comando_list(args, almacen):
+    from itertools import islice
+
+    registros = almacen.iterar(args.desde)
+    if args.ordenar_por:
+        from ordenamiento import ordenar_registros
+        registros = ordenar_registros(registros, args.ordenar_por, args.descendente)
+    registros = islice(registros, args.limite)
+    if args.formato == "csv":
+        import csv
+        writer = csv.writer(sys.stdout, lineterminator="\n")
+        writer.writerow(CAMPOS)
+        writer.writerows(persona.valores() for persona in registros)
+    elif args.formato == "json":
+        escribir_json([como_dict(persona) for persona in registros])
+    else:
+        # una linea JSON por registro: se puede procesar en streaming
+        sys.stdout.writelines(json.dumps(como_dict(persona), ensure_ascii=False) + "\n" for persona in registros)
+
+def comando_get(args, almacen):
+    encontrados = []
+    for id_registro in args.ids:
+        persona = almacen.obtener(id_registro)
+        if persona is None:
+            raise ErrorCLI(f"no existe ningun registro con el ID {id_registro}")
+        encontrados.append(como_dict(persona))
+    escribir_json(encontrados[0] if len(encontrados) == 1 else encontrados)
+
+def comando_update(args, almacen):
+    from comunes.edad import calcular_edad
+    from importacion import campo_multilinea
+
+    cambios = leer_json(args.datos)
+    if not isinstance(cambios, dict):
+        raise ErrorCLI("update espera un objeto JSON con los campos a cambiar")
+    desconocidos = set(cambios) - set(CAMPOS)
+    if desconocidos:
+        raise ErrorCLI(f"campos desconocidos: {', '.join(sorted(desconocidos))}")
+    multilinea = campo_multilinea(cambios)
+    if multilinea:
+        raise ErrorCLI(f"salto de linea en el campo {multilinea}")
+
+    registro = almacen.obtener(args.id)
+    if registro is None:
+        raise ErrorCLI(f"no existe ningun registro con el ID {args.id}")
+    for campo, valor in cambios.items():
+        if campo not in ("id", "edad"):  # igual que en el menu: el id y la edad no se editan directamente
+            registro[campo] = "" if valor is None else str(valor)
+
+    edad = calcular_edad(registro.fecha_nacimiento)
+    if edad is None:
+        raise ErrorCLI(f"fecha de nacimiento invalida: {registro.fecha_nacimiento}")
+    registro.edad = str(edad)
+    almacen.actualizar(registro)
+    escribir_json(como_dict(registro))
+
+def comando_delete(args, almacen):
+    eliminados = [id_registro for id_registro in args.ids if almacen.eliminar(id_registro)]
+    escribir_json({"eliminados": eliminados, "no_encontrados": [i for i in args.ids if i not in eliminados]})
+    if len(eliminados) < len(args.ids):
+        return 1
+
+def comando_search(args, almacen):
+    resultados = almacen.buscar_similares(args.texto, args.limite)
+    escribir_json([dict(como_dict(persona), puntaje=round(puntaje, 3)) for persona, puntaje in resultados])
+
+def comando_import(args, almacen):
+    from importacion import guardar_rechazados, importar_registros
+
+    if not os.path.exists(args.ruta):
+        raise ErrorCLI(f"el archivo '{args.ruta}' no fue encontrado")
+    ids, rechazados = importar_registros(almacen, args.ruta, procesos=args.procesos)
+    if rechazados and args.rechazados:
+        guardar_rechazados(args.rechazados, rechazados)
+    escribir_json({"importados": len(ids), "rechazados": len(rechazados),
+                   "primer_id": ids[0] if ids else None, "ultimo_id": ids[-1] if ids else None})
+
+def comando_report(args, almacen):
+    from reportes import generar_reporte
+
+    reporte = generar_reporte(almacen, args.ancho_edad)
+    escribir_json({clave: dict(valor) if isinstance(valor, list) else valor for clave, valor in reporte.items()})
+
+def comando_convert(args):
+    extensiones = (os.path.splitext(args.entrada)[1].lower(), os.path.splitext(args.salida)[1].lower())
+    nombre = CONVERSIONES.get(extensiones)
+    if nombre is None:
+        raise ErrorCLI(f"conversion no soportada: {extensiones[0]} -> {extensiones[1]}")
+
+    from conversiones import main as conversiones  # aqui recien se necesita pandas
+    funcion = getattr(conversiones, nombre)
+    with redirect_stdout(sys.stderr):
+        correcto = funcion(args.entrada, args.salida, args.tabla) if nombre.endswith("_sql") else funcion(args.entrada, args.salida)
+    if not correcto:
+        return 1
+    escribir_json({"entrada": args.entrada, "salida": args.salida})
+
+
+# ------------------------- argumentos ---------------------------------------
+
+def crear_parser():
+    parser = argparse.ArgumentParser(description="Registro de personas sin menu interactivo.")
+    parser.add_argument("--almacenamiento", choices=["csv", "sqlite"],
+                        default=os.environ.get("REGISTRO_ALMACENAMIENTO", "csv").lower())
+    parser.add_argument("--archivo", help="csv o base sqlite a usar (por defecto el mismo que el menu)")
+    parser.add_argument("--compresion", choices=["ninguna", "gzip", "lzma"],
+                        default=os.environ.get("REGISTRO_COMPRESION", "").lower() or "ninguna",
+                        help="guarda el csv comprimido (.csv.gz o .csv.xz); con --archivo decide la extension")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+
+    sub = subcomandos.add_parser("create", help="crea uno o varios registros (objeto o lista JSON)")
+    sub.add_argument("datos", nargs="?", help="JSON; si se omite o es '-' se lee de stdin")
+    sub.set_defaults(funcion=comando_create)
+
+    sub = subcomandos.add_parser("list", help="lista los registros vigentes")
+    sub.add_argument("--desde", help="empieza despues de este ID")
+    sub.add_argument("--limite", type=int, help="cantidad maxima de registros")
+    sub.add_argument("--formato", choices=["jsonl", "json", "csv"], default="jsonl")
+    sub.add_argument("--ordenar-por", choices=["apellido", "edad", "empresa"],
+                     help="ordena el listado (ordenamiento externo: sirve para registros que no entran en memoria)")
+    sub.add_argument("--descendente", action="store_true", help="con --ordenar-por, de mayor a menor")
+    sub.set_defaults(funcion=comando_list)
+
+    sub = subcomandos.add_parser("get", help="muestra uno o varios registros por ID")
+    sub.add_argument("ids", nargs="+")
+    sub.set_defaults(funcion=comando_get)
+
+    sub = subcomandos.add_parser("update", help="cambia los campos indicados de un registro")
+    sub.add_argument("id")
+    sub.add_argument("datos", nargs="?", help="objeto JSON; si se omite o es '-' se lee de stdin")
+    sub.set_defaults(funcion=comando_update)
+
+    sub = subcomandos.add_parser("delete", help="elimina uno o varios registros por ID")
+    sub.add_argument("ids", nargs="+")
+    sub.set_defaults(funcion=comando_delete)
+
+    sub = subcomandos.add_parser("search", help="busqueda aproximada por nombre y apellido (tolera errores de tipeo)")
+    sub.add_argument("texto")
+    sub.add_argument("--limite", type=int, default=20, help="cantidad maxima de resultados")
+    sub.set_defaults(funcion=comando_search)
+
+    sub = subcomandos.add_parser("import", help="importa en bloque un .csv o .json")
+    sub.add_argument("ruta")
+    sub.add_argument("--procesos", type=int, help="procesos para validar (por defecto uno por CPU)")
+    sub.add_argument("--rechazados", help="guarda el reporte de filas rechazadas en este csv")
+    sub.set_defaults(funcion=comando_import)
+
+    sub = subcomandos.add_parser("report", help="cantidades por empresa, contrato, seguro, sangre y edad")
+    sub.add_argument("--ancho-edad", type=int, default=10, help="años por rango del histograma de edades")
+    sub.set_defaults(funcion=comando_report)
+
+    sub = subcomandos.add_parser("convert", help="convierte entre csv, json y sqlite (.db)")
+    sub.add_argument("entrada")
+    sub.add_argument("salida")
+    sub.add_argument("--tabla", default="datos", help="tabla destino al convertir a .db")
+    sub.set_defaults(funcion=comando_convert)
+    return parser
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    try:
+        if args.comando == "convert":
+            return comando_convert(args) or 0
+        almacen = abrir_almacen(args)
+        try:
+            return args.funcion(args, almacen) or 0
+        finally:
+            almacen.cerrar()
+    except ErrorCLI as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+import os
+import zlib
+
+from comunes.metricas import contar, cronometrar
+
+# el diario se guarda junto al csv: registro_personas.csv -> registro_personas.csv.wal
+EXTENSION_DIARIO = ".wal"
+# al superar este tamano (bytes) el diario se vuelca al csv (checkpoint) y se vacia
+TAMANO_CHECKPOINT = 1024 * 1024
+
+
+class DiarioEscritura:
+    """Diario de escritura anticipada (write-ahead log) del csv de registros.
+
+    Cada lote de filas se anota primero en el diario, con su offset de destino y un crc32, y se
+    sincroniza (fsync) solo ese pequeno archivo; recien despues se agrega al csv, sin fsync.
+    En cada checkpoint se sincroniza el csv una vez y se vacia el diario. Si el programa se corta
+    a mitad de una escritura, recuperar() vuelve a aplicar las entradas que no llegaron al csv.
+    Todos los metodos se llaman con el bloqueo del csv tomado.
+    """
+
+    def __init__(self, ruta_csv, formato):
+        self.ruta_csv = ruta_csv
+        self.ruta = ruta_csv + EXTENSION_DIARIO
+        self.formato = formato  # csv plano o comprimido (ver formato.py)
+
+    @cronometrar("diario.registro")
+    def registrar(self, offset, datos):
+        """Anota (con fsync) que `datos` se van a escribir en el csv a partir de `offset`."""
+        encabezado = b"%d %d %08x\n" % (offset, len(datos), zlib.crc32(datos))
+        with open(self.ruta, 'ab') as archivo:
+            archivo.write(encabezado + datos)
+            archivo.flush()
+            os.fsync(archivo.fileno())
+            return archivo.tell()
+
+    def entradas(self):
+        """Entradas completas del diario como (offset, datos); una entrada cortada o corrupta termina la lectura."""
+        try:
+            archivo = open(self.ruta, 'rb')
+        except FileNotFoundError:
+            return
+        with archivo:
+            for encabezado in iter(archivo.readline, b''):
+                try:
+                    offset, longitud, crc = encabezado.split()
+                    offset, longitud, crc = int(offset), int(longitud), int(crc, 16)
+                except ValueError:
+                    return
+                datos = archivo.read(longitud)
+                if len(datos) < longitud or zlib.crc32(datos) != crc:
+                    # la escritura del diario se corto: esa operacion nunca se confirmo
+                    return
+                yield offset, datos
+
+    def checkpoint_si_conviene(self, tamano_diario):
+        """Hace el checkpoint si el diario ya es grande; devuelve True si lo hizo."""
+        if tamano_diario >= TAMANO_CHECKPOINT:
+            self.checkpoint()
+            return True
+        return False
+
+    @cronometrar("diario.checkpoint")
+    def checkpoint(self):
+        """Sincroniza el csv y vacia el diario: todo lo anotado ya esta en disco dentro del csv."""
+        if not os.path.exists(self.ruta):
+            return
+        if os.path.exists(self.ruta_csv):
+            with open(self.ruta_csv, 'ab') as archivo:
+                os.fsync(archivo.fileno())
+        with open(self.ruta, 'wb') as archivo:
+            os.fsync(archivo.fileno())
+
+    @cronometrar("diario.recuperacion")
+    def recuperar(self, desde=0):
+        """Aplica al csv las entradas del diario que no llegaron a escribirse y corta una fila a medias.
+
+        desde es una posicion del csv hasta la que se sabe que todo esta completo (lo ya indexado).
+        Devuelve la cantidad de entradas que hubo que volver a aplicar.
+        """
+        if not os.path.exists(self.ruta_csv):
+            self.checkpoint()
+            return 0
+
+        reaplicadas = 0
+        with open(self.ruta_csv, 'r+b') as archivo:
+            for offset, datos in self.entradas():
+                archivo.seek(offset)
+                if archivo.read(len(datos)) != datos:
+                    archivo.seek(offset)
+                    archivo.truncate()
+                    archivo.write(datos)
+                    reaplicadas += 1
+
+            # una fila (o bloque comprimido) a medias al final es una escritura cortada que no estaba
+            # en el diario (nunca se confirmo): se descarta para que lo proximo no quede pegado a ella
+            self.formato.recortar_cola(archivo, desde)
+            archivo.flush()
+            os.fsync(archivo.fileno())
+
+        self.checkpoint()
+        contar("diario.entradas_reaplicadas", reaplicadas)
+        return reaplicadas
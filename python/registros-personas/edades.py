@@ -0,0 +1,45 @@
+from comunes.edad import edad_en, hoy as fecha_de_hoy, parsear_fecha
+
+try:
+    import numpy as np
+except ImportError:  # numpy es opcional: sin numpy se usa el calculo por lotes en python puro
+    np = None
+
+
+def _calcular_edades_por_lote(fechas, hoy):
+    # cada fecha distinta se calcula una sola vez: en un registro grande se repiten muchisimo
+    calculadas = {}
+    for texto in set(fechas):
+        fecha = parsear_fecha(texto)
+        calculadas[texto] = edad_en(fecha, hoy) if fecha is not None else None
+    return [calculadas[texto] for texto in fechas]
+
+
+def _calcular_edades_numpy(fechas, hoy):
+    try:
+        nacimientos = np.array(fechas, dtype='datetime64[D]')
+    except ValueError:
+        # hay alguna fecha invalida en el lote: se resuelve fecha por fecha
+        return _calcular_edades_por_lote(fechas, hoy)
+
+    anios = nacimientos.astype('datetime64[Y]')
+    meses = nacimientos.astype('datetime64[M]')
+    # mes*100 + dia permite comparar (mes, dia) de todas las fechas a la vez
+    mes_dia = ((meses - anios).astype(int) + 1) * 100 + (nacimientos - meses).astype(int) + 1
+    edades = hoy.year - (anios.astype(int) + 1970) - (mes_dia > hoy.month * 100 + hoy.day)
+
+    validas = ~np.isnat(nacimientos)
+    return [int(edad) if valida else None for edad, valida in zip(edades, validas)]
+
+
+def calcular_edades(fechas, hoy=None):
+    """Calcula la edad para cada fecha 'YYYY-MM-DD' de la lista (None si la fecha no es valida).
+
+    Con numpy todo el lote se convierte a datetime64 y se calcula de una vez; sin numpy
+    se calcula una vez por cada fecha distinta.
+    """
+    hoy = hoy or fecha_de_hoy()
+    fechas = list(fechas)
+    if np is not None:
+        return _calcular_edades_numpy(fechas, hoy)
+    return _calcular_edades_por_lote(fechas, hoy)
@@ -0,0 +1,235 @@
+import csv
+import gzip
+import io
+import lzma
+import os
+import zlib
+
+# extension del archivo -> compresion; tambien se puede elegir con REGISTRO_COMPRESION=gzip|lzma
+EXTENSIONES = {".gz": "gzip", ".xz": "lzma"}
+EXTENSION_DE = {compresion: extension for extension, compresion in EXTENSIONES.items()}
+# filas que van juntas en un mismo bloque comprimido al compactar o importar (bytes sin comprimir).
+# cada bloque se descomprime entero para leer una sola fila, asi que no conviene que sea muy grande.
+TAMANO_BLOQUE = 64 * 1024
+# en un archivo comprimido el offset de una fila es (inicio del bloque << BITS_POSICION) | posicion en el bloque
+BITS_POSICION = 24
+
+
+def ruta_con_compresion(ruta, compresion):
+    """Agrega a ruta la extension de la compresion elegida ('gzip' o 'lzma'; vacio = sin comprimir)."""
+    if not compresion or compresion == "ninguna":
+        return ruta
+    if compresion not in EXTENSION_DE:
+        raise ValueError(f"compresion desconocida: {compresion} (use gzip o lzma)")
+    extension = EXTENSION_DE[compresion]
+    return ruta if ruta.endswith(extension) else ruta + extension
+
+
+def formato_para(ruta):
+    """Formato del archivo de registros segun su extension: .csv, .csv.gz o .csv.xz."""
+    compresion = EXTENSIONES.get(os.path.splitext(ruta)[1].lower())
+    return FormatoComprimido(compresion) if compresion else FormatoPlano()
+
+
+def _filas_a_texto(filas):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(filas)
+    return buffer.getvalue().encode('utf-8')
+
+
+class FormatoPlano:
+    """csv sin comprimir: el offset de una fila es su posicion en bytes dentro del archivo."""
+
+    comprimido = False
+
+    def posicion_en_archivo(self, offset):
+        return offset
+
+    def offset_de(self, posicion):
+        return posicion
+
+    def cabecera(self, campos):
+        return _filas_a_texto([campos])
+
+    def codificar(self, filas, inicio):
+        """Bytes a agregar al final del archivo (que hoy termina en `inicio`) para las filas dadas,
+        mas el (offset, fin) de cada fila, donde fin es el tamano del archivo hasta esa fila inclusive."""
+        posiciones = []
+        for fila in filas:
+            posiciones.append((inicio, inicio + len(fila)))
+            inicio += len(fila)
+        return b''.join(filas), posiciones
+
+    def lineas(self, ruta, desde=0, hasta=None):
+        """Produce (offset, linea, fin) de cada fila completa a partir del offset `desde`."""
+        with open(ruta, 'rb') as archivo:
+            offset = archivo.seek(desde)
+            for linea in archivo:
+                if (hasta is not None and offset >= hasta) or not linea.endswith(b'\n'):
+                    # fin del rango pedido, o fila a medio escribir (se leera cuando este completa)
+                    return
+                fin = offset + len(linea)
+                yield offset, linea, fin
+                offset = fin
+
+    def leer_linea(self, ruta, offset):
+        with open(ruta, 'rb') as archivo:
+            archivo.seek(offset)
+            return archivo.readline()
+
+    def escribir(self, archivo, campos, filas):
+        """Escribe un archivo completo (encabezado + filas) en el archivo binario ya abierto."""
+        texto = io.TextIOWrapper(archivo, encoding='utf-8', newline='')
+        writer = csv.writer(texto)
+        writer.writerow(campos)
+        writer.writerows(filas)
+        texto.flush()
+        texto.detach()
+
+    def termina_completo(self, ruta, tamano):
+        # la ultima fila indexada tiene que terminar en un salto de linea
+        if tamano == 0:
+            return True
+        with open(ruta, 'rb') as archivo:
+            archivo.seek(tamano - 1)
+            return archivo.read(1) == b'\n'
+
+    def recortar_cola(self, archivo, desde=0):
+        """Corta una ultima fila sin salto de linea (una escritura cortada). `archivo` abierto en r+b."""
+        fin = archivo.seek(0, os.SEEK_END)
+        hasta = fin
+        while hasta > 0:
+            inicio = max(0, hasta - 65536)
+            archivo.seek(inicio)
+            bloque = archivo.read(hasta - inicio)
+            if hasta == fin and bloque.endswith(b'\n'):
+                return
+            posicion = bloque.rfind(b'\n')
+            if posicion != -1:
+                archivo.truncate(inicio + posicion + 1)
+                return
+            hasta = inicio
+        archivo.truncate(0)
+
+
+class FormatoComprimido:
+    """csv comprimido con gzip o lzma, guardado como una serie de bloques comprimidos independientes.
+
+    Cada escritura agrega uno o mas bloques al final (un archivo .gz o .xz con varios bloques sigue
+    siendo valido: gzip -d y xz -d lo descomprimen entero). Para leer una fila solo se descomprime
+    su bloque, y un recorrido completo lee del disco los bytes comprimidos.
+    """
+
+    comprimido = True
+
+    def __init__(self, compresion):
+        self.compresion = compresion
+
+    def _comprimir(self, datos):
+        if self.compresion == "gzip":
+            return gzip.compress(datos, compresslevel=6, mtime=0)
+        return lzma.compress(datos)
+
+    def _descompresor(self):
+        if self.compresion == "gzip":
+            return zlib.decompressobj(wbits=31)  # 31: un miembro gzip (encabezado y crc incluidos)
+        return lzma.LZMADecompressor(format=lzma.FORMAT_XZ)
+
+    def posicion_en_archivo(self, offset):
+        return offset >> BITS_POSICION
+
+    def offset_de(self, posicion):
+        return posicion << BITS_POSICION
+
+    def cabecera(self, campos):
+        return self._comprimir(_filas_a_texto([campos]))
+
+    def codificar(self, filas, inicio):
+        bloques = []
+        posiciones = []
+        actual = []
+        tamano_actual = 0
+        for fila in filas + [None]:
+            if fila is None or (actual and tamano_actual + len(fila) > TAMANO_BLOQUE):
+                comprimido = self._comprimir(b''.join(actual))
+                fin = inicio + len(comprimido)
+                posicion = 0
+                for fila_bloque in actual:
+                    posiciones.append(((inicio << BITS_POSICION) | posicion, fin))
+                    posicion += len(fila_bloque)
+                bloques.append(comprimido)
+                inicio = fin
+                actual, tamano_actual = [], 0
+            if fila is not None:
+                actual.append(fila)
+                tamano_actual += len(fila)
+        return b''.join(bloques), posiciones
+
+    def bloques(self, archivo, desde=0, hasta=None):
+        """Produce (inicio, datos, fin) de cada bloque completo; un bloque cortado o danado termina la lectura."""
+        archivo.seek(desde)
+        inicio = desde
+        sobrante = b''
+        while hasta is None or inicio < hasta:
+            descompresor = self._descompresor()
+            partes = []
+            leidos = 0
+            entrada = sobrante or archivo.read(TAMANO_BLOQUE)
+            while True:
+                if not entrada:
+                    return  # el archivo termina en medio de un bloque
+                try:
+                    partes.append(descompresor.decompress(entrada))
+                except (zlib.error, lzma.LZMAError, EOFError):
+                    return
+                leidos += len(entrada)
+                if descompresor.eof:
+                    break
+                entrada = archivo.read(TAMANO_BLOQUE)
+            sobrante = descompresor.unused_data
+            fin = inicio + leidos - len(sobrante)
+            yield inicio, b''.join(partes), fin
+            inicio = fin
+
+    def lineas(self, ruta, desde=0, hasta=None):
+        inicio_bloque, posicion_inicial = desde >> BITS_POSICION, desde & ((1 << BITS_POSICION) - 1)
+        with open(ruta, 'rb') as archivo:
+            for inicio, datos, fin in self.bloques(archivo, inicio_bloque, hasta):
+                base = inicio << BITS_POSICION
+                posicion = posicion_inicial if inicio == inicio_bloque else 0
+                for linea in io.BytesIO(datos[posicion:]):
+                    yield base | posicion, linea, fin
+                    posicion += len(linea)
+
+    def leer_linea(self, ruta, offset):
+        inicio, posicion = offset >> BITS_POSICION, offset & ((1 << BITS_POSICION) - 1)
+        with open(ruta, 'rb') as archivo:
+            for _, datos, _ in self.bloques(archivo, inicio):
+                fin = datos.find(b'\n', posicion)
+                return datos[posicion:fin + 1 if fin != -1 else len(datos)]
+        return b''
+
+    def escribir(self, archivo, campos, filas):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(campos)
+        for fila in filas:
+            writer.writerow(fila)
+            if buffer.tell() >= TAMANO_BLOQUE:
+                archivo.write(self._comprimir(buffer.getvalue().encode('utf-8')))
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            archivo.write(self._comprimir(buffer.getvalue().encode('utf-8')))
+
+    def termina_completo(self, ruta, tamano):
+        # un bloque cortado se detecta al leerlo (no se puede verificar mirando solo el ultimo byte)
+        return True
+
+    def recortar_cola(self, archivo, desde=0):
+        """Corta lo que siga al ultimo bloque completo (un bloque a medio escribir)."""
+        fin = desde
+        for _, _, fin in self.bloques(archivo, desde):
+            pass
+        if archivo.seek(0, os.SEEK_END) > fin:
+            archivo.truncate(fin)
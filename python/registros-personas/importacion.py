@@ -0,0 +1,132 @@
+import csv
+import json
+import os
+from itertools import islice
+
+from comunes.edad import calcular_edad
+from comunes.metricas import contar, cronometrar, medir
+from persona import CAMPOS
+from trigramas import plegar_texto
+
+# filas que valida cada proceso de una sola vez
+TAMANO_LOTE_VALIDACION = 5000
+# con menos filas que esto no conviene arrancar procesos: se valida en el proceso actual
+MINIMO_FILAS_PARALELO = 20000
+CAMPOS_OBLIGATORIOS = ["cedula", "nombre", "apellido", "fecha_nacimiento"]
+
+
+@cronometrar("importacion.lectura")
+def leer_archivo(ruta):
+    """Lee las filas a importar de un archivo .csv o .json (lista de objetos) como dicts."""
+    if ruta.lower().endswith('.json'):
+        with open(ruta, 'r', encoding='utf-8') as archivo:
+            datos = json.load(archivo)
+        if not isinstance(datos, list):
+            raise ValueError("el archivo JSON debe contener una lista de registros")
+        return datos
+    with open(ruta, 'r', newline='', encoding='utf-8') as archivo:
+        return list(csv.DictReader(archivo))
+
+
+def campo_multilinea(registro):
+    """Primer campo cuyo valor tiene un salto de linea (\\n o \\r), o None."""
+    for campo, valor in registro.items():
+        if valor is not None and ('\n' in str(valor) or '\r' in str(valor)):
+            return campo
+    return None
+
+
+def validar_lote(lote):
+    """Valida un lote de (numero_fila, fila) y devuelve (numero_fila, registro o None, motivo).
+
+    Se ejecuta en los procesos del pool, por eso es una funcion de modulo.
+    """
+    resultados = []
+    for numero_fila, fila in lote:
+        if not isinstance(fila, dict):
+            resultados.append((numero_fila, None, "la fila no es un objeto"))
+            continue
+        registro = {campo: str(fila.get(campo) if fila.get(campo) is not None else '').strip() for campo in CAMPOS[1:]}
+
+        # el csv guarda un registro por linea: un salto de linea dentro de un valor lo partiria
+        multilinea = campo_multilinea(registro)
+        if multilinea:
+            resultados.append((numero_fila, None, f"salto de linea en el campo {multilinea}"))
+            continue
+
+        faltantes = [campo for campo in CAMPOS_OBLIGATORIOS if not registro[campo]]
+        if faltantes:
+            resultados.append((numero_fila, None, f"faltan campos: {', '.join(faltantes)}"))
+            continue
+
+        edad = calcular_edad(registro['fecha_nacimiento'])
+        if edad is None:
+            resultados.append((numero_fila, None, f"fecha de nacimiento invalida: {registro['fecha_nacimiento']}"))
+            continue
+        if edad < 0:
+            resultados.append((numero_fila, None, f"fecha de nacimiento en el futuro: {registro['fecha_nacimiento']}"))
+            continue
+
+        registro['edad'] = str(edad)
+        resultados.append((numero_fila, registro, None))
+    return resultados
+
+
+def _validar(filas, procesos):
+    numeradas = iter(enumerate(filas, start=2))  # fila 1 = encabezado en el csv
+    lotes = iter(lambda: list(islice(numeradas, TAMANO_LOTE_VALIDACION)), [])
+
+    if len(filas) < MINIMO_FILAS_PARALELO or procesos == 1:
+        for lote in lotes:
+            yield from validar_lote(lote)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor  # multiprocessing solo se carga si hace falta
+
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        # map conserva el orden de los lotes, asi el reporte sale en el orden del archivo
+        for resultados in pool.map(validar_lote, lotes):
+            yield from resultados
+
+
+def importar_registros(almacen, ruta, procesos=None):
+    """Importa en bloque las personas de un .csv o .json al almacenamiento.
+
+    Las filas se validan en paralelo, las cedulas repetidas (en el archivo o ya registradas)
+    se rechazan, y todas las filas validas se guardan en una sola escritura con ids consecutivos.
+    Devuelve (ids_creados, rechazados) donde rechazados es una lista de (numero_fila, motivo).
+    """
+    filas = leer_archivo(ruta)
+    procesos = procesos or os.cpu_count() or 1
+
+    validos = []
+    rechazados = []
+    cedulas_vistas = set()
+    with medir("importacion.validacion"):
+        for numero_fila, registro, motivo in _validar(filas, procesos):
+            if registro is None:
+                rechazados.append((numero_fila, motivo))
+                continue
+            cedula = registro['cedula']
+            # misma clave que usan los almacenes: "V-1" y "v-1" son la misma cedula
+            clave = plegar_texto(cedula)
+            if clave in cedulas_vistas:
+                rechazados.append((numero_fila, f"cedula repetida en el archivo: {cedula}"))
+                continue
+            cedulas_vistas.add(clave)
+            if almacen.existe_cedula(cedula):
+                rechazados.append((numero_fila, f"cedula ya registrada: {cedula}"))
+                continue
+            validos.append(registro)
+
+    ids = almacen.crear_varios(validos) if validos else []
+    contar("importacion.rechazadas", len(rechazados))
+    return ids, rechazados
+
+
+def guardar_rechazados(ruta, rechazados):
+    """Escribe el reporte de filas rechazadas en un csv (fila, motivo)."""
+    with open(ruta, 'w', newline='', encoding='utf-8') as archivo:
+        writer = csv.writer(archivo)
+        writer.writerow(["fila", "motivo"])
+        writer.writerows(rechazados)
@@ -0,0 +1,744 @@
+import bisect
+import csv
+import heapq
+import io
+import json
+import os
+import sys
+from array import array
+from collections import Counter, deque
+from contextlib import contextmanager
+
+from comunes.metricas import cronometrar
+from formato import formato_para
+from trigramas import LIMITE_RESULTADOS, buscar_personas, minimo_comunes, palabras, plegar_texto, trigramas, variantes
+
+# el indice se guarda junto al csv: registro_personas.csv.idx (id -> offset y proximo id, lo unico que
+# necesitan get, update y delete) y un archivo registro_personas.csv.sec.<parte> por cada parte secundaria,
+# que se carga recien cuando una consulta la usa
+EXTENSION_INDICE = ".idx"
+EXTENSION_SECUNDARIOS = ".sec"
+# hash: busqueda por cedula, ordenados: por prefijo, conteos: reportes, palabras: busqueda aproximada
+PARTES_SECUNDARIAS = ("hash", "ordenados", "conteos", "palabras")
+VERSION_INDICE = 8
+# una fila cuyo id empieza con este prefijo es una lapida: marca el registro como eliminado
+PREFIJO_BORRADO = "-"
+# el indice se guarda en disco en cada checkpoint del diario y al cerrar, no en cada escritura:
+# lo que se escribio despues del ultimo guardado se vuelve a indexar leyendo solo la cola del csv.
+# un id mas alla de este salto desde el ultimo no agranda el arreglo de offsets (va al dict de extras)
+SALTO_MAXIMO_ID = 100000
+# indices secundarios: hash (busqueda exacta) y ordenados (busqueda por prefijo)
+INDICES_HASH = ["cedula"]
+INDICES_ORDENADOS = ["apellido", "empresa"]
+# campos con conteo por valor (para los reportes), mantenido en cada alta, cambio y baja
+CAMPOS_AGREGADOS = ["empresa", "tipo_contrato", "es_asegurado", "tipo_sangre", "edad"]
+
+
+def parsear_linea(linea_bytes):
+    """Convierte una linea del csv (bytes) en la lista de valores de la fila."""
+    texto = linea_bytes.decode('utf-8')
+    return next(csv.reader([texto]), [])
+
+
+def formatear_fila(registro, campos):
+    """Convierte un registro (dict) en los bytes exactos de una fila csv.
+
+    Un valor con saltos de linea se rechaza (ValueError): el csv quedaria con una fila en varias
+    lineas y el indice (un offset por linea) no podria leerla.
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=campos)
+    writer.writerow(registro)
+    texto = buffer.getvalue()
+    if '\n' in texto[:-2] or '\r' in texto[:-2]:
+        campo = next(campo for campo in campos if _tiene_salto(registro.get(campo)))
+        raise ValueError(f"el campo {campo} tiene un salto de linea: cada registro debe ocupar una sola linea")
+    return texto.encode('utf-8')
+
+
+def _tiene_salto(valor):
+    return valor is not None and ('\n' in str(valor) or '\r' in str(valor))
+
+
+def normalizar_clave(valor):
+    """Clave de busqueda: sin espacios sobrantes, sin distinguir mayusculas ni acentos ('Pérez' -> 'perez')."""
+    return plegar_texto(valor)
+
+
+def id_de_linea(linea_bytes):
+    """Extrae el id (primer campo) de una fila sin parsear la linea completa."""
+    fin = linea_bytes.find(b',')
+    return linea_bytes[:fin].decode('utf-8') if fin != -1 else linea_bytes.strip().decode('utf-8')
+
+
+class TablaOffsets:
+    """id -> offset de la fila vigente de cada registro.
+
+    Los ids son numeros consecutivos, asi que los offsets van en un arreglo de enteros indexado por id
+    (-1 = sin fila): se guarda y se carga tal cual, 8 bytes por id, sin armar un dict de millones de
+    entradas. Un id que no es un numero, o que queda muy lejos del ultimo, va a un dict aparte (extras).
+    """
+
+    def __init__(self, arreglo=None, extras=None, cantidad=0):
+        self.arreglo = arreglo if arreglo is not None else array('q')
+        self.extras = extras if extras is not None else {}
+        self.cantidad = cantidad  # ids con fila vigente
+
+    @staticmethod
+    def _numero(id_registro):
+        # el id como posicion del arreglo, o None si no es un numero escrito sin ceros a la izquierda
+        if id_registro.isascii() and id_registro.isdigit() and (id_registro[0] != '0' or id_registro == '0'):
+            return int(id_registro)
+        return None
+
+    def get(self, id_registro, defecto=None):
+        numero = self._numero(id_registro)
+        if numero is not None and numero < len(self.arreglo):
+            offset = self.arreglo[numero]
+            return offset if offset >= 0 else defecto
+        return self.extras.get(id_registro, defecto)
+
+    def __contains__(self, id_registro):
+        return self.get(id_registro) is not None
+
+    def __len__(self):
+        return self.cantidad
+
+    def __setitem__(self, id_registro, offset):
+        numero = self._numero(id_registro)
+        if numero is not None and numero >= len(self.arreglo) and numero < len(self.arreglo) + SALTO_MAXIMO_ID:
+            self._crecer(numero + 1)
+        if numero is not None and numero < len(self.arreglo):
+            if self.arreglo[numero] < 0:
+                self.cantidad += 1
+            self.arreglo[numero] = offset
+        else:
+            if id_registro not in self.extras:
+                self.cantidad += 1
+            self.extras[id_registro] = offset
+
+    def pop(self, id_registro, defecto=None):
+        numero = self._numero(id_registro)
+        if numero is not None and numero < len(self.arreglo):
+            offset = self.arreglo[numero]
+            if offset < 0:
+                return defecto
+            self.arreglo[numero] = -1
+        elif id_registro in self.extras:
+            offset = self.extras.pop(id_registro)
+        else:
+            return defecto
+        self.cantidad -= 1
+        return offset
+
+    def _crecer(self, largo):
+        self.arreglo.extend(array('q', [-1]) * (largo - len(self.arreglo)))
+        # los ids de extras que ahora caen dentro del arreglo pasan a el (get solo mira el arreglo)
+        for id_registro in list(self.extras):
+            numero = self._numero(id_registro)
+            if numero is not None and numero < largo:
+                self.arreglo[numero] = self.extras.pop(id_registro)
+
+    def items(self):
+        """(id, offset) de los ids del arreglo en orden de id, y despues los de extras."""
+        for numero, offset in enumerate(self.arreglo):
+            if offset >= 0:
+                yield str(numero), offset
+        yield from self.extras.items()
+
+    def ordenados(self):
+        """Los offsets de todas las filas vigentes, de menor a mayor (el orden en que aparecen en el csv)."""
+        offsets = sorted(self.arreglo)
+        del offsets[:bisect.bisect_left(offsets, 0)]  # los -1 de los ids sin fila
+        if self.extras:
+            offsets = sorted(offsets + list(self.extras.values()))
+        return offsets
+
+    def encabezado(self):
+        """Lo que se guarda en el encabezado json junto a los bytes del arreglo (ver escribir_con_arreglo)."""
+        return {'extras': self.extras, 'cantidad': self.cantidad, 'largo': len(self.arreglo), 'orden': sys.byteorder}
+
+    @classmethod
+    def desde_bytes(cls, encabezado, datos):
+        arreglo = array('q')
+        arreglo.frombytes(datos)
+        if len(arreglo) != encabezado['largo']:
+            raise ValueError("arreglo de offsets incompleto")
+        if encabezado['orden'] != sys.byteorder:
+            arreglo.byteswap()
+        return cls(arreglo, encabezado['extras'], encabezado['cantidad'])
+
+
+def escribir_con_arreglo(ruta, datos, offsets):
+    """Escribe de forma atomica un encabezado json (una linea) seguido de los bytes del arreglo de offsets."""
+    # un temporal por proceso: dos procesos pueden guardar su indice al mismo tiempo
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, 'wb') as archivo:
+        archivo.write(json.dumps(dict(datos, offsets=offsets.encabezado())).encode('utf-8') + b'\n')
+        archivo.write(offsets.arreglo.tobytes())
+    os.replace(temporal, ruta)
+
+
+def leer_con_arreglo(ruta):
+    """Lee un archivo de escribir_con_arreglo: (datos del encabezado, TablaOffsets)."""
+    with open(ruta, 'rb') as archivo:
+        datos = json.loads(archivo.readline())
+        return datos, TablaOffsets.desde_bytes(datos['offsets'], archivo.read())
+
+
+class IndiceRegistro:
+    """Indice persistente id -> offset de la version vigente de cada fila, mas el proximo id.
+
+    Las actualizaciones agregan una nueva version de la fila al final del csv y los borrados
+    agregan una lapida, asi que el indice tambien cuenta cuantas filas quedaron muertas.
+    Tambien mantiene los indices secundarios: valor -> ids (hash) y (valor, id) ordenados,
+    la cantidad de registros vigentes por cada valor de los campos agregados (reportes)
+    y palabra del nombre -> ids con trigrama -> palabras, para la busqueda aproximada (ver trigramas.py).
+
+    Cada parte secundaria (PARTES_SECUNDARIAS) va en su propio archivo y se carga recien en la primera
+    consulta que la usa: mientras no esta cargada, las escrituras no la tocan. El archivo guarda tambien
+    los offsets de cuando se escribio, asi al cargarlo se pone al dia leyendo solo la cola del csv.
+    """
+
+    def __init__(self, ruta_csv, campos, indices_hash=INDICES_HASH, indices_ordenados=INDICES_ORDENADOS,
+                 campos_agregados=CAMPOS_AGREGADOS):
+        self.ruta_csv = ruta_csv
+        self.ruta_indice = ruta_csv + EXTENSION_INDICE
+        self.formato = formato_para(ruta_csv)  # csv plano o comprimido (.gz / .xz), segun la extension
+        self.campos = campos
+        self.indices_hash = list(indices_hash)
+        self.indices_ordenados = list(indices_ordenados)
+        self.campos_agregados = list(campos_agregados)
+        # posicion de cada campo indexado dentro de la fila, segun CAMPOS
+        self.posiciones = {campo: campos.index(campo)
+                           for campo in self.indices_hash + self.indices_ordenados + self.campos_agregados}
+        self.offsets = TablaOffsets()  # id (str) -> byte donde empieza su fila en el csv
+        self.cargadas = set(PARTES_SECUNDARIAS)  # las partes que no estan aca siguen en disco
+        self.hash = {campo: {} for campo in self.indices_hash}             # valor -> [ids] ("a,b" desde el disco)
+        self.ordenados = {campo: [] for campo in self.indices_ordenados}   # [(valor, id), ...] ordenada
+        self.conteos = {campo: {} for campo in self.campos_agregados}      # valor -> cantidad de registros
+        # palabra normalizada del nombre o apellido -> ids, y trigrama -> palabras del vocabulario.
+        # una palabra que se queda sin ids sigue en el vocabulario hasta la proxima reconstruccion.
+        # en disco cada lista es un texto "a,b,..." que se separa recien al usarla
+        self.palabras = {}
+        self.trigramas = {}
+        self.posicion_nombre = campos.index("nombre")
+        self.posicion_apellido = campos.index("apellido")
+        self.siguiente_id = 1
+        self.filas_totales = 0  # filas de datos en el csv, incluidas versiones viejas y lapidas
+        self.tamano = 0         # bytes del csv que ya estan indexados
+        self.mtime_ns = 0
+        self.inodo = None       # si cambia, otro proceso reemplazo el csv (por ejemplo al compactar)
+        self.cambios_sin_guardar = 0
+        # mientras se indexan muchas filas juntas (reconstruccion o puesta al dia) los indices ordenados
+        # no se mantienen fila por fila: se agrega al final y se ordena una vez al terminar (ver _indexar_lote)
+        self.quitados_lote = None
+
+    # ------------------------- carga y reconstruccion -------------------------
+
+    @cronometrar("indice.carga")
+    def cargar(self):
+        """Carga el indice del disco; lo reconstruye si falta o no corresponde al csv."""
+        if not os.path.exists(self.ruta_csv):
+            self._limpiar()
+            return self
+
+        try:
+            guardado, offsets = leer_con_arreglo(self.ruta_indice)
+        except (FileNotFoundError, ValueError, KeyError):
+            return self.reconstruir()
+
+        if guardado.get('version') != VERSION_INDICE or guardado.get('campos') != self.campos:
+            return self.reconstruir()
+
+        # solo los offsets: cada parte secundaria se lee de su archivo en la primera consulta que la use
+        self.offsets = offsets
+        self.cargadas = set()
+        self.siguiente_id = guardado['siguiente_id']
+        self.filas_totales = guardado['filas_totales']
+        self.tamano = guardado['tamano']
+        self.mtime_ns = guardado['mtime_ns']
+        self.inodo = guardado['inodo']
+        self.cambios_sin_guardar = 0
+
+        if not self._es_vigente():
+            return self.reconstruir()
+
+        # si otro proceso (o una ejecucion anterior) agrego filas, solo se lee lo nuevo
+        self.poner_al_dia()
+        return self
+
+    @cronometrar("indice.reconstruccion")
+    def reconstruir(self, siguiente_id_minimo=1):
+        """Vuelve a indexar el csv completo desde el principio."""
+        self._limpiar()
+        self.siguiente_id = siguiente_id_minimo
+        self.poner_al_dia()
+        self.guardar()
+        return self
+
+    def poner_al_dia(self):
+        """Indexa las filas que se agregaron al csv despues de self.tamano."""
+        try:
+            estado = os.stat(self.ruta_csv)
+        except FileNotFoundError:
+            self._limpiar()
+            return
+
+        if self.inodo is not None and (estado.st_ino != self.inodo or estado.st_size < self.tamano):
+            # el archivo fue reemplazado o recortado por otro proceso: se indexa de nuevo completo
+            siguiente_id = self.siguiente_id
+            self._limpiar()
+            self.siguiente_id = siguiente_id
+        self.inodo = estado.st_ino
+
+        if estado.st_size == self.tamano:
+            return
+
+        # solo se leen filas completas: una fila a medio escribir se indexara cuando este completa
+        fin = self.tamano
+        with self._indexar_lote():
+            for offset, linea, fin in self.formato.lineas(self.ruta_csv, self.formato.offset_de(self.tamano)):
+                if offset == 0:
+                    continue  # la primera linea es el encabezado
+                valores = parsear_linea(linea)
+                if valores:
+                    self._registrar_en_memoria(valores[0], offset, valores)
+
+        self.tamano = fin
+        self.cambios_sin_guardar += 1
+
+    @contextmanager
+    def _indexar_lote(self):
+        #con insort cada fila costaria O(n) y reindexar n filas O(n^2): dentro del lote las entradas nuevas
+        #se agregan al final de los indices ordenados, las que salen se anotan aparte, y al terminar se
+        #descartan las anotadas y se ordena una sola vez (timsort aprovecha la parte que ya estaba ordenada)
+        if 'ordenados' not in self.cargadas:
+            yield
+            return
+        self.quitados_lote = {campo: Counter() for campo in self.indices_ordenados}
+        try:
+            yield
+        finally:
+            for campo in self.indices_ordenados:
+                quitados = self.quitados_lote[campo]
+                lista = self.ordenados[campo]
+                if quitados:
+                    lista = [entrada for entrada in lista if not self._descontar(quitados, entrada)]
+                lista.sort()
+                self.ordenados[campo] = lista
+            self.quitados_lote = None
+
+    @staticmethod
+    def _descontar(quitados, entrada):
+        if quitados[entrada]:
+            quitados[entrada] -= 1
+            return True
+        return False
+
+    def _es_vigente(self):
+        # el indice es valido si el csv no se achico ni se modifico por otra via
+        estado = os.stat(self.ruta_csv)
+        if estado.st_size < self.tamano or estado.st_ino != self.inodo:
+            return False
+        if estado.st_size == self.tamano and estado.st_mtime_ns != self.mtime_ns:
+            return False
+        return self.formato.termina_completo(self.ruta_csv, self.tamano)
+
+    def _limpiar(self):
+        self.offsets = TablaOffsets()
+        self._limpiar_secundarios()
+        self.siguiente_id = 1
+        self.filas_totales = 0
+        self.tamano = 0
+        self.mtime_ns = 0
+        self.inodo = None
+        self.cambios_sin_guardar = 0
+
+    def _limpiar_secundarios(self):
+        for parte in PARTES_SECUNDARIAS:
+            self._limpiar_parte(parte)
+        self.cargadas = set(PARTES_SECUNDARIAS)
+
+    def _limpiar_parte(self, parte):
+        if parte == 'hash':
+            self.hash = {campo: {} for campo in self.indices_hash}
+        elif parte == 'ordenados':
+            self.ordenados = {campo: [] for campo in self.indices_ordenados}
+        elif parte == 'conteos':
+            self.conteos = {campo: {} for campo in self.campos_agregados}
+        else:
+            self.palabras = {}
+            self.trigramas = {}
+
+    def _ruta_parte(self, parte):
+        return f"{self.ruta_csv}{EXTENSION_SECUNDARIOS}.{parte}"
+
+    def _datos_parte(self, parte):
+        #lo que se guarda de cada parte, con las listas como texto "a,b" o en columnas: json las lee mucho
+        #mas rapido que millones de listas chicas
+        if parte == 'hash':
+            return {campo: [list(indice), [ids if isinstance(ids, str) else ','.join(ids) for ids in indice.values()]]
+                    for campo, indice in self.hash.items()}
+        if parte == 'ordenados':
+            return {campo: [[valor for valor, _ in lista], [id_registro for _, id_registro in lista]]
+                    for campo, lista in self.ordenados.items()}
+        if parte == 'conteos':
+            return self.conteos
+        return {'palabras': {palabra: ids if isinstance(ids, str) else ','.join(ids)
+                             for palabra, ids in self.palabras.items()},
+                'trigramas': {trigrama: lista if isinstance(lista, str) else ','.join(lista)
+                              for trigrama, lista in self.trigramas.items()}}
+
+    def _poner_parte(self, parte, datos):
+        if parte == 'hash':
+            self.hash = {campo: dict(zip(claves, ids)) for campo, (claves, ids) in datos.items()}
+        elif parte == 'ordenados':
+            self.ordenados = {campo: list(zip(valores, ids)) for campo, (valores, ids) in datos.items()}
+        elif parte == 'conteos':
+            self.conteos = datos
+        else:
+            self.palabras = datos['palabras']
+            self.trigramas = datos['trigramas']
+
+    @cronometrar("indice.carga_secundarios")
+    def _cargar_parte(self, parte):
+        #lee el archivo de la parte y la pone al dia con las filas que se agregaron despues de guardarla;
+        #si falta o no corresponde a este csv, se arma de nuevo recorriendo el csv completo
+        if parte in self.cargadas:
+            return
+        try:
+            guardado, offsets = leer_con_arreglo(self._ruta_parte(parte))
+            valido = (guardado.get('version') == VERSION_INDICE and guardado.get('campos') == self.campos
+                      and guardado.get('indices') == [self.indices_hash, self.indices_ordenados, self.campos_agregados]
+                      and guardado.get('inodo') == self.inodo and guardado.get('tamano', 0) <= self.tamano)
+        except (FileNotFoundError, ValueError, KeyError):
+            valido = False
+
+        if valido:
+            self._poner_parte(parte, guardado['datos'])
+            desde = guardado['tamano']
+        else:
+            self._limpiar_parte(parte)
+            offsets, desde = TablaOffsets(), 0
+        self.cargadas.add(parte)
+        if desde == self.tamano:
+            return
+
+        # se repiten las filas de la cola sobre los offsets de cuando se guardo la parte:
+        # de ahi sale la version anterior de cada registro que hay que quitar
+        partes = {parte}
+        with self._indexar_lote():
+            for offset, linea, _ in self.formato.lineas(self.ruta_csv, self.formato.offset_de(desde), self.tamano):
+                if offset == 0:
+                    continue  # la primera linea es el encabezado
+                valores = parsear_linea(linea)
+                if not valores:
+                    continue
+                id_registro = valores[0]
+                es_lapida = id_registro.startswith(PREFIJO_BORRADO)
+                if es_lapida:
+                    id_registro = id_registro[len(PREFIJO_BORRADO):]
+                offset_anterior = offsets.pop(id_registro, None)
+                if not es_lapida:
+                    offsets[id_registro] = offset
+                self._registrar_secundarios(id_registro, offset_anterior, None if es_lapida else valores, partes)
+        # la parte en disco quedo atrasada: se guarda con el indice
+        self.cambios_sin_guardar += 1
+
+    # ------------------------- actualizacion ---------------------------------
+
+    def _registrar_en_memoria(self, id_registro, offset, valores):
+        self.filas_totales += 1
+        es_lapida = id_registro.startswith(PREFIJO_BORRADO)
+        if es_lapida:
+            # lapida: el registro deja de existir, pero su id no se vuelve a usar
+            id_registro = id_registro[len(PREFIJO_BORRADO):]
+
+        offset_anterior = self.offsets.pop(id_registro, None)
+        if not es_lapida:
+            # una nueva version reemplaza a la anterior, que queda como fila muerta
+            self.offsets[id_registro] = offset
+        if self.cargadas:
+            self._registrar_secundarios(id_registro, offset_anterior, None if es_lapida else valores, self.cargadas)
+        if id_registro.isdigit():
+            self.siguiente_id = max(self.siguiente_id, int(id_registro) + 1)
+
+    def _registrar_secundarios(self, id_registro, offset_anterior, valores, partes):
+        #en esas partes sale la version anterior (si existe) y entra la nueva (valores None: lapida)
+        anteriores = None
+        if offset_anterior is not None:
+            anteriores = self._leer_valores(offset_anterior)
+            self._quitar_secundarios(id_registro, anteriores, partes)
+        if valores is not None:
+            self._agregar_secundarios(id_registro, valores, partes)
+        if 'palabras' in partes:
+            self._actualizar_palabras(id_registro, anteriores, valores)
+
+    def _valor(self, valores, campo):
+        posicion = self.posiciones[campo]
+        return normalizar_clave(valores[posicion]) if posicion < len(valores) else ""
+
+    def _valor_original(self, valores, campo):
+        # los conteos se agrupan por el valor tal como se escribio (sin pasar a minusculas)
+        posicion = self.posiciones[campo]
+        return valores[posicion].strip() if posicion < len(valores) else ""
+
+    def _agregar_secundarios(self, id_registro, valores, partes):
+        if 'conteos' in partes:
+            for campo in self.campos_agregados:
+                conteo = self.conteos[campo]
+                valor = self._valor_original(valores, campo)
+                conteo[valor] = conteo.get(valor, 0) + 1
+        if 'hash' in partes:
+            for campo in self.indices_hash:
+                self._lista(self.hash[campo], self._valor(valores, campo)).append(id_registro)
+        if 'ordenados' not in partes:
+            return
+        for campo in self.indices_ordenados:
+            entrada = (self._valor(valores, campo), id_registro)
+            if self.quitados_lote is not None:
+                self.ordenados[campo].append(entrada)
+            else:
+                bisect.insort(self.ordenados[campo], entrada)
+
+    def _quitar_secundarios(self, id_registro, valores, partes):
+        if 'conteos' in partes:
+            for campo in self.campos_agregados:
+                conteo = self.conteos[campo]
+                valor = self._valor_original(valores, campo)
+                if conteo.get(valor, 0) <= 1:
+                    conteo.pop(valor, None)
+                else:
+                    conteo[valor] -= 1
+        if 'hash' in partes:
+            for campo in self.indices_hash:
+                clave = self._valor(valores, campo)
+                ids = self._lista(self.hash[campo], clave)
+                if id_registro in ids:
+                    ids.remove(id_registro)
+                if not ids:
+                    self.hash[campo].pop(clave, None)
+        if 'ordenados' not in partes:
+            return
+        for campo in self.indices_ordenados:
+            lista = self.ordenados[campo]
+            entrada = (self._valor(valores, campo), id_registro)
+            if self.quitados_lote is not None:
+                # la lista no esta ordenada mientras dura el lote: se quita al terminarlo
+                self.quitados_lote[campo][entrada] += 1
+                continue
+            posicion = bisect.bisect_left(lista, entrada)
+            if posicion < len(lista) and lista[posicion] == entrada:
+                del lista[posicion]
+
+    def _palabras_de(self, valores):
+        if valores is None:
+            return set()
+        cantidad = len(valores)
+        return set(palabras(f"{valores[self.posicion_nombre] if self.posicion_nombre < cantidad else ''} "
+                            f"{valores[self.posicion_apellido] if self.posicion_apellido < cantidad else ''}"))
+
+    @staticmethod
+    def _lista(indice, clave):
+        lista = indice.get(clave)
+        if lista is None:
+            lista = indice[clave] = []
+        elif isinstance(lista, str):
+            # lista cargada del disco: se separa la primera vez que se usa
+            lista = indice[clave] = lista.split(',') if lista else []
+        return lista
+
+    def _actualizar_palabras(self, id_registro, anteriores, nuevos):
+        #solo se tocan las palabras que cambiaron: la mayoria de las ediciones no cambian el nombre
+        antes, despues = self._palabras_de(anteriores), self._palabras_de(nuevos)
+        for palabra in antes - despues:
+            ids = self._lista(self.palabras, palabra)
+            if id_registro in ids:
+                ids.remove(id_registro)
+        for palabra in despues - antes:
+            if palabra not in self.palabras:
+                for trigrama in trigramas(palabra):
+                    self._lista(self.trigramas, trigrama).append(palabra)
+            self._lista(self.palabras, palabra).append(id_registro)
+
+    def _leer_valores(self, offset):
+        return parsear_linea(self.formato.leer_linea(self.ruta_csv, offset))
+
+    def registrar_lote(self, registros, posiciones):
+        """Anota las filas (nuevas, nuevas versiones o lapidas) recien agregadas juntas al final del csv.
+
+        posiciones trae el (offset, fin) de cada fila, como lo devuelve formato.codificar. Solo cambia el
+        indice en memoria: el almacen lo guarda en disco en el checkpoint del diario.
+        """
+        if not registros:
+            return
+        inicio = self.formato.posicion_en_archivo(posiciones[0][0])
+        if inicio > self.tamano:
+            # alguien escribio entre medio: primero se indexa lo que falta
+            self.poner_al_dia()
+        if inicio < self.tamano:
+            # el lote ya fue indexado al poner el indice al dia
+            return
+        for registro, (offset, _) in zip(registros, posiciones):
+            valores = [str(registro.get(campo) or '') for campo in self.campos]
+            self._registrar_en_memoria(valores[0], offset, valores)
+        # en un csv comprimido varias filas comparten bloque: el tamano se avanza al final del lote
+        self.tamano = max(self.tamano, posiciones[-1][1])
+        self.cambios_sin_guardar += len(registros)
+
+    def modificado(self):
+        """True si hay cambios en memoria que todavia no se guardaron en el .idx."""
+        return self.cambios_sin_guardar > 0
+
+    @cronometrar("indice.guardado")
+    def guardar(self):
+        """Escribe el indice en disco de forma atomica (archivo temporal + replace).
+
+        Solo se escriben las partes secundarias cargadas (las del disco siguen sirviendo: se ponen al dia
+        al cargarlas), y antes que los offsets.
+        """
+        if os.path.exists(self.ruta_csv):
+            self.mtime_ns = os.stat(self.ruta_csv).st_mtime_ns
+        for parte in sorted(self.cargadas):
+            escribir_con_arreglo(self._ruta_parte(parte), {
+                'version': VERSION_INDICE,
+                'campos': self.campos,
+                'indices': [self.indices_hash, self.indices_ordenados, self.campos_agregados],
+                'tamano': self.tamano,
+                'inodo': self.inodo,
+                'datos': self._datos_parte(parte),
+            }, self.offsets)
+        escribir_con_arreglo(self.ruta_indice, {
+            'version': VERSION_INDICE,
+            'campos': self.campos,
+            'tamano': self.tamano,
+            'mtime_ns': self.mtime_ns,
+            'inodo': self.inodo,
+            'siguiente_id': self.siguiente_id,
+            'filas_totales': self.filas_totales,
+        }, self.offsets)
+        self.cambios_sin_guardar = 0
+
+    # ------------------------- consultas -------------------------------------
+
+    def filas_muertas(self):
+        """Cantidad de filas del csv que ya no son la version vigente de ningun registro."""
+        return self.filas_totales - len(self.offsets)
+
+    def proporcion_muertas(self):
+        if self.filas_totales == 0:
+            return 0.0
+        return self.filas_muertas() / self.filas_totales
+
+    def existe(self, id_registro):
+        return str(id_registro) in self.offsets
+
+    @cronometrar("indice.busqueda")
+    def obtener_valores(self, id_registro):
+        """Devuelve los valores de la fila con ese id leyendo solo esa fila, o None."""
+        offset = self.offsets.get(str(id_registro))
+        if offset is None:
+            return None
+        return self._leer_valores(offset)
+
+    def agregados(self):
+        """Cantidad de registros vigentes por valor de cada campo agregado: {campo: {valor: cantidad}}."""
+        self._cargar_parte('conteos')
+        return {campo: dict(conteo) for campo, conteo in self.conteos.items()}
+
+    @cronometrar("indice.busqueda")
+    def buscar_exacto(self, campo, valor):
+        """Ids cuyo campo (con indice hash) es igual a valor: O(1)."""
+        self._cargar_parte('hash')
+        clave = normalizar_clave(valor)
+        return list(self._lista(self.hash[campo], clave)) if clave in self.hash[campo] else []
+
+    @cronometrar("indice.busqueda")
+    def buscar_prefijo(self, campo, prefijo):
+        """Ids cuyo campo (con indice ordenado) empieza con prefijo, en orden: O(log n + k)."""
+        self._cargar_parte('ordenados')
+        lista = self.ordenados[campo]
+        prefijo = normalizar_clave(prefijo)
+        ids = []
+        posicion = bisect.bisect_left(lista, (prefijo, ""))
+        while posicion < len(lista) and lista[posicion][0].startswith(prefijo):
+            ids.append(lista[posicion][1])
+            posicion += 1
+        return ids
+
+    def _variantes(self, palabra):
+        #cuantos trigramas comparte cada palabra del vocabulario con la buscada (Counter cuenta en C)
+        propios = trigramas(palabra)
+        comunes = Counter()
+        for trigrama in propios:
+            if trigrama in self.trigramas:
+                comunes.update(self._lista(self.trigramas, trigrama))
+        minimo = minimo_comunes(propios)
+        return variantes(palabra, [(candidata, cantidad) for candidata, cantidad in comunes.items() if cantidad >= minimo])
+
+    @cronometrar("indice.busqueda_aproximada")
+    def buscar_similares(self, texto, limite=LIMITE_RESULTADOS):
+        """Ids cuyo nombre y apellido se parecen a texto, del mas parecido al menos: [(id, puntaje)].
+
+        No recorre los registros: busca variantes de cada palabra en el vocabulario y suma
+        la similitud de las personas que las tienen (ver trigramas.buscar_personas).
+        """
+        self._cargar_parte('palabras')
+        return buscar_personas(texto, self._variantes, lambda palabra: self._lista(self.palabras, palabra), limite)
+
+    def iterar_vigentes(self, desde=None):
+        """Recorre el csv en orden y produce los valores de la version vigente de cada registro.
+
+        Con desde (un offset del indice) el recorrido empieza en esa fila en vez del principio.
+        """
+        if not os.path.exists(self.ruta_csv):
+            return
+        # un solo csv.reader para todo el recorrido: se le pasa cada linea vigente por la cola
+        pendientes = deque()
+        lector = csv.reader(iter(pendientes.popleft, None))
+        # las lineas llegan en orden de offset, igual que la lista de offsets vigentes: basta con avanzar
+        # por las dos a la vez (el encabezado no es vigente, asi que se salta solo)
+        vigentes = self.offsets.ordenados()
+        posicion = bisect.bisect_left(vigentes, desde or 0)
+        for offset, linea, _ in self.formato.lineas(self.ruta_csv, desde or 0, self.tamano):
+            # solo se parsea la fila completa si es la version vigente
+            if posicion < len(vigentes) and vigentes[posicion] == offset:
+                posicion += 1
+                pendientes.append(linea.decode('utf-8'))
+                yield next(lector)
+
+    def iterar_por_id(self, desde_id=None):
+        """Produce los valores de la version vigente de cada registro en orden de id (como ORDER BY id).
+
+        Con desde_id empieza en el primer id mayor, exista o no ese registro. Los registros se
+        agregan al csv con ids crecientes, asi que casi todos ya estan en orden en el archivo y se
+        leen recorriendolo; solo los que se movieron al final al actualizarse se leen uno por uno
+        por su offset y se intercalan en su lugar.
+        """
+        inicio = 0 if desde_id is None else int(desde_id) + 1
+        arreglo = self.offsets.arreglo
+        # de atras hacia adelante: un id cuya fila esta despues de la de algun id mayor quedo atrasado
+        atrasados = []
+        minimo = None
+        for numero in range(len(arreglo) - 1, inicio - 1, -1):
+            offset = arreglo[numero]
+            if offset < 0:
+                continue
+            if minimo is None or offset < minimo:
+                minimo = offset
+            else:
+                atrasados.append((numero, offset))
+        # los ids de extras (no numericos o muy lejanos) tambien se leen sueltos; los no numericos no se listan
+        saltar = {str(numero) for numero, _ in atrasados} | set(self.offsets.extras)
+        atrasados.extend((int(id_registro), offset) for id_registro, offset in self.offsets.extras.items()
+                         if id_registro.isdigit() and int(id_registro) >= inicio)
+        atrasados.sort()
+
+        recorrido = ()
+        if minimo is not None:
+            # desde la primera fila en orden; las de ids menores que aparezcan despues (actualizadas) se saltan
+            recorrido = (valores for valores in self.iterar_vigentes(desde=minimo)
+                         if valores[0] not in saltar and int(valores[0]) >= inicio)
+        sueltos = (self._leer_valores(offset) for _, offset in atrasados)
+        yield from heapq.merge(recorrido, sueltos, key=lambda valores: int(valores[0]))
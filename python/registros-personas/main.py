@@ -1,68 +1,123 @@
 import csv
 import os
-from datetime import date, datetime 
+import sys
+from itertools import islice
+
+# utilidades compartidas en python/comunes
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from comunes.edad import calcular_edad
+from comunes.metricas import cronometrar
+
+from almacen_csv import AlmacenCSV
+from almacen_sqlite import AlmacenSQLite
+from edades import calcular_edades
+from formato import ruta_con_compresion
+from importacion import guardar_rechazados, importar_registros
+from ordenamiento import CAMPOS_ORDEN, exportar_csv, ordenar_registros
+from persona import CAMPOS
+from reportes import CAMPOS_REPORTE, formatear_reporte, generar_reporte
+
+# con REGISTRO_COMPRESION=gzip o lzma el csv se guarda comprimido (registro_personas.csv.gz / .xz)
+ARCHIVO_CSV = ruta_con_compresion("registro_personas.csv", os.environ.get("REGISTRO_COMPRESION", "").lower())
+ARCHIVO_SQLITE = "registro_personas.db"
+# donde se guardan los registros: "csv" (por defecto) o "sqlite"
+ALMACENAMIENTO = os.environ.get("REGISTRO_ALMACENAMIENTO", "csv").lower()
+# cantidad de registros que se muestran por pagina en leer_registro()
+TAMANO_PAGINA = 20
+# cantidad de registros que se procesan juntos al recalcular las edades
+TAMANO_LOTE_EDADES = 100000
+# cuantas filas rechazadas se muestran en pantalla al importar (el reporte completo va a un archivo)
+MAXIMO_RECHAZOS_EN_PANTALLA = 20
+
+
+# almacenamiento en uso (se crea la primera vez que se necesita)
+almacen = None
 
-ARCHIVO_CSV = "registro_personas.csv"
-CAMPOS = [
-    "id", "cedula", "nombre", "apellido", "sexo", "fecha_nacimiento", "edad", "ocupacion", "empresa", "tipo_contrato", "es_asegurado", "tipo_sangre", "direccion", "telefono_residencial", "telefono_celular"
-]
+# --------------------- Funciones auxiliares -----------------------
 
 
-# --------------------- Funciones auxiliares -----------------------
+def obtener_almacen():
+    #devuelve el almacenamiento elegido (csv o sqlite); las funciones CRUD no dependen de cual sea
+    global almacen
+    if almacen is None:
+        if ALMACENAMIENTO == "sqlite":
+            almacen = AlmacenSQLite(ARCHIVO_SQLITE, CAMPOS)
+        else:
+            almacen = AlmacenCSV(ARCHIVO_CSV, CAMPOS)
+    return almacen
 
+def inicializar_almacen():
+    obtener_almacen().inicializar()
 
-def calcular_edad (fecha_nacimiento_str):
-    try:
-        fecha_nacimiento = datetime.strptime(fecha_nacimiento_str, '%Y-%m-%d').date()
-    except ValueError:
-      return None
-     
-    hoy = date.today()
-
-    edad = hoy.year - fecha_nacimiento.year
-
-    if (hoy.month, hoy.day) < (fecha_nacimiento.month, fecha_nacimiento.day):
-          edad -= 1
-    return edad
-
-def inicializar_csv():
-    if not os.path.exists(ARCHIVO_CSV):
-        with open(ARCHIVO_CSV, 'w', newline='', encoding='utf-8') as archivo:
-            writer = csv.DictReader(archivo, fieldnames=CAMPOS)
-            writer.writeheader()
-            print(f"archivo '{ARCHIVO_CSV}' creado con exito.")
-        
+def iterar_registros(desde_id=None):
+    #generador: produce un registro a la vez sin cargar todos los registros en memoria.
+    #con desde_id se continua justo despues de ese registro.
+    return obtener_almacen().iterar(desde_id)
+
+@cronometrar("registro.pagina")
+def obtener_pagina(numero_pagina, tamano_pagina=TAMANO_PAGINA, desde_id=None):
+    #devuelve solo los registros de una pagina (la primera es la 0), leyendo hasta ahi y nada mas
+    inicio = numero_pagina * tamano_pagina
+    return list(islice(iterar_registros(desde_id), inicio, inicio + tamano_pagina))
+
+@cronometrar("registro.pagina")
+def leer_lote(registros):
+    #siguiente pagina de un generador de registros ya abierto
+    return list(islice(registros, TAMANO_PAGINA))
+
+@cronometrar("registro.carga")
 def obtener_datos():
-    datos = []
-    try:
-        with open(ARCHIVO_CSV, 'r', newline='', encoding='utf-8') as archivo:
-            reader = csv.DictReader(archivo)
+    #devuelve solo la version vigente de cada registro, como objetos Persona (mucho mas livianos que un dict).
+    #si no hay registros, retorna lista vacia. la funcion crear se encarga de crear el archivo
+    return list(iterar_registros())
 
-            for fila in reader:
-                datos.append(fila)
-    except FileNotFoundError:
-        pass #si no exist, retorna lista vacia. la funcion crear se encarga de crearlo
+def obtener_siguiente_ID():
+    return obtener_almacen().siguiente_id()
 
-    return datos
+def obtener_registro_por_id(id_registro):
+    return obtener_almacen().obtener(id_registro)
 
-def obtener_siguiente_ID(datos):
-    #clacula el proximo ID a partir de lso datos existentes
-    if not datos:
-        return 1
-    max_id = max(int(persona['id']) for persona in datos if persona['id'].isdigit())
+def buscar_por_cedula(cedula):
+    return obtener_almacen().buscar_por_cedula(cedula)
+
+def buscar_por_prefijo(campo, prefijo):
+    return obtener_almacen().buscar_por_prefijo(campo, prefijo)
+
+def buscar_por_nombre(texto):
+    #busqueda aproximada (tolera errores de tipeo y acentos), de la mas parecida a la menos
+    return [persona for persona, _ in obtener_almacen().buscar_similares(texto)]
+
+@cronometrar("registro.recalculo_edades")
+def recalcular_edades():
+    #recalcula la edad de todos los registros en una sola pasada, por lotes (con numpy si esta instalado),
+    #y guarda en una sola escritura unicamente los registros cuya edad cambio
+    almacen_actual = obtener_almacen()
+    registros = almacen_actual.iterar()
+    revisados = 0
+    cambiados = []
+
+    while True:
+        lote = list(islice(registros, TAMANO_LOTE_EDADES))
+        if not lote:
+            break
+        edades = calcular_edades(persona.fecha_nacimiento for persona in lote)
+        for persona, edad in zip(lote, edades):
+            if edad is not None and persona.edad != str(edad):
+                persona.edad = str(edad)
+                cambiados.append(persona)
+        revisados += len(lote)
+
+    if cambiados:
+        almacen_actual.actualizar_varios(cambiados)
+    return revisados, len(cambiados)
 
-    return max_id + 1
 #------------------------- funciones CRUD ------------------------------------------
 def crear_registro():
-    #solicita los datos y crea un nuevo egistro en el csv.
-    inicializar_csv()
+    #solicita los datos y crea un nuevo egistro en el almacenamiento (el id se asigna al guardar).
+    inicializar_almacen()
 
-    datos = obtener_datos()
-    nuevo_id = obtener_siguiente_ID(datos)
     print("----------insercion de nuevo registro de personas----------")
-    registro = {
-        "id": str(nuevo_id)
-    }
+    registro = {}
     registro['cedula'] = input("Cedula: ")
     registro['nombre'] = input("Nombre: ")
     registro['apellido'] = input("Apellido: ")
@@ -73,7 +128,7 @@ def crear_registro():
         fecha_nac_str = input("fecha de nacimiento (YYYY-MM-DD): ")
         edad_calculada = calcular_edad(fecha_nac_str)
         if edad_calculada is not None:
-            registro["fecha de nacimiento"] = fecha_nac_str
+            registro["fecha_nacimiento"] = fecha_nac_str
             registro["edad"] = str(edad_calculada)
             print(f"edad calculada: {edad_calculada} años")
             break
@@ -89,55 +144,78 @@ def crear_registro():
     registro['telefono_residencial'] = input ("telefono residencial: ")
     registro['telefono_celular'] = input ("telefono celular: ")
 
-    datos.append(registro)
-    with open(ARCHIVO_CSV, 'w', newline='', encoding='utf-8') as archivo:
-        writer =csv.DictWriter(archivo, fieldnames=CAMPOS)
-        writer.writeheader()
-        writer.writerows(datos)
+    nuevo_id = obtener_almacen().crear(registro)
 
     print(f'regisro con el id {nuevo_id} creado y guardado con exito.')
 
+def mostrar_registros(registros):
+    for persona in registros:
+        print(f"ID: {persona.id}, Cédula: {persona.cedula}, Nombre: {persona.nombre}, apellido: {persona.apellido}, Edad: {persona.edad}")
+        print(f" Ocupación: {persona.ocupacion}, Empresa: {persona.empresa}, Teléfono: {persona.telefono_celular}")
+        print("-" * 50)
+
 def leer_registro():
     print("---------- Lectura de todos los registros de personas ----------")
-    datos = obtener_datos()
+    total = obtener_almacen().contar()
     
-    if not datos:
+    if not total:
         print("ℹ️ No hay registros guardados en el sistema.")
         return
 
-    print(f"Se encontraron {len(datos)} registros:")
+    total_paginas = (total + TAMANO_PAGINA - 1) // TAMANO_PAGINA
+    print(f"Se encontraron {total} registros ({total_paginas} páginas de {TAMANO_PAGINA}):")
     print("-" * 50)
+
+    # se mantiene un solo generador abierto: pasar de pagina no vuelve a leer desde el principio
+    registros = iterar_registros()
+    pagina = 1
+    mostrados = 0
+
+    while True:
+        lote = leer_lote(registros)
+        mostrar_registros(lote)
+        mostrados += len(lote)
+
+        if len(lote) < TAMANO_PAGINA:
+            break
+
+        print(f"Página {pagina} de {total_paginas}")
+        opcion = input("[Enter] siguiente página, 'p N' ir a la página N, 'd ID' continuar desde el ID, 's' salir: ").strip().lower()
+
+        if opcion == "s":
+            break
+        elif opcion.startswith("p ") and opcion[2:].strip().isdigit():
+            pagina = max(int(opcion[2:].strip()), 1)
+            registros = islice(iterar_registros(), (pagina - 1) * TAMANO_PAGINA, None)
+        elif opcion.startswith("d "):
+            desde_id = opcion[2:].strip()
+            if not obtener_almacen().existe(desde_id):
+                print(f"❌ No se encontró ningún registro con el ID {desde_id}.")
+                break
+            registros = iterar_registros(desde_id)
+            pagina = 1
+        else:
+            pagina += 1
     
-    for persona in datos:
-        print(f"ID: {persona['id']}, Cédula: {persona['cedula']}, Nombre: {persona['nombre']}, apellido: {persona['apellido']}, Edad: {persona['edad']}")
-        print(f" Ocupación: {persona['ocupacion']}, Empresa: {persona['empresa']}, Teléfono: {persona['telefono_celular']}")
-        print("-" * 50)
-    
-    print(f"✅ Se han mostrado {len(datos)} registros con éxito.")
+    print(f"✅ Se han mostrado {mostrados} registros con éxito.")
 
 def actualizar_registro():
     print("---------- Actualización de registro de personas por ID ----------")
-    inicializar_csv()
-    datos = obtener_datos()
+    inicializar_almacen()
 
-    if not datos:
+    if not obtener_almacen().contar():
         print("ℹ️ No hay registros para actualizar.")
         return
 
     id_a_actualizar = input("Ingrese el ID del registro a actualizar: ")
-    indice_registro = -1
 
     # Buscar el registro por ID
-    for i, persona in enumerate(datos):
-        if persona['id'] == id_a_actualizar:
-            indice_registro = i
-            break
+    registro = obtener_registro_por_id(id_a_actualizar)
 
-    if indice_registro == -1:
+    if registro is None:
         print(f"❌ No se encontró ningún registro con el ID {id_a_actualizar}.")
         return
 
-    registro = datos[indice_registro]
     print(f"\nRegistro actual para el ID {id_a_actualizar}:")
     print(f"Nombre: {registro['nombre']}, Apellido: {registro['apellido']}, Cédula: {registro['cedula']}, Edad: {registro['edad']}")
     print("-" * 30)
@@ -163,49 +241,170 @@ def actualizar_registro():
                 break
             else:
                 print(" ❌ Formato de fecha incorrecto tras la actualización. Por favor, reingrese la fecha.")
-                registro["fecha de nacimiento"] = input("fecha de nacimiento (YYYY-MM-DD): ")
+                registro["fecha_nacimiento"] = input("fecha de nacimiento (YYYY-MM-DD): ")
                 
-    # Reemplazar el registro actualizado en la lista
-    datos[indice_registro] = registro
+    # Guardar el registro actualizado (en el csv se agrega como nueva version al final)
+    obtener_almacen().actualizar(registro)
 
-    # Reescribir todo el archivo CSV
-    with open(ARCHIVO_CSV, 'w', newline='', encoding='utf-8') as archivo:
-        writer = csv.DictWriter(archivo, fieldnames=CAMPOS)
-        writer.writeheader()
-        writer.writerows(datos)
+    print(f'\n✅ Registro con el ID {id_a_actualizar} actualizado con éxito.')
 
 
 
 def eliminar_registro():
     print("---------- Eliminación de registro de personas por ID ----------")
-    inicializar_csv()
-    datos = obtener_datos()
+    inicializar_almacen()
 
-    if not datos:
+    if not obtener_almacen().contar():
         print("ℹ️ No hay registros para eliminar.")
         return
 
     id_a_eliminar = input("Ingrese el ID del registro a eliminar: ")
-    
-    # Crear una nueva lista de datos que excluya el registro a eliminar
-    datos_filtrados = [persona for persona in datos if persona['id'] != id_a_eliminar]
 
-    if len(datos_filtrados) == len(datos):
+    # En el csv se marca con una lapida al final (sin reescribir el archivo)
+    if not obtener_almacen().eliminar(id_a_eliminar):
         print(f"❌ No se encontró ningún registro con el ID {id_a_eliminar}.")
         return
-    
-    # Reescribir el archivo CSV con los datos filtrados (sin el registro eliminado)
-    with open(ARCHIVO_CSV, 'w', newline='', encoding='utf-8') as archivo:
-        writer = csv.DictWriter(archivo, fieldnames=CAMPOS)
-        writer.writeheader()
-        writer.writerows(datos_filtrados)
         
     print(f'\n✅ Registro con el ID {id_a_eliminar} eliminado y archivo actualizado con éxito.')
 
 
+def buscar_registro():
+    print("---------- Búsqueda de registros de personas ----------")
+    inicializar_almacen()
+    print("1. Por cédula (exacta)")
+    print("2. Por apellido (empieza con...)")
+    print("3. Por empresa (empieza con...)")
+    print("4. Por nombre y apellido (aproximada)")
+    opcion = input("Seleccione el tipo de búsqueda: ")
+
+    if opcion == "1":
+        encontrados = buscar_por_cedula(input("Cédula: "))
+    elif opcion == "2":
+        encontrados = buscar_por_prefijo('apellido', input("Apellido: "))
+    elif opcion == "3":
+        encontrados = buscar_por_prefijo('empresa', input("Empresa: "))
+    elif opcion == "4":
+        encontrados = buscar_por_nombre(input("Nombre y/o apellido: "))
+    else:
+        print("opcion no valida")
+        return
+
+    if not encontrados:
+        print("ℹ️ No se encontraron registros.")
+        return
+
+    print(f"Se encontraron {len(encontrados)} registros:")
+    print("-" * 50)
+    mostrar_registros(encontrados)
+
+
+def compactar_registro():
+    print("---------- Compactación del archivo de registros ----------")
+    inicializar_almacen()
+    almacen_actual = obtener_almacen()
+    print(f"Filas vigentes: {almacen_actual.contar()}, filas muertas: {almacen_actual.filas_muertas()}")
+
+    if almacen_actual.filas_muertas() == 0 and ALMACENAMIENTO != "sqlite":
+        print("ℹ️ El archivo ya está compactado.")
+        return
+
+    filas_eliminadas = almacen_actual.compactar()
+    print(f"✅ Archivo compactado: se eliminaron {filas_eliminadas} filas muertas.")
+
+
+def actualizar_edades():
+    print("---------- Actualización de edades ----------")
+    inicializar_almacen()
+    revisados, cambiados = recalcular_edades()
+    print(f"✅ Se revisaron {revisados} registros y se actualizó la edad de {cambiados}.")
+
+
+def importar_registro():
+    print("---------- Importación de registros desde CSV o JSON ----------")
+    inicializar_almacen()
+    ruta = input("Ruta del archivo a importar (.csv o .json): ").strip()
+
+    if not os.path.exists(ruta):
+        print(f"❌ El archivo '{ruta}' no fue encontrado.")
+        return
+
+    try:
+        ids, rechazados = importar_registros(obtener_almacen(), ruta)
+    except (ValueError, csv.Error) as e:
+        print(f"❌ No se pudo leer el archivo: {e}")
+        return
+
+    if ids:
+        print(f"✅ Se importaron {len(ids)} registros (IDs {ids[0]} a {ids[-1]}).")
+    else:
+        print("ℹ️ No se importó ningún registro.")
+
+    if rechazados:
+        print(f"⚠️ Se rechazaron {len(rechazados)} filas:")
+        for numero_fila, motivo in rechazados[:MAXIMO_RECHAZOS_EN_PANTALLA]:
+            print(f"  fila {numero_fila}: {motivo}")
+        ruta_reporte = ruta + ".rechazados.csv"
+        guardar_rechazados(ruta_reporte, rechazados)
+        print(f"El reporte completo de filas rechazadas se guardó en '{ruta_reporte}'.")
+
+
+def mostrar_reportes():
+    print("---------- Reportes del registro ----------")
+    inicializar_almacen()
+    print("1. Por empresa")
+    print("2. Por tipo de contrato")
+    print("3. Por seguro (es asegurado)")
+    print("4. Por tipo de sangre")
+    print("5. Por edad (rangos de 10 años)")
+    print("6. Todos")
+    opcion = input("Seleccione el reporte: ")
+
+    campos = CAMPOS_REPORTE + ["edad"]
+    if opcion.isdigit() and 1 <= int(opcion) <= len(campos):
+        campos = [campos[int(opcion) - 1]]
+    elif opcion != "6":
+        print("opcion no valida")
+        return
+
+    sys.stdout.write(formatear_reporte(generar_reporte(obtener_almacen()), campos))
+
+
+def listar_ordenado():
+    print("---------- Listado ordenado de registros ----------")
+    inicializar_almacen()
+    for numero, campo in enumerate(CAMPOS_ORDEN, start=1):
+        print(f"{numero}. Por {campo}")
+    opcion = input("Seleccione el orden: ").strip()
+    if not (opcion.isdigit() and 1 <= int(opcion) <= len(CAMPOS_ORDEN)):
+        print("opcion no valida")
+        return
+    campo = CAMPOS_ORDEN[int(opcion) - 1]
+    descendente = input("¿Orden descendente? (s/n): ").strip().lower() == "s"
+    ruta = input("Ruta del csv a exportar ([Enter] para mostrar en pantalla): ").strip()
+
+    #el ordenamiento es externo: no carga todo el registro en memoria aunque sea muy grande
+    registros = ordenar_registros(iterar_registros(), campo, descendente)
+    if ruta:
+        escritos = exportar_csv(ruta, registros)
+        print(f"✅ Se exportaron {escritos} registros ordenados por {campo} a '{ruta}'.")
+        return
+
+    mostrados = 0
+    while True:
+        lote = leer_lote(registros)
+        mostrar_registros(lote)
+        mostrados += len(lote)
+        if len(lote) < TAMANO_PAGINA:
+            break
+        if input("[Enter] siguiente página, 's' salir: ").strip().lower() == "s":
+            registros.close()  #borra ya los archivos temporales del ordenamiento
+            break
+    print(f"✅ Se han mostrado {mostrados} registros ordenados por {campo}.")
+
+
 def menu_principal():
-    #inicializando la funcion crea el archivo csv, donde se guardan los datos 
-    inicializar_csv()
+    #inicializando la funcion crea el archivo csv (o la base sqlite), donde se guardan los datos 
+    inicializar_almacen()
 
     #muestro en pantalla un mensaje de bienvenida la programa.
     print("bienvenido/a al programa de registo de personas")
@@ -213,13 +412,19 @@ def menu_principal():
 
     while True:
         print("\n" + "="*40)
-        print("     sistema CRUD de personas (csv)")
+        print(f"     sistema CRUD de personas ({ALMACENAMIENTO})")
         print("="*40)
         print("1. Crear Nuevo Registro ")        #CREATE
         print("2. Mostrar Todos los Registros ") #RREAD
         print("3. Acualizar Registros por ID ")  #UPDATE
         print("4. Eliminar Registro por ID ")    #DELETE
         print("5. Salir")
+        print("6. Compactar Archivo ")           #mantenimiento
+        print("7. Buscar Registros ")            #cedula / apellido / empresa / nombre aproximado
+        print("8. Actualizar Edades ")           #recalcula la edad de todos
+        print("9. Importar Registros ")          #carga masiva desde csv / json
+        print("10. Reportes ")                   #cantidades por empresa, contrato, seguro, sangre y edad
+        print("11. Listado Ordenado ")           #por apellido, edad o empresa (en pantalla o a un csv)
         print("-" * 40)
         opcion = input("favor digite una de las opciones: ")
 
@@ -232,10 +437,23 @@ def menu_principal():
         elif(opcion == "4"):
             eliminar_registro()
         elif(opcion == "5"):
+            obtener_almacen().cerrar()
             print("muchas gracias por utilizar nuestro programa")
             print("jose @2025 (al right reserved)")
             print("muchas gracias por utilizar nuestros servicios ")
             break
+        elif(opcion == "6"):
+            compactar_registro()
+        elif(opcion == "7"):
+            buscar_registro()
+        elif(opcion == "8"):
+            actualizar_edades()
+        elif(opcion == "9"):
+            importar_registro()
+        elif(opcion == "10"):
+            mostrar_reportes()
+        elif(opcion == "11"):
+            listar_ordenado()
         else:
             print("opcion no valida, debe digitar un de la opciones indicadas en el menu ")
         
@@ -0,0 +1,125 @@
+"""Listados ordenados por apellido, edad o empresa con memoria acotada (ordenamiento externo).
+
+Los registros se leen en tramos de FILAS_POR_TRAMO: cada tramo se ordena en memoria y se vuelca a
+un archivo temporal, y despues los tramos se fusionan con heapq.merge leyendo una fila de cada uno
+a la vez. Asi se puede ordenar un registro que no entra en memoria; si entra en un solo tramo no se
+escribe nada en disco.
+"""
+
+import csv
+import heapq
+import os
+import tempfile
+from itertools import chain, islice
+
+from comunes.metricas import contar, medir
+from persona import CAMPOS, Persona
+from trigramas import plegar_texto
+
+CAMPOS_ORDEN = ["apellido", "edad", "empresa"]
+# filas que se ordenan juntas en memoria antes de volcarlas a un archivo temporal
+FILAS_POR_TRAMO = 100000
+# archivos temporales que se fusionan a la vez; si hay mas, se fusionan en varias pasadas
+MAXIMO_TRAMOS_ABIERTOS = 64
+POSICION_ID = CAMPOS.index("id")
+
+
+def clave_texto(valor):
+    """Clave para ordenar texto: sin mayusculas ni acentos (Álvarez va junto a Alvarez) y vacios al final."""
+    valor = plegar_texto(valor)
+    return (valor == '', valor)
+
+
+def clave_edad(valor):
+    #las edades se comparan como numeros; sin edad va al final
+    valor = valor.strip()
+    return (False, int(valor)) if valor.isdigit() else (True, 0)
+
+
+def clave_de_fila(campo, descendente=False):
+    """Funcion clave sobre la lista de valores de una fila; a igual valor se desempata por id (numerico).
+
+    Se ordena con reverse=descendente; la marca de "vacio" se invierte en ese caso para que los
+    vacios queden al final en los dos sentidos.
+    """
+    if campo not in CAMPOS_ORDEN:
+        raise ValueError(f"no se puede ordenar por {campo} (use {', '.join(CAMPOS_ORDEN)})")
+    posicion = CAMPOS.index(campo)
+    clave_valor = clave_edad if campo == "edad" else clave_texto
+
+    def clave(valores):
+        id_registro = valores[POSICION_ID]
+        vacio, valor = clave_valor(valores[posicion])
+        return vacio != descendente, valor, len(id_registro), id_registro
+    return clave
+
+
+def _volcar_tramo(filas, carpeta, numero):
+    ruta = os.path.join(carpeta, f"tramo_{numero}.csv")
+    with open(ruta, 'w', newline='', encoding='utf-8') as archivo:
+        csv.writer(archivo).writerows(filas)
+    return ruta
+
+
+def _leer_tramo(ruta):
+    with open(ruta, newline='', encoding='utf-8') as archivo:
+        yield from csv.reader(archivo)
+
+
+def _fusionar_pasadas(tramos, carpeta, clave, descendente):
+    #con demasiados tramos se fusionan de a MAXIMO_TRAMOS_ABIERTOS en tramos mas grandes
+    numero = len(tramos)
+    while len(tramos) > MAXIMO_TRAMOS_ABIERTOS:
+        grupos = [tramos[inicio:inicio + MAXIMO_TRAMOS_ABIERTOS] for inicio in range(0, len(tramos), MAXIMO_TRAMOS_ABIERTOS)]
+        tramos = []
+        for grupo in grupos:
+            with medir("orden.fusion"):
+                fusion = heapq.merge(*map(_leer_tramo, grupo), key=clave, reverse=descendente)
+                tramos.append(_volcar_tramo(fusion, carpeta, numero))
+            numero += 1
+            for ruta in grupo:
+                os.remove(ruta)
+    return tramos
+
+
+def ordenar_registros(registros, campo, descendente=False, filas_por_tramo=FILAS_POR_TRAMO, directorio=None):
+    """Generador: produce las personas de `registros` ordenadas por `campo` (apellido, edad o empresa).
+
+    En memoria nunca hay mas de filas_por_tramo filas; los tramos se vuelcan en una carpeta temporal
+    dentro de `directorio` (o la carpeta temporal del sistema) que se borra al terminar el recorrido.
+    """
+    clave = clave_de_fila(campo, descendente)
+    valores = (persona.valores() for persona in registros)
+    tramo = list(islice(valores, filas_por_tramo))
+    siguiente = next(valores, None)
+    if siguiente is None:
+        # todo entra en un solo tramo: no hace falta ningun archivo temporal
+        tramo.sort(key=clave, reverse=descendente)
+        yield from map(Persona.desde_valores, tramo)
+        return
+
+    valores = chain([siguiente], valores)
+    with tempfile.TemporaryDirectory(prefix="orden_", dir=directorio) as carpeta:
+        tramos = []
+        while tramo:
+            with medir("orden.tramo"):
+                tramo.sort(key=clave, reverse=descendente)
+                tramos.append(_volcar_tramo(tramo, carpeta, len(tramos)))
+            tramo = list(islice(valores, filas_por_tramo))
+        contar("orden.tramos", len(tramos))
+
+        tramos = _fusionar_pasadas(tramos, carpeta, clave, descendente)
+        fusion = heapq.merge(*map(_leer_tramo, tramos), key=clave, reverse=descendente)
+        yield from map(Persona.desde_valores, fusion)
+
+
+def exportar_csv(ruta, registros):
+    """Escribe los registros (en el orden recibido) en un csv con encabezado; devuelve cuantos escribio."""
+    escritos = 0
+    with open(ruta, 'w', newline='', encoding='utf-8') as archivo:
+        writer = csv.writer(archivo)
+        writer.writerow(CAMPOS)
+        for persona in registros:
+            writer.writerow(persona.valores())
+            escritos += 1
+    return escritos
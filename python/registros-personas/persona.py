@@ -0,0 +1,80 @@
+import sys
+from collections import deque
+from itertools import repeat
+
+CAMPOS = [
+    "id", "cedula", "nombre", "apellido", "sexo", "fecha_nacimiento", "edad", "ocupacion", "empresa", "tipo_contrato", "es_asegurado", "tipo_sangre", "direccion", "telefono_residencial", "telefono_celular"
+]
+# campos con pocos valores distintos: se internan para que todas las personas compartan el mismo string
+CAMPOS_REPETIDOS = ["sexo", "edad", "empresa", "tipo_contrato", "es_asegurado", "tipo_sangre"]
+# vista de claves como la de un dict (admite operaciones de conjuntos, que usa csv.DictWriter)
+_CLAVES = dict.fromkeys(CAMPOS).keys()
+
+
+class Persona:
+    """Registro compacto de una persona: atributos fijos (__slots__) en vez de un dict por fila.
+
+    Se puede usar igual que el dict de csv.DictReader (persona['nombre'], .get, .keys, dict(persona)),
+    pero el acceso por atributo (persona.nombre) es el mas rapido.
+    """
+
+    __slots__ = tuple(CAMPOS)
+
+    def __init__(self, **valores):
+        for campo in CAMPOS:
+            valor = valores.get(campo)
+            setattr(self, campo, '' if valor is None else valor)
+
+    @classmethod
+    def desde_valores(cls, valores):
+        """Crea la persona a partir de la lista de valores de una fila, en el orden de CAMPOS."""
+        if len(valores) < len(CAMPOS):
+            valores = list(valores) + [''] * (len(CAMPOS) - len(valores))
+        persona = cls.__new__(cls)
+        # map() evita el bucle en python: es la parte mas caliente al leer millones de filas
+        deque(map(setattr, repeat(persona), CAMPOS, valores), maxlen=0)
+        for campo in CAMPOS_REPETIDOS:
+            setattr(persona, campo, sys.intern(getattr(persona, campo)))
+        return persona
+
+    def valores(self):
+        """Lista de valores en el orden de CAMPOS (lista para csv.writer)."""
+        return [getattr(self, campo) for campo in CAMPOS]
+
+    # ---------------- compatibilidad con el dict que devolvia csv.DictReader ----------------
+
+    def __getitem__(self, campo):
+        if campo not in self.__slots__:
+            raise KeyError(campo)
+        return getattr(self, campo)
+
+    def __setitem__(self, campo, valor):
+        if campo not in self.__slots__:
+            raise KeyError(campo)
+        setattr(self, campo, valor)
+
+    def __contains__(self, campo):
+        return campo in self.__slots__
+
+    def __iter__(self):
+        return iter(CAMPOS)
+
+    def __len__(self):
+        return len(CAMPOS)
+
+    def __eq__(self, otra):
+        if not isinstance(otra, Persona):
+            return NotImplemented
+        return self.valores() == otra.valores()
+
+    def __repr__(self):
+        return f"Persona(id={self.id!r}, cedula={self.cedula!r}, nombre={self.nombre!r}, apellido={self.apellido!r})"
+
+    def get(self, campo, defecto=None):
+        return getattr(self, campo) if campo in self.__slots__ else defecto
+
+    def keys(self):
+        return _CLAVES
+
+    def items(self):
+        return [(campo, getattr(self, campo)) for campo in CAMPOS]
@@ -0,0 +1,52 @@
+"""Reportes de cantidad de personas por empresa, tipo de contrato, seguro, tipo de sangre y edad.
+
+Los conteos los mantiene el almacenamiento en cada alta, cambio y baja (ver almacen.agregados()),
+asi que armar un reporte no recorre los registros.
+"""
+
+# campos que se informan como tabla valor -> cantidad (la edad se informa como histograma)
+CAMPOS_REPORTE = ["empresa", "tipo_contrato", "es_asegurado", "tipo_sangre"]
+ANCHO_RANGO_EDAD = 10
+SIN_DATO = "(sin dato)"
+
+
+def histograma_edades(conteo_edades, ancho=ANCHO_RANGO_EDAD):
+    """Agrupa {edad: cantidad} en rangos de `ancho` años: [("0-9", n), ("10-19", n), ...] en orden."""
+    rangos = {}
+    sin_edad = 0
+    for edad, cantidad in conteo_edades.items():
+        if not str(edad).isdigit():
+            sin_edad += cantidad
+            continue
+        inicio = int(edad) // ancho * ancho
+        rangos[inicio] = rangos.get(inicio, 0) + cantidad
+    histograma = [(f"{inicio}-{inicio + ancho - 1}", rangos[inicio]) for inicio in sorted(rangos)]
+    if sin_edad:
+        histograma.append((SIN_DATO, sin_edad))
+    return histograma
+
+
+def generar_reporte(almacen, ancho_edad=ANCHO_RANGO_EDAD):
+    """Devuelve {"total": n, campo: [(valor, cantidad), ...] de mayor a menor, "edad": histograma}."""
+    agregados = almacen.agregados()
+    reporte = {"total": almacen.contar()}
+    for campo in CAMPOS_REPORTE:
+        conteo = agregados.get(campo, {})
+        reporte[campo] = sorted(((valor or SIN_DATO, cantidad) for valor, cantidad in conteo.items()),
+                                key=lambda par: (-par[1], par[0]))
+    reporte["edad"] = histograma_edades(agregados.get("edad", {}), ancho_edad)
+    return reporte
+
+
+def formatear_reporte(reporte, campos=None):
+    """Texto del reporte (solo los campos indicados, o todos), listo para imprimir de una vez."""
+    campos = campos or CAMPOS_REPORTE + ["edad"]
+    total = reporte["total"] or 1
+    lineas = [f"Total de registros: {reporte['total']}"]
+    for campo in campos:
+        titulo = "edad (rangos)" if campo == "edad" else campo.replace('_', ' ')
+        lineas.append("")
+        lineas.append(f"--- Por {titulo} ---")
+        for valor, cantidad in reporte[campo]:
+            lineas.append(f"{valor:<25} {cantidad:>8} {cantidad * 100 / total:6.1f}%")
+    return "\n".join(lineas) + "\n"
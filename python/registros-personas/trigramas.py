@@ -0,0 +1,99 @@
+"""Busqueda aproximada de personas por nombre y apellido (tolera errores de tipeo, mayusculas y acentos).
+
+El nombre y el apellido se normalizan (minusculas, sin acentos ni signos) y se parten en palabras.
+Los indices guardan palabra -> ids y, sobre el vocabulario (pocas decenas de miles de palabras
+distintas aunque haya millones de personas), trigrama -> palabras, con relleno como en pg_trgm:
+"perez" -> "  p", " pe", "per", "ere", "rez", "ez ".
+
+Cada palabra de la consulta se compara solo con las palabras del vocabulario que comparten con ella
+suficientes trigramas para llegar a UMBRAL_PALABRA, y el puntaje de una persona es el promedio, sobre las palabras de la consulta, de la mejor
+similitud con alguna de sus palabras.
+"""
+
+import heapq
+import math
+import re
+import unicodedata
+from functools import lru_cache
+
+# similitud minima (Jaccard de trigramas, como pg_trgm) para tomar una palabra como variante de otra
+UMBRAL_PALABRA = 0.3
+# puntaje minimo de una persona para aparecer en los resultados
+UMBRAL_SIMILITUD = 0.5
+LIMITE_RESULTADOS = 20
+# variantes que se consideran por cada palabra de la consulta (las mas parecidas)
+MAXIMO_VARIANTES = 30
+_NO_ALFANUMERICO = re.compile(r"[^0-9a-z]+")
+# valores con acentos distintos que se recuerdan ya plegados (nombres, apellidos y empresas se repiten mucho)
+TAMANO_CACHE_PLEGADO = 65536
+
+
+def plegar_texto(valor):
+    """Minusculas y sin acentos: 'Álvarez' -> 'alvarez', 'Núñez' -> 'nunez'."""
+    if valor.isascii():
+        # la mayoria de los valores: no hay acentos que quitar
+        return valor.strip().lower()
+    return _quitar_acentos(valor.strip())
+
+
+@lru_cache(maxsize=TAMANO_CACHE_PLEGADO)
+def _quitar_acentos(valor):
+    valor = unicodedata.normalize('NFKD', valor.casefold())
+    return ''.join(caracter for caracter in valor if not unicodedata.combining(caracter))
+
+
+def palabras(texto):
+    """Palabras distintas de un texto, normalizadas (solo letras y digitos), en orden de aparicion."""
+    # se pliega palabra por palabra: las palabras se repiten entre personas, el texto completo no
+    plegado = ' '.join(plegar_texto(palabra) for palabra in texto.split())
+    return list(dict.fromkeys(_NO_ALFANUMERICO.sub(' ', plegado).split()))
+
+
+def trigramas(palabra):
+    """Conjunto de trigramas de una palabra normalizada."""
+    palabra = f"  {palabra} "
+    return {palabra[inicio:inicio + 3] for inicio in range(len(palabra) - 2)}
+
+
+def minimo_comunes(propios, umbral=UMBRAL_PALABRA):
+    """Trigramas en comun que necesita una palabra para poder llegar a `umbral` de similitud."""
+    return max(1, math.ceil(umbral * len(propios)))
+
+
+def variantes(palabra, candidatas):
+    """[(similitud, palabra)] de las MAXIMO_VARIANTES candidatas mas parecidas a palabra, en ese orden.
+
+    candidatas son pares (palabra, trigramas en comun con la buscada); la similitud es la de Jaccard.
+    """
+    cantidad = len(trigramas(palabra))
+    encontradas = []
+    for candidata, comunes in candidatas:
+        valor = comunes / (cantidad + len(trigramas(candidata)) - comunes)
+        if valor >= UMBRAL_PALABRA:
+            encontradas.append((valor, candidata))
+    return heapq.nlargest(MAXIMO_VARIANTES, encontradas)
+
+
+def buscar_personas(texto, buscar_variantes, ids_con, limite=LIMITE_RESULTADOS, umbral=UMBRAL_SIMILITUD):
+    """Algoritmo comun a los dos almacenamientos: [(id, puntaje)] del mas parecido al menos.
+
+    buscar_variantes(palabra) devuelve las variantes de una palabra (ver variantes()) y ids_con(palabra)
+    los ids de las personas que la tienen en el nombre o el apellido.
+    """
+    consulta = palabras(texto)
+    if not consulta:
+        return []
+    puntajes = {}
+    for palabra in consulta:
+        mejor = {}  # id -> mejor similitud con esta palabra de la consulta
+        for valor, variante in buscar_variantes(palabra):
+            for id_registro in ids_con(variante):
+                # las variantes vienen de la mas parecida a la menos: la primera que se ve es la mejor
+                mejor.setdefault(id_registro, valor)
+        for id_registro, valor in mejor.items():
+            puntajes[id_registro] = puntajes.get(id_registro, 0.0) + valor
+
+    minimo = umbral * len(consulta)
+    mejores = heapq.nlargest(limite, ((total, -int(id_registro)) for id_registro, total in puntajes.items()
+                                      if total >= minimo))
+    return [(str(-id_negativo), total / len(consulta)) for total, id_negativo in mejores]
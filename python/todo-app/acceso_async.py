@@ -0,0 +1,119 @@
+"""Acceso asincrono (asyncio) a la tabla de personas de Supabase, para operar sobre muchos ids a la vez.
+
+Todas las peticiones salen por un solo cliente HTTP (httpx, con HTTP/2 si el servidor lo acepta) que
+reutiliza sus conexiones, y las de una misma operacion se lanzan juntas: una operacion sobre N ids
+tarda mas o menos lo que una sola peticion, no N. Un semaforo deja como maximo `en_vuelo`
+peticiones sin responder, para no pasarse del limite de conexiones ni saturar el servidor.
+
+    acceso = AccesoAsync("https://xxx.supabase.co/rest/v1", clave, "TABLE1")
+    registros = await acceso.obtener_varios(["1", "2", "3"], ["id", "nombre"])
+    await acceso.cerrar()
+"""
+
+import asyncio
+from itertools import islice
+from typing import Any, Awaitable, Dict, Iterable, List
+
+import httpx
+from postgrest import AsyncPostgrestClient
+from postgrest.types import CountMethod, ReturnMethod
+
+from comunes.metricas import contar, medir
+
+EN_VUELO = 10
+IDS_POR_PETICION = 100  # ids por filtro id=in.(...): la URL de una peticion tiene un largo maximo
+TIEMPO_LIMITE = 30.0    # segundos por peticion
+
+
+def grupos(valores: Iterable[Any], tamano: int = IDS_POR_PETICION) -> Iterable[List[Any]]:
+    valores = iter(valores)
+    return iter(lambda: list(islice(valores, tamano)), [])
+
+
+class AccesoAsync:
+    """Lecturas, actualizaciones y eliminaciones de varios ids en paralelo sobre un cliente HTTP compartido."""
+
+    def __init__(self, url: str, clave: str | None, tabla: str, en_vuelo: int = EN_VUELO) -> None:
+        self.tabla = tabla
+        self.semaforo = asyncio.Semaphore(en_vuelo)
+        # un solo pool para todas las peticiones: las conexiones (y el TLS) se abren una vez y se reutilizan
+        sesion = httpx.AsyncClient(http2=True, timeout=TIEMPO_LIMITE, follow_redirects=True,
+                                   limits=httpx.Limits(max_connections=en_vuelo, max_keepalive_connections=en_vuelo))
+        self.cliente = AsyncPostgrestClient(url, http_client=sesion,
+                                            headers={"Accept": "application/json", "Content-Type": "application/json",
+                                                     **({"apikey": clave} if clave else {})})
+        if clave:
+            self.cliente.auth(clave)
+
+    async def _ejecutar(self, operacion: str, consulta):
+        async with self.semaforo:
+            with medir(f"supabase_async.{operacion}"):
+                respuesta = await consulta.execute()
+        contar(f"supabase_async.{operacion}.filas", respuesta.count if respuesta.count is not None else len(respuesta.data))
+        return respuesta
+
+    @staticmethod
+    async def _todas(corutinas: Iterable[Awaitable[Any]]) -> List[Any]:
+        """Ejecuta las corutinas a la vez y devuelve sus resultados en orden; si una falla se cancelan las demas."""
+        tareas = [asyncio.ensure_future(corutina) for corutina in corutinas]
+        try:
+            return await asyncio.gather(*tareas)
+        except BaseException:
+            # gather no cancela las que siguen en vuelo: se cancelan y se espera a que terminen
+            for tarea in tareas:
+                tarea.cancel()
+            await asyncio.gather(*tareas, return_exceptions=True)
+            raise
+
+    async def obtener_varios(self, ids: List[str], columnas: List[str]) -> Dict[str, Dict[str, Any]]:
+        """{id: registro} de los ids que existen, pidiendo de a IDS_POR_PETICION ids por peticion."""
+        if 'id' not in columnas:
+            columnas = ['id'] + columnas
+        seleccion = ",".join(columnas)
+        paginas = await self._todas(
+            self._ejecutar("select_varios", self.cliente.table(self.tabla).select(seleccion).in_('id', grupo))
+            for grupo in grupos(ids))
+        return {str(registro['id']): registro for pagina in paginas for registro in pagina.data}
+
+    async def actualizar_varios(self, cambios_por_id: Dict[str, Dict[str, Any]],
+                                condiciones_por_id: Dict[str, Dict[str, Any]] | None = None) -> int:
+        """Aplica a cada id sus cambios y devuelve cuantas filas se actualizaron.
+
+        Los ids con los mismos cambios (por ejemplo la misma edad nueva) van juntos en una peticion.
+        condiciones_por_id da, por id, los valores que la fila debe tener todavia para que se actualice
+        (por ejemplo la edad que se leyo): si otro la cambio mientras tanto, esa fila no se toca.
+        """
+        condiciones_por_id = condiciones_por_id or {}
+        por_cambios: Dict[tuple, List[str]] = {}
+        for id_registro, cambios in cambios_por_id.items():
+            clave = (tuple(sorted(cambios.items())), tuple(sorted(condiciones_por_id.get(id_registro, {}).items())))
+            por_cambios.setdefault(clave, []).append(id_registro)
+        respuestas = await self._todas(
+            self._ejecutar("update_varios",
+                           self._con_condiciones(self.cliente.table(self.tabla)
+                                                 .update(dict(cambios), count=CountMethod.exact,
+                                                         returning=ReturnMethod.minimal)
+                                                 .in_('id', grupo), condiciones))
+            for (cambios, condiciones), ids in por_cambios.items() for grupo in grupos(ids))
+        return sum(respuesta.count or 0 for respuesta in respuestas)
+
+    @staticmethod
+    def _con_condiciones(consulta, condiciones: Iterable[tuple]):
+        for columna, valor in condiciones:
+            # eq.None no es null para PostgREST
+            consulta = consulta.is_(columna, "null") if valor is None else consulta.eq(columna, valor)
+        return consulta
+
+    async def eliminar_varios(self, ids: List[str]) -> List[str]:
+        """Elimina los ids (una peticion por id, todas a la vez) y devuelve los que existian."""
+        respuestas = await self._todas(
+            self._ejecutar("delete_varios",
+                           self.cliente.table(self.tabla)
+                           .delete(count=CountMethod.exact, returning=ReturnMethod.minimal)
+                           .eq('id', id_registro))
+            for id_registro in ids)
+        return [id_registro for id_registro, respuesta in zip(ids, respuestas) if respuesta.count]
+
+    async def cerrar(self) -> None:
+        """Cierra las conexiones del pool (al salir del programa)."""
+        await self.cliente.aclose()
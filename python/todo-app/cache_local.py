@@ -0,0 +1,183 @@
+"""Cache local de lecturas (read-through) para la tabla de personas de Supabase.
+
+Cada lectura se guarda con una clave (un id o una consulta, como una pagina del listado) y el rango
+de ids que cubre: las escrituras propias (insert, update, delete) descartan solo las entradas cuyo
+rango incluye el id tocado. Las entradas vencen a los `ttl` segundos, asi los cambios hechos desde
+otros programas se ven con ese atraso como maximo, y cuando se pasa de `maximo_filas` filas
+guardadas se descartan las entradas usadas hace mas tiempo (LRU).
+
+Con `ruta` las entradas tambien se guardan en un archivo sqlite y sobreviven entre ejecuciones.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from comunes.metricas import contar
+
+TTL = 60.0             # segundos que vale una entrada; 0 desactiva el cache
+MAXIMO_FILAS = 50000   # filas guardadas como maximo (una pagina del listado pesa tantas filas como trae)
+
+
+class Entrada:
+    """Un valor guardado: vence (time.time()), ids que cubre (desde excluido, hasta incluido) y su peso en filas."""
+
+    __slots__ = ("valor", "vence", "desde", "hasta", "filas")
+
+    def __init__(self, valor: Any, vence: float, desde: Optional[int], hasta: Optional[int]) -> None:
+        self.valor = valor
+        self.vence = vence
+        self.desde = desde  # None = sin limite
+        self.hasta = hasta
+        self.filas = len(valor) if isinstance(valor, list) else 1
+
+    def cubre(self, id_registro: int) -> bool:
+        return (self.desde is None or self.desde < id_registro) and (self.hasta is None or id_registro <= self.hasta)
+
+
+class CacheLocal:
+    """Cache en memoria (y opcionalmente en sqlite) con vencimiento y descarte LRU; seguro entre hilos."""
+
+    def __init__(self, ttl: float = TTL, maximo_filas: int = MAXIMO_FILAS, ruta: str | None = None,
+                 origen: str = '') -> None:
+        self.ttl = ttl
+        self.maximo_filas = maximo_filas
+        self.entradas: OrderedDict[str, Entrada] = OrderedDict()  # de la usada hace mas tiempo a la mas reciente
+        self.filas = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.candado = threading.Lock()
+        self.conexion: sqlite3.Connection | None = None
+        if ruta and ttl > 0:
+            self._abrir(ruta, origen)
+
+    # ------------------------- lectura y escritura ----------------------------
+
+    def obtener(self, clave: str) -> Any:
+        """Valor guardado para `clave`, o None si no esta o ya vencio (en ese caso hay que pedirlo y guardarlo)."""
+        with self.candado:
+            entrada = self.entradas.get(clave)
+            if entrada is not None and entrada.vence <= time.time():
+                self._quitar(clave)
+                entrada = None
+            if entrada is None and self.conexion is not None:
+                entrada = self._leer_archivo(clave)
+                if entrada is not None:
+                    self._agregar(clave, entrada)
+            if entrada is None:
+                self.fallos += 1
+                contar("cache.fallos")
+                return None
+            self.entradas.move_to_end(clave)
+            self.aciertos += 1
+            contar("cache.aciertos")
+            return entrada.valor
+
+    def guardar(self, clave: str, valor: Any, desde: Optional[int] = None, hasta: Optional[int] = None) -> None:
+        """Guarda `valor` (una fila o una lista de filas) que cubre los ids desde < id <= hasta (None = sin limite)."""
+        if self.ttl <= 0:
+            return
+        entrada = Entrada(valor, time.time() + self.ttl, desde, hasta)
+        if entrada.filas > self.maximo_filas:
+            return  # no entraria ni vaciando el cache
+        with self.candado:
+            self._agregar(clave, entrada)
+            if self.conexion is not None:
+                self.conexion.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                      (clave, entrada.vence, desde, hasta, entrada.filas, time.time(),
+                                       json.dumps(valor, ensure_ascii=False)))
+                self._recortar_archivo()
+
+    # ------------------------- invalidacion -----------------------------------
+
+    def invalidar(self, id_registro: int) -> None:
+        """Descarta las entradas que incluyen ese id (se llama despues de insertar, actualizar o eliminar)."""
+        with self.candado:
+            claves = [clave for clave, entrada in self.entradas.items() if entrada.cubre(id_registro)]
+            for clave in claves:
+                self._quitar(clave)
+            if self.conexion is not None:
+                self.conexion.execute("DELETE FROM cache WHERE (desde IS NULL OR desde < ?) AND (hasta IS NULL OR ? <= hasta)",
+                                      (id_registro, id_registro))
+        contar("cache.invalidaciones", len(claves))
+
+    def limpiar(self) -> None:
+        """Descarta todo (por ejemplo despues de una carga masiva, que toca ids que no se conocen)."""
+        with self.candado:
+            self.entradas.clear()
+            self.filas = 0
+            if self.conexion is not None:
+                self.conexion.execute("DELETE FROM cache")
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self.candado:
+            consultas = self.aciertos + self.fallos
+            return {"aciertos": self.aciertos, "fallos": self.fallos,
+                    "tasa_aciertos": self.aciertos / consultas if consultas else 0.0,
+                    "entradas": len(self.entradas), "filas": self.filas, "desalojos": self.desalojos}
+
+    def cerrar(self) -> None:
+        if self.conexion is not None:
+            self.conexion.close()
+            self.conexion = None
+
+    # ------------------------- memoria ----------------------------------------
+
+    def _agregar(self, clave: str, entrada: Entrada) -> None:
+        self._quitar(clave)
+        self.entradas[clave] = entrada
+        self.filas += entrada.filas
+        while self.filas > self.maximo_filas:
+            _, descartada = self.entradas.popitem(last=False)
+            self.filas -= descartada.filas
+            self.desalojos += 1
+            contar("cache.desalojos")
+
+    def _quitar(self, clave: str) -> None:
+        entrada = self.entradas.pop(clave, None)
+        if entrada is not None:
+            self.filas -= entrada.filas
+
+    # ------------------------- archivo sqlite ---------------------------------
+
+    def _abrir(self, ruta: str, origen: str) -> None:
+        # lo usan el hilo del menu y el que adelanta la pagina siguiente, siempre con el candado tomado
+        self.conexion = sqlite3.connect(ruta, isolation_level=None, check_same_thread=False)
+        self.conexion.executescript("""
+            CREATE TABLE IF NOT EXISTS cache (clave TEXT PRIMARY KEY, vence REAL, desde INTEGER, hasta INTEGER,
+                                              filas INTEGER, usado REAL, valor TEXT);
+            CREATE INDEX IF NOT EXISTS cache_usado ON cache (usado);
+            CREATE TABLE IF NOT EXISTS origen (valor TEXT);
+        """)
+        guardado = self.conexion.execute("SELECT valor FROM origen").fetchone()
+        if guardado is None or guardado[0] != origen:
+            # el archivo es de otro servidor u otra tabla: lo guardado no sirve
+            self.conexion.execute("DELETE FROM cache")
+            self.conexion.execute("DELETE FROM origen")
+            self.conexion.execute("INSERT INTO origen VALUES (?)", (origen,))
+        self.conexion.execute("DELETE FROM cache WHERE vence <= ?", (time.time(),))
+
+    def _leer_archivo(self, clave: str) -> Entrada | None:
+        fila = self.conexion.execute("SELECT valor, vence, desde, hasta FROM cache WHERE clave = ? AND vence > ?",
+                                     (clave, time.time())).fetchone()
+        if fila is None:
+            return None
+        self.conexion.execute("UPDATE cache SET usado = ? WHERE clave = ?", (time.time(), clave))
+        valor, vence, desde, hasta = fila
+        return Entrada(json.loads(valor), vence, desde, hasta)
+
+    def _recortar_archivo(self) -> None:
+        sobrante = self.conexion.execute("SELECT COALESCE(SUM(filas), 0) FROM cache").fetchone()[0] - self.maximo_filas
+        if sobrante <= 0:
+            return
+        claves: List[str] = []
+        for clave, filas in self.conexion.execute("SELECT clave, filas FROM cache ORDER BY usado"):
+            if sobrante <= 0:
+                break
+            claves.append(clave)
+            sobrante -= filas
+        self.conexion.executemany("DELETE FROM cache WHERE clave = ?", [(clave,) for clave in claves])
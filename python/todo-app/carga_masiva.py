@@ -0,0 +1,268 @@
+"""Carga masiva de un csv de personas (por ejemplo registro_personas.csv) a la tabla de Supabase.
+
+Las filas se leen de a una y se envian en lotes: una sola peticion insert por lote, con varias
+peticiones en vuelo a la vez (acotadas). Cada lote confirmado se anota en <csv>.carga.json, asi que
+si la carga se corta, la siguiente ejecucion retoma desde el ultimo lote confirmado.
+
+Por omision cada lote es un upsert sobre la cedula (la tabla necesita un indice unico en esa columna):
+un lote que se reenvia despues de un corte o de un timeout no duplica las filas que ya habian entrado.
+Con --conflicto "" se hace un insert simple, que no se reintenta solo.
+
+    python carga_masiva.py registro_personas.csv [--lote 500] [--en-vuelo 4] [--conflicto cedula]
+
+Con POSTGREST_URL=http://localhost:3000 se carga contra un PostgREST local en vez de Supabase (para
+probar sin base de datos alcanza con postgrest_local.py, que responde igual con una tabla en memoria).
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List
+
+from postgrest.types import ReturnMethod
+
+# utilidades compartidas en python/comunes
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from comunes.archivos import reemplazar_atomico
+from comunes.edad import calcular_edad
+from comunes.metricas import contar, medir
+
+TAMANO_LOTE = 500
+EN_VUELO = 4
+REINTENTOS = 3          # solo con conflicto: un insert simple no se reintenta
+ESPERA_REINTENTO = 1.0  # segundos antes del primer reintento; se duplica en cada uno
+INFORMAR_CADA = 20      # lotes entre cada linea de avance
+EXTENSION_PROGRESO = ".carga.json"
+# en el csv del registro de personas (solo-agregar) un id con este prefijo es un registro eliminado
+PREFIJO_BORRADO = "-"
+# columna unica por la que se hace el upsert de cada lote
+CONFLICTO = "cedula"
+
+
+class ErrorCarga(Exception):
+    """La carga no se pudo completar; lo confirmado hasta ahi queda anotado para retomar."""
+
+
+class ProgresoCarga:
+    """Lotes ya confirmados por el servidor, guardados en <csv>.carga.json.
+
+    Como hay varias peticiones en vuelo, los lotes pueden confirmarse fuera de orden: se guarda
+    hasta que lote estan todos confirmados y, aparte, los confirmados despues de ese. Cada lote se
+    anota tambien como enviado antes de mandarlo: si la carga se corta sin respuesta, el lote pudo
+    haber entrado igual, y la siguiente ejecucion lo sabe.
+    """
+
+    def __init__(self, ruta_csv: str, tamano_lote: int) -> None:
+        self.ruta = ruta_csv + EXTENSION_PROGRESO
+        estado = os.stat(ruta_csv)
+        self.firma = {"tamano": estado.st_size, "mtime_ns": estado.st_mtime_ns, "tamano_lote": tamano_lote}
+        self.confirmados_hasta = 0  # los lotes 0 .. confirmados_hasta - 1 ya estan en el servidor
+        self.sueltos: set[int] = set()
+        self.enviados: set[int] = set()  # enviados sin confirmacion del servidor
+        try:
+            with open(self.ruta, encoding='utf-8') as archivo:
+                guardado = json.load(archivo)
+        except FileNotFoundError:
+            return
+        if guardado["firma"] != self.firma:
+            # otro csv u otro tamano de lote: la numeracion de los lotes ya no es la misma
+            raise ErrorCarga(f"el avance guardado en '{self.ruta}' es de otra version del csv o de otro tamano "
+                             f"de lote ({guardado['firma']['tamano_lote']} filas); borrelo para empezar de cero")
+        self.confirmados_hasta = guardado["confirmados_hasta"]
+        self.sueltos = set(guardado["sueltos"])
+        self.enviados = set(guardado.get("enviados", []))
+
+    def confirmado(self, numero: int) -> bool:
+        return numero < self.confirmados_hasta or numero in self.sueltos
+
+    def enviar(self, numero: int) -> None:
+        self.enviados.add(numero)
+        self.guardar()
+
+    def marcar(self, numero: int) -> None:
+        self.enviados.discard(numero)
+        self.sueltos.add(numero)
+        while self.confirmados_hasta in self.sueltos:
+            self.sueltos.remove(self.confirmados_hasta)
+            self.confirmados_hasta += 1
+        self.guardar()
+
+    def guardar(self) -> None:
+        temporal = f"{self.ruta}.{os.getpid()}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            json.dump({"firma": self.firma, "confirmados_hasta": self.confirmados_hasta,
+                       "sueltos": sorted(self.sueltos), "enviados": sorted(self.enviados)}, archivo)
+            archivo.flush()
+            os.fsync(archivo.fileno())
+        reemplazar_atomico(temporal, self.ruta)
+
+
+def filas_vigentes(ruta: str) -> Iterator[Dict[str, str]]:
+    """Filas del csv como dict; si tiene columna id, solo la ultima version de cada registro no eliminado.
+
+    El csv del registro de personas es de solo-agregar (cada cambio agrega una version y cada baja
+    una lapida con id "-N"): una primera pasada, que solo mira el id, anota la ultima fila de cada uno.
+    Las dos pasadas numeran las filas igual (ver _filas_con_datos), asi una linea en blanco no las desfasa.
+    """
+    with open(ruta, newline='', encoding='utf-8') as archivo:
+        lector = csv.reader(archivo)
+        encabezado = next(lector, [])
+        if "id" not in encabezado:
+            ultimas = None
+        else:
+            posicion = encabezado.index("id")
+            ultimas = {}
+            for numero, fila in _filas_con_datos(lector):
+                id_registro = fila[posicion] if posicion < len(fila) else ''
+                if id_registro.startswith(PREFIJO_BORRADO):
+                    ultimas.pop(id_registro[len(PREFIJO_BORRADO):], None)
+                else:
+                    ultimas[id_registro] = numero
+            ultimas = set(ultimas.values())
+
+    with open(ruta, newline='', encoding='utf-8') as archivo:
+        lector = csv.reader(archivo)
+        encabezado = next(lector, [])
+        for numero, fila in _filas_con_datos(lector):
+            if ultimas is None or numero in ultimas:
+                yield dict(zip(encabezado, fila))
+
+
+def _filas_con_datos(lector) -> Iterator[tuple[int, List[str]]]:
+    #numera solo las filas con datos: las lineas en blanco se saltan (como hace csv.DictReader)
+    return enumerate(fila for fila in lector if fila)
+
+
+def mapear_fila(fila: Dict[str, str], campos: List[str]) -> Dict[str, Any]:
+    """Registro listo para insertar: solo los campos de la tabla, con la edad como entero."""
+    registro: Dict[str, Any] = {campo: (fila.get(campo) or '').strip() for campo in campos}
+    if "edad" in registro:
+        edad = registro["edad"]
+        registro["edad"] = int(edad) if edad.isdigit() else calcular_edad(registro.get("fecha_nacimiento", ''))
+    return registro
+
+
+def enviar_lote(cliente, tabla: str, lote: List[Dict[str, Any]], conflicto: str | None = None) -> None:
+    """Inserta un lote en una sola peticion (sin pedir las filas de vuelta).
+
+    Con conflicto (una columna unica, como cedula o id) se usa upsert ignorando duplicados, asi un
+    lote que se reintenta despues de un corte no duplica las filas que ya habian entrado. Sin conflicto
+    no hay reintentos: un timeout no dice si el servidor llego a guardar el lote.
+    """
+    reintentos = REINTENTOS if conflicto else 0
+    espera = ESPERA_REINTENTO
+    for intento in range(reintentos + 1):
+        try:
+            with medir("supabase.insert_lote"):
+                consulta = cliente.table(tabla)
+                if conflicto:
+                    consulta = consulta.upsert(lote, on_conflict=conflicto, ignore_duplicates=True,
+                                               returning=ReturnMethod.minimal)
+                else:
+                    consulta = consulta.insert(lote, returning=ReturnMethod.minimal)
+                consulta.execute()
+            contar("supabase.insert_lote.filas", len(lote))
+            return
+        except Exception:
+            if intento == reintentos:
+                raise
+            contar("supabase.insert_lote.reintentos")
+            time.sleep(espera)
+            espera *= 2
+
+
+def cargar_csv(cliente, tabla: str, campos: List[str], ruta: str, tamano_lote: int = TAMANO_LOTE,
+               en_vuelo: int = EN_VUELO, conflicto: str | None = CONFLICTO,
+               informar: Callable[[str], None] = print) -> Dict[str, Any]:
+    """Carga las filas del csv en la tabla y devuelve {"filas", "saltadas", "lotes", "segundos", "filas_por_segundo"}.
+
+    Nunca hay mas de en_vuelo peticiones sin responder. Si un lote falla despues de los reintentos,
+    se esperan las peticiones en vuelo, se guarda el avance y se lanza ErrorCarga. Sin conflicto (insert
+    simple) no se retoma una carga que dejo lotes enviados sin confirmar: podrian quedar duplicados.
+    """
+    progreso = ProgresoCarga(ruta, tamano_lote)
+    if progreso.enviados and not conflicto:
+        # con upsert esos lotes se reenvian sin riesgo; con insert simple no se sabe si entraron
+        raise ErrorCarga(f"la carga anterior dejo lotes enviados sin confirmacion "
+                         f"({', '.join(map(str, sorted(progreso.enviados)))}) que pueden estar ya en la tabla; "
+                         f"retome con una columna de conflicto (ej. {CONFLICTO}) o revise la tabla y borre "
+                         f"'{progreso.ruta}'")
+    if conflicto == "id":
+        campos = ["id"] + [campo for campo in campos if campo != "id"]  # se conservan los ids del csv
+    filas = iter(filas_vigentes(ruta))
+    lotes = iter(lambda: list(islice(filas, tamano_lote)), [])
+
+    pendientes: Dict[Future, tuple[int, int]] = {}
+    resultado = {"filas": 0, "saltadas": 0, "lotes": 0}
+    errores: List[str] = []
+    inicio = time.perf_counter()
+
+    def recoger(modo: str) -> None:
+        terminados, _ = wait(pendientes, return_when=modo)
+        for futuro in terminados:
+            numero, cantidad = pendientes.pop(futuro)
+            if futuro.exception() is not None:
+                errores.append(f"lote {numero}: {futuro.exception()}")
+                continue
+            progreso.marcar(numero)
+            resultado["filas"] += cantidad
+            resultado["lotes"] += 1
+            if resultado["lotes"] % INFORMAR_CADA == 0:
+                segundos = time.perf_counter() - inicio
+                informar(f"  {resultado['filas']} filas cargadas ({resultado['filas'] / segundos:.0f} filas/s)")
+
+    with ThreadPoolExecutor(max_workers=en_vuelo) as pool:
+        for numero, filas_lote in enumerate(lotes):
+            if progreso.confirmado(numero):
+                resultado["saltadas"] += len(filas_lote)
+                continue
+            if len(pendientes) >= en_vuelo:
+                recoger(FIRST_COMPLETED)
+            if errores:
+                break
+            lote = [mapear_fila(fila, campos) for fila in filas_lote]
+            progreso.enviar(numero)
+            pendientes[pool.submit(enviar_lote, cliente, tabla, lote, conflicto)] = (numero, len(lote))
+        while pendientes:
+            recoger(FIRST_COMPLETED)
+
+    segundos = time.perf_counter() - inicio
+    resultado["segundos"] = segundos
+    resultado["filas_por_segundo"] = resultado["filas"] / segundos if segundos else 0.0
+    if errores:
+        raise ErrorCarga(f"{errores[0]} (se cargaron {resultado['filas']} filas; vuelva a ejecutar para retomar)")
+    return resultado
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Carga masiva de un csv de personas a Supabase.")
+    parser.add_argument("ruta")
+    parser.add_argument("--lote", type=int, default=TAMANO_LOTE, help="filas por peticion insert")
+    parser.add_argument("--en-vuelo", type=int, default=EN_VUELO, help="peticiones simultaneas como maximo")
+    parser.add_argument("--conflicto", default=CONFLICTO,
+                        help=f"columna unica para el upsert (por omision {CONFLICTO}; \"\" = insert simple, sin reintentos)")
+    args = parser.parse_args(argv)
+
+    import main as app  # cliente, tabla y campos del programa CRUD
+    if not app.inicializar_supabase():
+        return 1
+    try:
+        resultado = cargar_csv(app.supabase, app.TABLE_NAME, app.CAMPOS, args.ruta, args.lote, args.en_vuelo,
+                               args.conflicto or None)
+    except (ErrorCarga, OSError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    finally:
+        app.cache.limpiar()  # si el cache del menu se guarda en un archivo, no debe mostrar la tabla de antes
+    print(f"✅ {resultado['filas']} filas cargadas en {resultado['segundos']:.1f} s "
+          f"({resultado['filas_por_segundo']:.0f} filas/s); {resultado['saltadas']} ya estaban cargadas.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
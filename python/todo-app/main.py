@@ -1,10 +1,21 @@
 
 from dotenv import load_dotenv
+import asyncio
+import atexit
 import os
 import csv # Se mantiene para referencia a los campos, aunque ya no se usa para I/O
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from supabase import create_client, Client, PostgrestAPIResponse
-from datetime import date, datetime
-from typing import Dict, Any, List
+from postgrest.types import CountMethod, ReturnMethod
+from typing import Dict, Any, Awaitable, Callable, Iterator, List
+
+# utilidades compartidas en python/comunes
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from comunes.edad import calcular_edad
+from comunes.metricas import contar, medir
+from acceso_async import AccesoAsync
+from cache_local import CacheLocal
 
 # Cargar variables de entorno del archivo .env
 load_dotenv()
@@ -17,22 +28,50 @@ CAMPOS = [
 ]
 # Excluir 'id' ya que Supabase lo genera automáticamente. 'edad' es calculado.
 CAMPOS_INPUT = [c for c in CAMPOS if c not in ["edad"]]
+# Filas por petición al recorrer la tabla (paginación por id, ver iterar_paginas)
+TAMANO_PAGINA = 1000
+# Columnas que pide cada vista: nunca '*', solo lo que se muestra o se edita
+COLUMNAS_LISTADO = ["id", "cedula", "nombre", "apellido", "edad", "ocupacion", "empresa", "telefono_celular"]
+COLUMNAS_ACTUALIZACION = CAMPOS # muestra y ofrece editar todos los campos (el id ya se conoce)
 
 # Variables de entorno
 SUPABASE_URL: str | None = os.environ.get("SUPABASE_URL")
 SUPABASE_KEY: str | None = os.environ.get("SUPABASE_KEY")
+# Para pruebas sin Supabase: la URL de un PostgREST local (ej. http://localhost:3000); SUPABASE_KEY es opcional
+POSTGREST_URL: str | None = os.environ.get("POSTGREST_URL")
+# Cache local de lecturas (ver cache_local.py): CACHE_TTL=0 lo desactiva; con CACHE_ARCHIVO también se guarda en sqlite
+CACHE_TTL = float(os.environ.get("CACHE_TTL", "60"))
+CACHE_MAXIMO_FILAS = int(os.environ.get("CACHE_MAXIMO_FILAS", "50000"))
+CACHE_ARCHIVO: str | None = os.environ.get("CACHE_ARCHIVO")
 
 # Inicialización del cliente Supabase
 supabase: Client = None
+cache: CacheLocal = None
+# Acceso asíncrono para las operaciones sobre varios IDs (ver acceso_async.py): el bucle de asyncio y
+# su cliente HTTP se crean la primera vez y se reutilizan hasta salir, con las conexiones abiertas
+bucle: asyncio.AbstractEventLoop | None = None
+acceso: AccesoAsync | None = None
 
 # --------------------- Funciones auxiliares -----------------------
 
 def inicializar_supabase() -> bool:
     """Inicializa la conexión a Supabase y verifica credenciales."""
-    global supabase
+    global supabase, cache
     if supabase is not None:
         return True # Ya inicializado
 
+    if cache is None:
+        cache = CacheLocal(CACHE_TTL, CACHE_MAXIMO_FILAS, CACHE_ARCHIVO, origen=f"{POSTGREST_URL or SUPABASE_URL}/{TABLE_NAME}")
+
+    if POSTGREST_URL:
+        # mismo constructor de consultas (postgrest-py) que usa el cliente de Supabase por dentro
+        from postgrest import SyncPostgrestClient
+        supabase = SyncPostgrestClient(POSTGREST_URL)
+        if SUPABASE_KEY:
+            supabase.auth(SUPABASE_KEY)
+        print(f"✅ conexion a PostgREST local ({POSTGREST_URL})")
+        return True
+
     if not SUPABASE_URL or not SUPABASE_KEY:
         print("❌ ocurrio un problema inesperado") #Error: SUPABASE_URL o SUPABASE_KEY no están configuradas en las variables de entorno.
         return False
@@ -46,20 +85,111 @@ def inicializar_supabase() -> bool:
         print(f"❌ Error al crear el cliente: {e}") #error al crear el cliente
         return False
 
-def calcular_edad(fecha_nacimiento_str: str) -> int | None:
-    """Calcula la edad a partir de una fecha de nacimiento (YYYY-MM-DD)."""
-    try:
-        fecha_nacimiento = datetime.strptime(fecha_nacimiento_str, '%Y-%m-%d').date()
-    except ValueError:
-      return None
-      
-    hoy = date.today()
-
-    edad = hoy.year - fecha_nacimiento.year
+def ejecutar_consulta(operacion: str, consulta) -> PostgrestAPIResponse:
+    """Ejecuta una consulta de Supabase midiendo la llamada remota como 'supabase.<operacion>'."""
+    with medir(f"supabase.{operacion}"):
+        respuesta = consulta.execute()
+    # update y delete piden solo la cantidad (count) en vez de las filas
+    filas = respuesta.count if respuesta.count is not None else len(respuesta.data) if isinstance(respuesta.data, list) else 1
+    contar(f"supabase.{operacion}.filas", filas)
+    return respuesta
+
+def ejecutar_async(operacion: Callable[[AccesoAsync], Awaitable[Any]]) -> Any:
+    """Ejecuta operacion(acceso) en el bucle de asyncio del programa y devuelve su resultado."""
+    global bucle, acceso
+    if bucle is None:
+        bucle = asyncio.new_event_loop()
+        acceso = AccesoAsync(POSTGREST_URL or f"{SUPABASE_URL}/rest/v1", SUPABASE_KEY, TABLE_NAME)
+    return bucle.run_until_complete(operacion(acceso))
+
+def cerrar_conexiones():
+    """Cierra el cliente asíncrono (y sus conexiones) y el cache local; se llama al salir del programa."""
+    global bucle, acceso
+    if bucle is not None:
+        bucle.run_until_complete(acceso.cerrar())
+        bucle.run_until_complete(bucle.shutdown_asyncgens())
+        bucle.close()
+        bucle = acceso = None
+    if cache is not None:
+        cache.cerrar()
+
+atexit.register(cerrar_conexiones)
+
+def leer_ids(texto: str) -> List[str]:
+    """IDs escritos por el usuario separados por coma o espacio, sin repetir: '3, 5 3' -> ['3', '5']."""
+    return list(dict.fromkeys(texto.replace(',', ' ').split()))
+
+def mostrar_persona(persona: Dict[str, Any]) -> None:
+    # Aseguramos el acceso con .get() ya que 'id' es ahora clave
+    print(f"ID: {persona.get('id', 'N/A')}, Cédula: {persona.get('cedula', 'N/A')}, Nombre: {persona.get('nombre', 'N/A')}, Apellido: {persona.get('apellido', 'N/A')}, Edad: {persona.get('edad', 'N/A')}")
+    print(f" Ocupación: {persona.get('ocupacion', 'N/A')}, Empresa: {persona.get('empresa', 'N/A')}, Teléfono: {persona.get('telefono_celular', 'N/A')}")
+    print("-" * 50)
 
-    if (hoy.month, hoy.day) < (fecha_nacimiento.month, fecha_nacimiento.day):
-        edad -= 1
-    return edad
+def lista_columnas(columnas: List[str]) -> str:
+    """Parámetro select de PostgREST para pedir solo esas columnas: ['id', 'nombre'] -> 'id,nombre'."""
+    return ",".join(columnas)
+
+def iterar_paginas(columnas: List[str], tamano: int = TAMANO_PAGINA,
+                   usar_cache: bool = True) -> Iterator[List[Dict[str, Any]]]:
+    """Recorre la tabla por páginas en orden de id, pidiendo cada una con id > último id visto.
+
+    La paginación por clave (keyset) no usa offset, así que cada página cuesta lo mismo aunque la tabla
+    sea enorme, y nunca se pide más de lo que el servidor entrega por respuesta. Mientras se procesa
+    una página, la siguiente ya se está pidiendo en segundo plano. Solo se piden `columnas` (más el id,
+    que hace falta para pedir la página siguiente). Con usar_cache=False cada página se pide al
+    servidor, para decidir escrituras con los datos actuales y no con los de hace hasta CACHE_TTL segundos.
+    """
+    if 'id' not in columnas and '*' not in columnas:
+        columnas = ['id'] + columnas
+    seleccion = lista_columnas(columnas)
+
+    def pedir(ultimo_id: Any) -> List[Dict[str, Any]]:
+        clave = f"pagina:{seleccion}:{tamano}:{ultimo_id}"
+        pagina = cache.obtener(clave) if usar_cache else None
+        if pagina is not None:
+            return pagina
+        consulta = supabase.table(TABLE_NAME).select(seleccion).order('id').limit(tamano)
+        if ultimo_id is not None:
+            consulta = consulta.gt('id', ultimo_id)
+        pagina = ejecutar_consulta("select_pagina", consulta).data
+        # la página cubre los ids después de ultimo_id hasta el último que trajo; si vino incompleta
+        # es la última, y un registro nuevo (id mayor) también caería en ella
+        if usar_cache:
+            cache.guardar(clave, pagina, ultimo_id, pagina[-1]['id'] if len(pagina) == tamano else None)
+        return pagina
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        siguiente = pool.submit(pedir, None)
+        while True:
+            pagina = siguiente.result()
+            # se sigue hasta una página vacía: el servidor puede entregar menos filas que `tamano` por respuesta
+            if not pagina:
+                return
+            siguiente = pool.submit(pedir, pagina[-1]['id'])
+            yield pagina
+
+def iterar_registros(columnas: List[str], usar_cache: bool = True) -> Iterator[Dict[str, Any]]:
+    """Generador: produce los registros de a uno, con memoria constante aunque la tabla sea grande."""
+    for pagina in iterar_paginas(columnas, usar_cache=usar_cache):
+        yield from pagina
+
+def leer_por_id(id_registro: str, columnas: List[str]) -> Dict[str, Any]:
+    """Un registro por id, pasando por el cache local; si no existe, PostgREST responde con error (.single())."""
+    seleccion = lista_columnas(columnas)
+    clave = f"id:{seleccion}:{id_registro}"
+    registro = cache.obtener(clave)
+    if registro is None:
+        registro = ejecutar_consulta(
+            "select_uno",
+            supabase.table(TABLE_NAME)
+            .select(seleccion)
+            .eq('id', id_registro)
+            .limit(1)
+            .single() # Espera un único registro
+        ).data
+        # si la consulta funcionó, el id es un número válido
+        cache.guardar(clave, registro, int(id_registro) - 1, int(id_registro))
+    return registro
 
 # Las funciones auxiliares de CSV (obtener_datos, obtener_siguiente_ID, inicializar_csv)
 # han sido ELIMINADAS ya que ahora se usa Supabase.
@@ -101,15 +231,16 @@ def crear_registro():
 
     # 2. Inserción en Supabase
     try:
-        response: PostgrestAPIResponse = (
+        response: PostgrestAPIResponse = ejecutar_consulta(
+            "insert",
             supabase.table(TABLE_NAME)
             .insert(registro)
-            .execute()
         )
         data = response.data
         if data:
             # Supabase devuelve el registro insertado, obtenemos el ID generado
             nuevo_id = data[0].get('id')
+            cache.invalidar(nuevo_id)
             print(f'\n✅ se Registro con el ID {nuevo_id} con éxito.') #creacion de un nuevo ID 
         else:
             print(f"\n⚠️ ocurrio un problema inesperado. comuniquese con nuestro servicio tecnico para recibir ayuda") #insercion exitosa, pero no se devolvio el registro, verifique en supabase
@@ -122,35 +253,23 @@ def leer_registro():
     if not inicializar_supabase(): return
 
     print("\n---------- Lectura de todos los registros de personas desde Supabase ----------")
-    datos: List[Dict[str, Any]] = []
-    
-    # 1. Lectura de Supabase
+    mostrados = 0
+
+    # 1. Lectura de Supabase página por página, mostrando cada una mientras llega la siguiente
     try:
-        response: PostgrestAPIResponse = (
-            supabase.table(TABLE_NAME)
-            .select('*')
-            .execute()
-        )
-        datos = response.data
+        for persona in iterar_registros(COLUMNAS_LISTADO):
+            mostrar_persona(persona)
+            mostrados += 1
     except Exception as e:
         print(f"❌ Error al mostrar los registros: {e}") #error al leer los registros en supabase
         return
 
-    # 2. Visualización de datos
-    if not datos:
+    # 2. Resumen
+    if not mostrados:
         print("ℹ️ No hay registros guardados en Supabase.")
         return
 
-    print(f"Se encontraron {len(datos)} registros:")
-    print("-" * 50)
-    
-    for persona in datos:
-        # Aseguramos el acceso con .get() ya que 'id' es ahora clave
-        print(f"ID: {persona.get('id', 'N/A')}, Cédula: {persona.get('cedula', 'N/A')}, Nombre: {persona.get('nombre', 'N/A')}, Apellido: {persona.get('apellido', 'N/A')}, Edad: {persona.get('edad', 'N/A')}")
-        print(f" Ocupación: {persona.get('ocupacion', 'N/A')}, Empresa: {persona.get('empresa', 'N/A')}, Teléfono: {persona.get('telefono_celular', 'N/A')}")
-        print("-" * 50)
-        
-    print(f"✅ Se han mostrado {len(datos)} registros con éxito.")
+    print(f"✅ Se han mostrado {mostrados} registros con éxito.")
 
 def actualizar_registro():
     """Actualiza un registro en Supabase por ID."""
@@ -162,15 +281,7 @@ def actualizar_registro():
 
     # 1. Obtener el registro actual para mostrar y verificar existencia
     try:
-        response: PostgrestAPIResponse = (
-            supabase.table(TABLE_NAME)
-            .select('*')
-            .eq('id', id_a_actualizar)
-            .limit(1)
-            .single() # Espera un único registro
-            .execute()
-        )
-        registro_actual = response.data
+        registro_actual = leer_por_id(id_a_actualizar, COLUMNAS_ACTUALIZACION)
     except Exception as e:
         # Este error puede ser FileNotFoundError (si no existe) o un error de conexión/API
         if "PostgrestAPIError" in str(e) and "zero rows" in str(e):
@@ -214,13 +325,14 @@ def actualizar_registro():
 
     # 4. Actualización en Supabase
     try:
-        response: PostgrestAPIResponse = (
+        response: PostgrestAPIResponse = ejecutar_consulta(
+            "update",
             supabase.table(TABLE_NAME)
-            .update(updates)
+            .update(updates, count=CountMethod.exact, returning=ReturnMethod.minimal) # solo la cantidad, sin devolver las filas
             .eq('id', id_a_actualizar)
-            .execute()
         )
-        print(f'\n✅ Registro con el ID {id_a_actualizar} actualizado con éxito. Filas afectadas: {len(response.data)}')
+        cache.invalidar(int(id_a_actualizar))
+        print(f'\n✅ Registro con el ID {id_a_actualizar} actualizado con éxito. Filas afectadas: {response.count}')
 
     except Exception as e:
         print(f"\n❌ Error al actualizar el registro en Supabase: {e}")
@@ -232,18 +344,23 @@ def eliminar_registro():
 
     print("\n---------- Eliminación de registro de personas por ID en Supabase ----------")
 
-    id_a_eliminar = input("Ingrese el ID del registro a eliminar: ")
+    id_a_eliminar = input("Ingrese el ID del registro a eliminar (o varios separados por coma): ")
+    ids = leer_ids(id_a_eliminar)
+    if len(ids) > 1:
+        eliminar_varios_registros(ids)
+        return
     
     # 1. Eliminación en Supabase
     try:
-        response: PostgrestAPIResponse = (
+        response: PostgrestAPIResponse = ejecutar_consulta(
+            "delete",
             supabase.table(TABLE_NAME)
-            .delete()
+            .delete(count=CountMethod.exact, returning=ReturnMethod.minimal)
             .eq('id', id_a_eliminar)
-            .execute()
         )
         
-        if len(response.data) > 0:
+        if response.count:
+            cache.invalidar(int(id_a_eliminar))
             print(f'\n✅ Registro con el ID {id_a_eliminar} eliminado de Supabase con éxito.')
         else:
             print(f"\n⚠️ No se encontró o eliminó ningún registro con el ID {id_a_eliminar}.")
@@ -252,6 +369,127 @@ def eliminar_registro():
         print(f"\n❌ Error al eliminar el registro en Supabase: {e}")
 
 
+def eliminar_varios_registros(ids: List[str]):
+    """Elimina varios registros a la vez: todas las peticiones salen juntas por el cliente asíncrono."""
+    try:
+        eliminados = ejecutar_async(lambda acceso: acceso.eliminar_varios(ids))
+    except Exception as e:
+        cache.limpiar() # no se sabe cuáles llegaron a eliminarse
+        print(f"\n❌ Error al eliminar los registros en Supabase: {e}")
+        return
+
+    for id_registro in eliminados:
+        cache.invalidar(int(id_registro))
+    if eliminados:
+        print(f"\n✅ Se eliminaron {len(eliminados)} registros de Supabase: {', '.join(eliminados)}")
+    no_encontrados = [id_registro for id_registro in ids if id_registro not in eliminados]
+    if no_encontrados:
+        print(f"⚠️ No se encontraron registros con los ID: {', '.join(no_encontrados)}")
+
+
+def consultar_registros():
+    """Muestra varios registros por ID; los que no están en el cache local se piden todos a la vez."""
+    if not inicializar_supabase(): return
+
+    print("\n---------- Consulta de registros de personas por ID en Supabase ----------")
+    ids = leer_ids(input("Ingrese los ID separados por coma: "))
+    seleccion = lista_columnas(COLUMNAS_LISTADO)
+    encontrados: Dict[str, Dict[str, Any]] = {}
+    for id_registro in ids:
+        registro = cache.obtener(f"id:{seleccion}:{id_registro}")
+        if registro is not None:
+            encontrados[id_registro] = registro
+
+    faltan = [id_registro for id_registro in ids if id_registro not in encontrados]
+    if faltan:
+        try:
+            pedidos = ejecutar_async(lambda acceso: acceso.obtener_varios(faltan, COLUMNAS_LISTADO))
+        except Exception as e:
+            print(f"❌ Error al consultar los registros: {e}")
+            return
+        for id_registro, registro in pedidos.items():
+            cache.guardar(f"id:{seleccion}:{id_registro}", registro, int(id_registro) - 1, int(id_registro))
+        encontrados.update(pedidos)
+
+    for id_registro in ids:
+        if id_registro in encontrados:
+            mostrar_persona(encontrados[id_registro])
+        else:
+            print(f"⚠️ No se encontró ningún registro con el ID {id_registro}.")
+
+
+def recalcular_edades():
+    """Recalcula la edad de todos los registros según su fecha de nacimiento y guarda las que cambiaron."""
+    if not inicializar_supabase(): return
+
+    print("\n---------- Recalcular edades de los registros en Supabase ----------")
+    cambios: Dict[str, Dict[str, Any]] = {}
+    leidas: Dict[str, Dict[str, Any]] = {}
+    try:
+        # se lee del servidor y no del cache: una edad vieja haría saltar o repetir actualizaciones
+        for persona in iterar_registros(["id", "fecha_nacimiento", "edad"], usar_cache=False):
+            edad = calcular_edad(persona.get('fecha_nacimiento') or '')
+            if edad is not None and edad != persona.get('edad'):
+                cambios[str(persona['id'])] = {"edad": edad}
+                leidas[str(persona['id'])] = {"edad": persona.get('edad')}
+    except Exception as e:
+        print(f"❌ Error al leer los registros: {e}")
+        return
+    if not cambios:
+        print("ℹ️ Todas las edades están al día.")
+        return
+
+    # todas las actualizaciones salen juntas (los registros con la misma edad nueva, en una sola petición);
+    # cada una solo se aplica si la edad sigue siendo la que se leyó, para no pisar una edición hecha mientras tanto
+    try:
+        actualizados = ejecutar_async(lambda acceso: acceso.actualizar_varios(cambios, leidas))
+    except Exception as e:
+        print(f"\n❌ Error al actualizar las edades en Supabase: {e}")
+        return
+    finally:
+        for id_registro in cambios:
+            cache.invalidar(int(id_registro))
+    print(f"\n✅ Se actualizó la edad de {actualizados} registros.")
+    if actualizados < len(cambios):
+        print(f"ℹ️ {len(cambios) - actualizados} registros cambiaron mientras tanto y no se tocaron.")
+
+
+def cargar_registros_csv():
+    """Carga en bloque un csv de personas (por ejemplo registro_personas.csv) en la tabla de Supabase."""
+    if not inicializar_supabase(): return
+    from carga_masiva import CONFLICTO, ErrorCarga, TAMANO_LOTE, cargar_csv
+
+    print("\n---------- Carga masiva de registros desde CSV a Supabase ----------")
+    ruta = input("Ruta del archivo csv: ").strip()
+    if not os.path.exists(ruta):
+        print(f"❌ El archivo '{ruta}' no fue encontrado.")
+        return
+    tamano = input(f"Filas por lote (Enter = {TAMANO_LOTE}): ").strip()
+
+    try:
+        # upsert por cedula: retomar una carga cortada no duplica los lotes que ya habian entrado
+        resultado = cargar_csv(supabase, TABLE_NAME, CAMPOS, ruta, int(tamano) if tamano.isdigit() else TAMANO_LOTE,
+                               conflicto=CONFLICTO)
+    except ErrorCarga as e:
+        print(f"\n❌ La carga se interrumpió: {e}")
+        return
+    finally:
+        cache.limpiar() # la carga agrega ids que no se conocen de antemano
+    print(f"\n✅ Se cargaron {resultado['filas']} registros en {resultado['segundos']:.1f} s "
+          f"({resultado['filas_por_segundo']:.0f} filas/s). Ya estaban cargados: {resultado['saltadas']}.")
+
+
+def mostrar_estadisticas_cache():
+    """Muestra cuántas lecturas respondió el cache local sin ir a Supabase."""
+    if not inicializar_supabase(): return
+
+    datos = cache.estadisticas()
+    print("\n---------- Estadísticas del cache local ----------")
+    print(f"Aciertos: {datos['aciertos']}, Fallos: {datos['fallos']} ({datos['tasa_aciertos']:.0%} de aciertos)")
+    print(f"Entradas: {datos['entradas']} ({datos['filas']} filas), Descartadas por tamaño: {datos['desalojos']}")
+    print(f"Vencimiento: {CACHE_TTL:g} s, Máximo: {CACHE_MAXIMO_FILAS} filas" + (f", Archivo: {CACHE_ARCHIVO}" if CACHE_ARCHIVO else ""))
+
+
 def menu_principal():
     # Inicializar la conexión a Supabase
     if not inicializar_supabase():
@@ -269,6 +507,10 @@ def menu_principal():
         print("3. Actualizar Registros por ID ")  #update
         print("4. Eliminar Registro por ID ")     #delete
         print("5. Salir")                         #finaliza el menu
+        print("6. Carga Masiva desde CSV ")       #migracion en lotes
+        print("7. Estadísticas del Cache Local ") #aciertos y fallos del cache
+        print("8. Consultar Varios Registros por ID ") #lectura en paralelo
+        print("9. Recalcular Edades ")            #actualizacion en lote
         print("-" * 40)
         opcion = input("Favor digite una de las opciones: ")
 
@@ -280,7 +522,16 @@ def menu_principal():
             actualizar_registro()
         elif opcion == "4":
             eliminar_registro()
+        elif opcion == "6":
+            cargar_registros_csv()
+        elif opcion == "7":
+            mostrar_estadisticas_cache()
+        elif opcion == "8":
+            consultar_registros()
+        elif opcion == "9":
+            recalcular_edades()
         elif opcion == "5":
+            cerrar_conexiones()
             print("\nMuchas gracias por utilizar nuestro programa.")
             print("JMEP @2025 (All rights reserved)")
             break
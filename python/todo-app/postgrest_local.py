@@ -0,0 +1,196 @@
+"""PostgREST de prueba: una tabla en memoria que responde como PostgREST, para probar sin Supabase.
+
+Entiende lo que usan main.py, carga_masiva.py y acceso_async.py: select con lista de columnas,
+filtros eq/gt/in/is.null, order=id, limit/offset, un solo objeto (.single()), insert/upsert (on_conflict e
+ignore-duplicates), update y delete, con Prefer return=minimal y count=exact.
+
+    python postgrest_local.py [--puerto 3000] [--latencia 0.05] [--fallar 3,7]
+    POSTGREST_URL=http://127.0.0.1:3000 python main.py
+
+--latencia agrega una demora por peticion (como un enlace lento) y --fallar hace fallar con 503 esos
+POST (contando desde 1), para probar los reintentos y la reanudacion de la carga masiva.
+GET /_estadisticas devuelve cuantas peticiones y bytes respondio y cuantas llegaron a estar en vuelo a la vez.
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+from urllib.parse import parse_qsl, urlparse
+
+PUERTO = 3000
+# parametros de la URL que no son filtros
+PARAMETROS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+
+class Tabla:
+    """Filas por id, con el proximo id a asignar; un solo candado para todo (es solo para pruebas)."""
+
+    def __init__(self) -> None:
+        self.filas: Dict[int, Dict[str, Any]] = {}
+        self.siguiente_id = 1
+        self.candado = threading.Lock()
+        self.estadisticas = {"peticiones": 0, "bytes_enviados": 0, "en_vuelo": 0, "maximo_en_vuelo": 0, "posts": 0}
+
+    def filtrar(self, filtros: List[tuple]) -> List[Dict[str, Any]]:
+        filas = list(self.filas.values())
+        for columna, condicion in filtros:
+            operador, _, valor = condicion.partition(".")
+            if operador == "eq":
+                filas = [fila for fila in filas if str(fila.get(columna)) == valor]
+            elif operador == "gt":
+                minimo = int(valor) if columna == "id" else valor
+                filas = [fila for fila in filas if fila.get(columna) is not None and fila[columna] > minimo]
+            elif operador == "in":
+                valores = set(valor.strip("()").split(","))
+                filas = [fila for fila in filas if str(fila.get(columna)) in valores]
+            elif operador == "is" and valor == "null":
+                filas = [fila for fila in filas if fila.get(columna) is None]
+        return sorted(filas, key=lambda fila: fila["id"])
+
+
+class Manejador(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # conexiones persistentes, como un servidor real
+    tabla: Tabla
+    latencia = 0.0
+    fallar: set = set()
+
+    def log_message(self, *args) -> None:
+        pass
+
+    # ------------------------- auxiliares -------------------------------------
+
+    def _empezar(self):
+        with self.tabla.candado:
+            estadisticas = self.tabla.estadisticas
+            estadisticas["peticiones"] += 1
+            estadisticas["en_vuelo"] += 1
+            estadisticas["maximo_en_vuelo"] = max(estadisticas["maximo_en_vuelo"], estadisticas["en_vuelo"])
+        time.sleep(self.latencia)
+        url = urlparse(self.path)
+        parametros = parse_qsl(url.query)
+        filtros = [(columna, valor) for columna, valor in parametros if columna not in PARAMETROS]
+        longitud = int(self.headers.get("Content-Length") or 0)
+        cuerpo = json.loads(self.rfile.read(longitud)) if longitud else None
+        return url.path.strip("/"), dict(parametros), filtros, cuerpo
+
+    def _responder(self, codigo: int, datos: Any = None, cantidad: int | None = None) -> None:
+        cuerpo = b"" if datos is None else json.dumps(datos).encode()
+        with self.tabla.candado:
+            self.tabla.estadisticas["en_vuelo"] -= 1
+            self.tabla.estadisticas["bytes_enviados"] += len(cuerpo)
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        if cantidad is not None:
+            self.send_header("Content-Range", f"*/{cantidad}")
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _responder_filas(self, filas: List[Dict[str, Any]], codigo: int = 200) -> None:
+        #update y delete devuelven las filas, o nada con return=minimal, y la cantidad con count=exact
+        prefer = self.headers.get("Prefer", "")
+        cantidad = len(filas) if "count=exact" in prefer else None
+        if "return=minimal" in prefer:
+            self._responder(204 if codigo == 200 else codigo, None, cantidad)
+        else:
+            self._responder(codigo, filas, cantidad)
+
+    # ------------------------- metodos ----------------------------------------
+
+    def do_GET(self) -> None:
+        ruta, parametros, filtros, _ = self._empezar()
+        if ruta == "_estadisticas":
+            with self.tabla.candado:
+                datos = dict(self.tabla.estadisticas, filas=len(self.tabla.filas))
+            return self._responder(200, datos)
+
+        with self.tabla.candado:
+            filas = self.tabla.filtrar(filtros)
+        inicio = int(parametros.get("offset", 0))
+        filas = filas[inicio:]
+        if "limit" in parametros:
+            filas = filas[:int(parametros["limit"])]
+        seleccion = parametros.get("select", "*")
+        if seleccion != "*":
+            columnas = seleccion.split(",")
+            filas = [{columna: fila.get(columna) for columna in columnas} for fila in filas]
+
+        if "vnd.pgrst.object" in self.headers.get("Accept", ""):
+            # .single(): exactamente una fila, o el mismo error que da PostgREST
+            if len(filas) != 1:
+                return self._responder(406, {"message": "JSON object requested, multiple (or no) rows returned",
+                                             "code": "PGRST116", "hint": None,
+                                             "details": f"The result contains {len(filas)} rows"})
+            return self._responder(200, filas[0])
+        self._responder(200, filas)
+
+    def do_POST(self) -> None:
+        _, parametros, _, cuerpo = self._empezar()
+        with self.tabla.candado:
+            self.tabla.estadisticas["posts"] += 1
+            numero = self.tabla.estadisticas["posts"]
+        if numero in self.fallar:
+            return self._responder(503, {"message": "fallo simulado"})
+
+        ignorar_duplicados = "ignore-duplicates" in self.headers.get("Prefer", "")
+        conflicto = parametros.get("on_conflict")
+        nuevas = []
+        with self.tabla.candado:
+            # filas existentes por el valor de la columna de conflicto (una vez por peticion, no por fila)
+            por_valor = {str(otra.get(conflicto)): otra for otra in self.tabla.filas.values()} if conflicto else {}
+            for fila in cuerpo if isinstance(cuerpo, list) else [cuerpo]:
+                fila = dict(fila)
+                existente = por_valor.get(str(fila.get(conflicto))) if conflicto else None
+                if existente is not None:
+                    if not ignorar_duplicados:
+                        existente.update(fila)
+                    continue
+                fila["id"] = int(fila["id"]) if fila.get("id") else self.tabla.siguiente_id
+                self.tabla.siguiente_id = max(self.tabla.siguiente_id, fila["id"] + 1)
+                self.tabla.filas[fila["id"]] = fila
+                if conflicto:
+                    por_valor[str(fila.get(conflicto))] = fila
+                nuevas.append(fila)
+        self._responder_filas(nuevas, 201)
+
+    def do_PATCH(self) -> None:
+        _, _, filtros, cuerpo = self._empezar()
+        with self.tabla.candado:
+            filas = self.tabla.filtrar(filtros)
+            for fila in filas:
+                fila.update(cuerpo)
+        self._responder_filas(filas)
+
+    def do_DELETE(self) -> None:
+        _, _, filtros, _ = self._empezar()
+        with self.tabla.candado:
+            filas = self.tabla.filtrar(filtros)
+            for fila in filas:
+                del self.tabla.filas[fila["id"]]
+        self._responder_filas(filas)
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="PostgREST de prueba con una tabla en memoria.")
+    parser.add_argument("--puerto", type=int, default=PUERTO)
+    parser.add_argument("--latencia", type=float, default=0.0, help="segundos de demora por peticion")
+    parser.add_argument("--fallar", default="", help="numeros de POST que responden 503 (ej. 3,7)")
+    args = parser.parse_args(argv)
+
+    Manejador.tabla = Tabla()
+    Manejador.latencia = args.latencia
+    Manejador.fallar = {int(numero) for numero in args.fallar.split(",") if numero}
+    ThreadingHTTPServer.request_queue_size = 128  # muchas conexiones a la vez (acceso_async)
+    servidor = ThreadingHTTPServer(("127.0.0.1", args.puerto), Manejador)
+    print(f"PostgREST de prueba en http://127.0.0.1:{args.puerto} (todas las tablas comparten la misma memoria)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()